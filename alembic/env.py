@@ -22,6 +22,8 @@ from get_stakeholder_data.models.base import Base
 from get_stakeholder_data.models.shareholders_model import ShareholdersModel
 from get_stakeholder_data.models.directors_model import DirectorsModel
 from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.models.run_dates_model import RunDatesModel
+from get_stakeholder_data.models.run_docs_model import RunDocsModel
 
 # MetaDataを設定
 # for 'autogenerate' support
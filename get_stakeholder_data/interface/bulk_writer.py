@@ -0,0 +1,144 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from sqlalchemy import insert
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.interface.database import engine as default_engine
+from get_stakeholder_data.models.directors_model import DirectorsModel
+from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.models.shareholders_model import ShareholdersModel
+from get_stakeholder_data.services.logger import Logger
+from get_stakeholder_data.services.store import (
+    director_row,
+    doc_row,
+    shareholder_row,
+)
+
+# ロガーの初期化
+logger = Logger()
+
+
+@dataclass
+class PendingDocument:
+    """
+    書き込み待ちの1文書分のデータ
+    """
+
+    doc: Doc
+    directors: List[Director]
+    shareholders: List[Shareholder]
+    tag: Any = None  # 呼び出し側が結果の対応付けに使う任意の値
+
+
+@dataclass
+class WriteResult:
+    """
+    1文書分の書き込み結果（error が None なら成功）
+    """
+
+    doc: Doc
+    tag: Any = None
+    error: Optional[Exception] = None
+
+
+class BulkWriter:
+    """
+    文書・役員・株主をまとめてINSERTする書き込み器
+
+    batch_size 件の文書を1トランザクションでコミットし、各テーブルへは
+    executemany（Coreの insert()）で一括INSERTする。
+    バッチ内で失敗した場合はロールバックして1文書ずつ書き直し、失敗した文書だけを結果に含める。
+    """
+
+    def __init__(self, engine=None, batch_size: int = 50):
+        """
+        Args:
+            engine: 書き込み先のエンジン（省略時はアプリのエンジン）
+            batch_size (int): 1トランザクションにまとめる文書数
+        """
+        self.engine = engine or default_engine
+        self.batch_size = batch_size
+        self.docs_written = 0
+        self.rows_written = 0
+        self.failed = 0
+        self._pending: List[PendingDocument] = []
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        doc: Doc,
+        directors: List[Director],
+        shareholders: List[Shareholder],
+        tag: Any = None,
+    ) -> List[WriteResult]:
+        """
+        文書を書き込み待ちに追加する（batch_size に達したら書き込む）
+
+        Returns:
+            list: 書き込んだ場合はその結果、まだ書き込んでいなければ空のリスト
+        """
+        with self._lock:
+            self._pending.append(PendingDocument(doc, directors, shareholders, tag))
+            if len(self._pending) < self.batch_size:
+                return []
+            batch, self._pending = self._pending, []
+        return self._write(batch)
+
+    def flush(self) -> List[WriteResult]:
+        """
+        書き込み待ちの文書をすべて書き込む
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return self._write(batch) if batch else []
+
+    def _write(self, batch: List[PendingDocument]) -> List[WriteResult]:
+        try:
+            self._insert(batch)
+            return [WriteResult(p.doc, p.tag) for p in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                return [WriteResult(batch[0].doc, batch[0].tag, e)]
+            logger.warning(
+                f"一括書き込みに失敗したため1件ずつ書き込みます ({len(batch)}件): {e}"
+            )
+
+        # 1文書ずつ書き直して失敗した文書を特定する
+        results = []
+        for pending in batch:
+            try:
+                self._insert([pending])
+                results.append(WriteResult(pending.doc, pending.tag))
+            except Exception as e:
+                self.failed += 1
+                results.append(WriteResult(pending.doc, pending.tag, e))
+        return results
+
+    def _insert(self, batch: List[PendingDocument]) -> None:
+        docs = [doc_row(p.doc) for p in batch]
+        directors = [
+            director_row(d, p.doc.doc_id) for p in batch for d in p.directors
+        ]
+        shareholders = [
+            shareholder_row(s, p.doc.doc_id) for p in batch for s in p.shareholders
+        ]
+
+        # 1トランザクションで書き込む（例外時はロールバック）
+        with self.engine.begin() as conn:
+            conn.execute(insert(DocsModel), docs)
+            if directors:
+                conn.execute(insert(DirectorsModel), directors)
+            if shareholders:
+                conn.execute(insert(ShareholdersModel), shareholders)
+
+        self.docs_written += len(docs)
+        self.rows_written += len(docs) + len(directors) + len(shareholders)
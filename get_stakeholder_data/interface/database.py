@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from get_stakeholder_data.models.base import Base  # declarative_base() で定義
 from get_stakeholder_data.models.docs_model import DocsModel  # 既存のモデル
@@ -9,14 +9,41 @@ from get_stakeholder_data.models.shareholders_model import (
     ShareholdersModel,
 )  # 新しいモデル
 from get_stakeholder_data.models.stocks_model import StocksModel  # 新しいモデル
+from get_stakeholder_data.models.run_dates_model import RunDatesModel  # 実行状態
+from get_stakeholder_data.models.run_docs_model import RunDocsModel  # 実行状態
 
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise Exception("DATABASE_URL が設定されていません")
-# エンジン作成（echo=True にするとSQLログが表示されて便利）
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    SQLiteの書き込み性能を上げるPRAGMAを接続ごとに設定する
+
+    WALにより読み込みと書き込みが並行でき、synchronous=NORMALでコミットごとのfsyncを減らす。
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def create_db_engine(url: str):
+    """
+    エンジンを作成する（SQLiteの場合はPRAGMAを設定する）
+    """
+    # echo=True にするとSQLログが表示されて便利
+    db_engine = create_engine(url, echo=False, future=True)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragma)
+    return db_engine
+
+
+# エンジン作成
+engine = create_db_engine(DATABASE_URL)
 
 # セッションのファクトリ
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
@@ -1,102 +1,156 @@
-from get_stakeholder_data.domain.director import Director
+import argparse
 from get_stakeholder_data.parser.xbrl_parser import (
     XbrlParser,
     ParsingError,
 )  # カスタム例外をインポート
+from get_stakeholder_data.services.async_pipeline import PipelineConfig, run_async
 from get_stakeholder_data.services.get_document import get_document
-from get_stakeholder_data.services.get_documents import get_documents
-from get_stakeholder_data.interface.database import SessionLocal, init_db
-from get_stakeholder_data.models.docs_model import DocsModel
-from get_stakeholder_data.models.directors_model import DirectorsModel
-from get_stakeholder_data.models.shareholders_model import ShareholdersModel
-from datetime import datetime, timedelta
+from get_stakeholder_data.services.get_documents import (
+    date_range,
+    get_documents_for_dates,
+)
+from get_stakeholder_data.interface.bulk_writer import BulkWriter
+from get_stakeholder_data.interface.database import init_db
+from datetime import datetime
 from sqlalchemy.exc import IntegrityError
+from get_stakeholder_data.services.known_docs import KnownDocIds
+from get_stakeholder_data.services.ai_parser import log_compaction_stats
+from get_stakeholder_data.services.llm_metrics import export_llm_metrics
 from get_stakeholder_data.services.logger import Logger  # ロガーをインポート
-from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.services.run_state import RunState
+from get_stakeholder_data.services.extraction import (
+    MODE_LLM,
+    MODES,
+    StakeholderExtractor,
+)
 
 
-def main():
+START_DATE = datetime(2025, 4, 1)
+END_DATE = datetime(2025, 4, 23)
+
+
+def main(
+    start_date=START_DATE,
+    end_date=END_DATE,
+    batch_size=1,
+    combined_llm=False,
+    extraction_mode=MODE_LLM,
+    pack_size=1,
+):
     """
     メイン関数
+
+    Args:
+        start_date (datetime): 取得開始日
+        end_date (datetime): 取得終了日
+        batch_size (int): 1トランザクションにまとめる文書数
+        combined_llm (bool): 役員・株主情報を1回のLLM呼び出しで抽出する
+        extraction_mode (str): llm（すべてLLM、既定）または hybrid（表の解析に失敗した場合だけLLM）
+        pack_size (int): 2以上なら大株主を単独でLLMに送る文書をこの件数ずつまとめて抽出する
     """
     init_db()  # DBの初期化
-    session = SessionLocal()
     logger = Logger()  # ロガーのインスタンスを作成
-    start_date = datetime(2025, 4, 1)
-    end_date = datetime(2025, 4, 23)
-    current = start_date
-    while current <= end_date:
-        docs = get_documents(current)
-        for doc in docs.documents:
-            try:
-                # ドキュメントが既に存在するか確認
-                existing_doc = (
-                    session.query(DocsModel).filter_by(doc_id=doc.doc_id).first()
+    run_state = RunState()  # 前回までの進捗から再開する
+    known_doc_ids = KnownDocIds.load()  # 取り込み済みの文書番号を一度だけ読み込む
+    writer = BulkWriter(batch_size=batch_size)
+    extractor = StakeholderExtractor(extraction_mode, combined_llm)
+    pack = []  # 大株主をまとめて抽出するために保留している (文書, 役員, パーサー)
+    dates = run_state.pending_dates(date_range(start_date, end_date))
+
+    def record(results):
+        """書き込み結果を実行状態に反映する"""
+        for result in results:
+            run_state.finish_doc(result.doc.doc_id, result.tag, error=result.error)
+            if result.error is None:
+                known_doc_ids.add(result.doc.doc_id)
+                logger.info(f"ドキュメント {result.doc.doc_id} の処理が完了しました")
+            elif isinstance(result.error, IntegrityError):
+                logger.error(f"主キーの重複エラーをスキップ: {result.doc}")
+            else:
+                logger.error(
+                    f"予期しないエラーが発生: {result.doc}, エラー内容: {result.error}"
                 )
-                if existing_doc:
-                    logger.info(
-                        f"ドキュメント {doc.doc_id} は既に存在するためスキップします"
-                    )
-                    continue  # 既存データがある場合はスキップ
-                # ドキュメント情報を保存
-                session.add(DocsModel.from_dataclass(doc))
+
+    def flush_pack(current):
+        """保留している文書の大株主をまとめて抽出して書き込む（失敗した文書のみスキップ）"""
+        batch = pack[:]
+        pack.clear()
+        if not batch:
+            return
+        try:
+            results = extractor.extract_packed(
+                {doc.doc_id: parser for doc, _, parser in batch}
+            )
+        except Exception as e:
+            # 呼び出し自体が失敗した場合は保留していた文書をすべて失敗とする
+            results = {doc.doc_id: e for doc, _, _ in batch}
+        for doc, directors, _ in batch:
+            result = results[doc.doc_id]
+            if isinstance(result, ParsingError):
+                run_state.finish_doc(doc.doc_id, current, error=result)
+                logger.error(f"パーサーエラーをスキップ: {doc}, エラー内容: {result}")
+            elif isinstance(result, Exception):
+                run_state.finish_doc(doc.doc_id, current, error=result)
+                logger.error(f"予期しないエラーが発生: {doc}, エラー内容: {result}")
+            else:
+                record(writer.add(doc, directors, result, tag=current))
+
+    # 未完了の日付の書類一覧をまとめて取得（確定済みの日付はキャッシュから）
+    for current, docs in get_documents_for_dates(dates):
+        # 既存データがある場合はスキップ
+        new_docs, known_docs = known_doc_ids.partition(docs.documents)
+        if known_docs:
+            logger.info(
+                f"{len(known_docs)} 件のドキュメントは既に存在するためスキップします"
+            )
+        for doc in new_docs:
+            try:
+                run_state.start_doc(doc.doc_id, current)
+
                 # XBRLファイルを取得
                 xbrl_byte = get_document(
                     doc.doc_id, company_code=doc.sec_code, save_dir="xbrl_data"
                 )
                 parser = XbrlParser(xbrl_byte)
 
-                # 役員情報を保存
-                officers = parser.get_major_officers_by_llm()
-                for officer in officers["役員の状況"]["data"]:
-                    director_dataclass = Director(
-                        name=officer["氏名"]
-                        .replace("\u3000", " ")
-                        .replace("\n", " ")
-                        .strip(),
-                        title=officer["役職名"].replace("\u3000", " ").strip(),
-                        birth_date=officer["生年月日"].replace("\u3000", " ").strip(),
-                        biography=officer["略歴"].replace("\u3000", " ").strip(),
-                        shares_owned=officer["所有株式数(千株)"],
-                    )
-                    session.add(
-                        DirectorsModel.from_dataclass(director_dataclass, doc.doc_id)
-                    )
-                # 株主情報を保存
-                major_shareholders = parser.get_major_shareholders_by_llm()
-                for shareholder in major_shareholders["大株主の状況"]["data"]:
-                    if shareholder["氏名又は名称"] == "計":
-                        continue
-                    shareholder_dataclass = Shareholder(
-                        name=shareholder["氏名又は名称"].replace("\u3000", " ").strip(),
-                        address=shareholder["住所"].replace("\u3000", " ").strip(),
-                        shares_held=shareholder["所有株式数(千株)"],
-                        ownership_ratio=shareholder["所有割合(％)"],
-                    )
-                    session.add(
-                        ShareholdersModel.from_dataclass(
-                            shareholder_dataclass, doc.doc_id
-                        )
-                    )
-
-                session.commit()  # 一本ずつコミット
-                logger.info(f"ドキュメント {doc.doc_id} の処理が完了しました")
-
-            except IntegrityError:
-                session.rollback()  # エラー時にロールバック
-                logger.error(f"主キーの重複エラーをスキップ: {doc}")
+                # 役員情報・株主情報を抽出（表の解析に失敗した場合だけLLMを使う）
+                directors, shareholders = extractor.extract(
+                    parser, defer_shareholders=pack_size > 1, doc_id=doc.doc_id
+                )
+                if shareholders is None:
+                    # 大株主は pack_size 件たまったらまとめて抽出する
+                    pack.append((doc, directors, parser))
+                    if len(pack) >= pack_size:
+                        flush_pack(current)
+                    continue
+
+                # ドキュメント・役員・株主情報を保存（batch_size 件ごとにコミット）
+                record(writer.add(doc, directors, shareholders, tag=current))
 
             except ParsingError as e:
-                session.rollback()  # エラー時にロールバック
+                run_state.finish_doc(doc.doc_id, current, error=e)
                 logger.error(f"パーサーエラーをスキップ: {doc}, エラー内容: {e}")
 
             except Exception as e:
-                session.rollback()  # その他のエラーもロールバック
+                run_state.finish_doc(doc.doc_id, current, error=e)
                 logger.error(f"予期しないエラーが発生: {doc}, エラー内容: {e}")
 
-        current += timedelta(days=1)
+        # 日付内の文書がすべて処理済みなら完了として記録
+        flush_pack(current)
+        record(writer.flush())
+        run_state.finish_date(current, [doc.doc_id for doc in docs.documents])
+
+    logger.info(extractor.stats.summary())
+    log_compaction_stats()
+    export_llm_metrics()
+
 
-    session.close()
+def main_async(start_date=START_DATE, end_date=END_DATE, config=None):
+    """
+    非同期モードのメイン関数（ステージごとに同時実行数を制限して並行処理する）
+    """
+    init_db()  # DBの初期化
+    return run_async(start_date, end_date, config)
 
 
 def test():
@@ -106,7 +160,64 @@ def test():
     print(officers)
 
 
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析する（省略時は従来どおり役員・株主情報を別々にLLMで抽出する）
+    """
+    arg_parser = argparse.ArgumentParser(description="有価証券報告書の取り込み")
+    arg_parser.add_argument(
+        "--async", dest="use_async", action="store_true", help="非同期モードで実行する"
+    )
+    arg_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="1トランザクションにまとめる文書数",
+    )
+    arg_parser.add_argument(
+        "--combined-llm",
+        action="store_true",
+        help="役員・株主情報を1回のLLM呼び出しで抽出する",
+    )
+    arg_parser.add_argument(
+        "--extraction",
+        choices=MODES,
+        default=MODE_LLM,
+        help="llm: すべてLLM（既定） / hybrid: 表の解析を先に行い検証に失敗した場合だけLLMを使う",
+    )
+    arg_parser.add_argument(
+        "--pack-size",
+        type=int,
+        default=1,
+        help="大株主をLLMで抽出する文書をこの件数ずつ1回の呼び出しにまとめる",
+    )
+    arg_parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="XBRLのパースをこの数のプロセスで並列に行う（非同期モードのみ、0ならスレッド）",
+    )
+    return arg_parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
 
-    main()
+    if args.use_async:
+        main_async(
+            config=PipelineConfig(
+                batch_size=args.batch_size,
+                combined_llm=args.combined_llm,
+                extraction_mode=args.extraction,
+                pack_size=args.pack_size,
+                parse_workers=args.parse_workers,
+            )
+        )
+    else:
+        main(
+            batch_size=args.batch_size,
+            combined_llm=args.combined_llm,
+            extraction_mode=args.extraction,
+            pack_size=args.pack_size,
+        )
     # test()
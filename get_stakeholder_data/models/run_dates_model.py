@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from get_stakeholder_data.models.base import Base
+
+
+class RunDatesModel(Base):
+    __tablename__ = "run_dates"
+
+    date = Column(String, primary_key=True)  # YYYY-MM-DD
+    status = Column(String, nullable=False)  # done / partial
+    doc_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
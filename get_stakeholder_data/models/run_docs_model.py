@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from get_stakeholder_data.models.base import Base
+
+
+class RunDocsModel(Base):
+    __tablename__ = "run_docs"
+
+    doc_id = Column(String, primary_key=True)
+    date = Column(String, nullable=False, index=True)  # 一覧を取得した日付
+    status = Column(String, nullable=False)  # in_flight / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
@@ -1,28 +1,175 @@
+import gzip
 import io
+import mmap
+import os
+import re
 import xml.etree.ElementTree as ET
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import IO, Dict, List, Optional, Tuple, Union
 
-from get_stakeholder_data.services.ai_parser import ai_parser
+from lxml import etree
+
+from get_stakeholder_data.services.ai_parser import (
+    ai_parser,
+    ai_parser_combined,
+    ai_parser_officers,
+    ai_parser_packed,
+)
+from get_stakeholder_data.services.logger import Logger
 from get_stakeholder_data.utils.process_text import clean_text, html_table_to_array
 from get_stakeholder_data.domain.director import Director
 from get_stakeholder_data.domain.shareholder import Shareholder
 
 
+logger = Logger()
+
+
 class ParsingError(Exception):
     """パーサーでのエラーを表すカスタム例外"""
 
     pass
 
 
+XbrlSource = Union[bytes, bytearray, memoryview, mmap.mmap, str, os.PathLike, IO[bytes]]
+
+# ストリームから読む単位（バイト）
+READ_SIZE = 64 * 1024
+
+
+class BufferReader:
+    """
+    バッファ（memoryview・mmap など）をコピーせずにストリームとして読む
+
+    read は元のバッファを参照する memoryview を返す。
+    """
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast("B")
+        self.pos = 0
+
+    def read(self, size: int = -1) -> memoryview:
+        end = len(self.view) if size is None or size < 0 else self.pos + size
+        chunk = self.view[self.pos : end]
+        self.pos += len(chunk)
+        return chunk
+
+
+# 抽出に使う要素のローカル名
+SHAREHOLDER_BLOCK = "MajorShareholdersTextBlock"
+OFFICER_BLOCKS = (
+    "InformationAboutOfficersTextBlock",
+    "InformationAboutDirectorsTextBlock",
+    "InformationAboutDirectorsAndCorporateAuditorsTextBlock",
+)
+OFFICER_NAME = "NameInformationAboutDirectorsAndCorporateAuditors"
+OFFICER_TITLE = "OfficialTitleOrPositionInformationAboutDirectorsAndCorporateAuditors"
+OFFICER_BIRTH = "DateOfBirthInformationAboutDirectorsAndCorporateAuditors"
+TARGET_TAGS = frozenset(
+    (SHAREHOLDER_BLOCK, *OFFICER_BLOCKS, OFFICER_NAME, OFFICER_TITLE, OFFICER_BIRTH)
+)
+
+
+def scan_xbrl(
+    stream: IO[bytes],
+) -> Tuple[Dict[str, str], Dict[str, List[ET.Element]]]:
+    """
+    XBRLを1回だけ先頭から走査し、名前空間と抽出に使う要素（TARGET_TAGS）だけを集める
+
+    木全体は保持せず、ルート直下の要素は読み終えるたびに破棄するため、
+    メモリ使用量は文書の大きさによらずほぼ一定になる。
+
+    Returns:
+        tuple: (プレフィックス → URI, ローカル名 → 要素のリスト（文書順）)
+    """
+    namespaces: Dict[str, str] = {}
+    elements: Dict[str, List[ET.Element]] = defaultdict(list)
+    root = None
+    depth = 0
+    for event, node in ET.iterparse(stream, events=("start-ns", "start", "end")):
+        if event == "start-ns":
+            prefix, uri = node
+            namespaces[prefix] = uri
+        elif event == "start":
+            if root is None:
+                root = node
+            depth += 1
+        else:
+            depth -= 1
+            local = node.tag.rpartition("}")[2]
+            if local in TARGET_TAGS:
+                # 破棄される木から切り離して、タグ・属性・テキストだけを残す
+                element = ET.Element(node.tag, dict(node.attrib))
+                element.text = node.text
+                elements[local].append(element)
+            if depth == 1:
+                root.clear()
+    return namespaces, elements
+
+
+# XBRLの事実（fact）はルート直下にある。タクソノミの版ごとに名前空間URIが変わるため、
+# 名前空間を問わない {*} 付きのタグで、ルート直下の要素をC側で絞り込む
+_CHILD_TAGS = tuple(f"{{*}}{tag}" for tag in sorted(TARGET_TAGS))
+
+
+def scan_xbrl_lxml(
+    stream: IO[bytes],
+) -> Tuple[Dict[str, str], Dict[str, List[ET.Element]]]:
+    """
+    lxmlで木を構築し、ルート直下の抽出に使う要素を集める（scan_xbrl と同じ形で返す）
+
+    名前空間はルートで宣言されたものに、見つかった要素のプレフィックスを加える。
+    """
+    parser = etree.XMLParser(huge_tree=True, resolve_entities=False, no_network=True)
+    # lxmlはbytesしか受け取らないため、バッファはチャンク単位でだけコピーして渡す
+    for chunk in iter(lambda: stream.read(READ_SIZE), b""):
+        parser.feed(bytes(chunk))
+    root = parser.close()
+    namespaces = {prefix: uri for prefix, uri in root.nsmap.items() if prefix}
+    elements: Dict[str, List[ET.Element]] = defaultdict(list)
+    for node in root.iterchildren(*_CHILD_TAGS):
+        qname = etree.QName(node)
+        namespaces.setdefault(node.prefix, qname.namespace)
+        # 木全体を参照し続けないよう、タグ・属性・テキストだけを残す
+        element = ET.Element(node.tag, dict(node.attrib))
+        element.text = node.text
+        elements[qname.localname].append(element)
+    return namespaces, elements
+
+
+BACKENDS = {
+    "etree": scan_xbrl,
+    "lxml": scan_xbrl_lxml,
+}
+DEFAULT_BACKEND = "etree"
+
+
 class XbrlParser:
 
-    def __init__(self, xbrl_bytes: bytes):
-        self.xbrl_bytes = xbrl_bytes
-        self.root = ET.fromstring(xbrl_bytes)
-        # 全プレフィックスとURIを取得
-        self.namespaces = dict(
-            node
-            for _, node in ET.iterparse(io.BytesIO(xbrl_bytes), events=["start-ns"])
-        )
+    def __init__(self, xbrl_bytes: XbrlSource, backend: Optional[str] = None):
+        """
+        Args:
+            xbrl_bytes: XBRLファイルのバイナリデータ（bytes・memoryview・mmap などのバッファ）、
+                ファイルのパス（.gz は展開しながら読む）、または読み取り用ストリーム（巻き戻せなくてよい）。
+                バッファ・パスは文書全体をPythonのヒープにコピーせずに読む
+            backend (str): etree（1回の走査、省メモリ）または lxml
+                （省略時は環境変数 XBRL_PARSER_BACKEND、既定は etree）
+        """
+        backend = backend or os.getenv("XBRL_PARSER_BACKEND", DEFAULT_BACKEND)
+        if backend not in BACKENDS:
+            raise ValueError(f"不明なXBRLパーサーです: {backend}")
+        scan = BACKENDS[backend]
+        if isinstance(xbrl_bytes, (str, os.PathLike)):
+            opener = gzip.open if os.fspath(xbrl_bytes).endswith(".gz") else open
+            with opener(xbrl_bytes, "rb") as f:
+                self.namespaces, self.elements = scan(f)
+        elif isinstance(xbrl_bytes, bytes):
+            # BytesIO は bytes を共有する（書き込まない限りコピーしない）
+            self.namespaces, self.elements = scan(io.BytesIO(xbrl_bytes))
+        elif isinstance(xbrl_bytes, (bytearray, memoryview, mmap.mmap)):
+            self.namespaces, self.elements = scan(BufferReader(xbrl_bytes))
+        else:
+            self.namespaces, self.elements = scan(xbrl_bytes)
 
         # 重要なタグが存在するプレフィックス（例：jpcrp_cor）を特定
         self.jp_prefix = self._detect_jp_namespace_prefix()
@@ -32,60 +179,64 @@ class XbrlParser:
         """
         MajorShareholdersTextBlock が存在するプレフィックスを探索
         """
+        tags = {element.tag for element in self.elements.get(SHAREHOLDER_BLOCK, [])}
         for prefix, uri in self.namespaces.items():
-            # プレフィックス付きでタグを探す
-            # print(prefix, uri)
-            if (
-                self.root.find(f".//{prefix}:MajorShareholdersTextBlock", {prefix: uri})
-                is not None
-            ):
+            if f"{{{uri}}}{SHAREHOLDER_BLOCK}" in tags:
                 return prefix
         raise ValueError("有効なMajorShareholdersTextBlockタグが見つかりませんでした")
 
-    def extract_officer_block(self):
+    def _findall(self, local: str, context_ref: Optional[str] = None) -> List[ET.Element]:
         """
-        XBRLルートから役員情報TextBlockを抽出する（柔軟対応）
+        jp_prefix の名前空間の要素を文書順に返す（context_ref を指定した場合はそのコンテキストのみ）
         """
-        candidates = [
-            "InformationAboutOfficersTextBlock",
-            "InformationAboutDirectorsTextBlock",
-            "InformationAboutDirectorsAndCorporateAuditorsTextBlock",
+        tag = f"{{{self.ns[self.jp_prefix]}}}{local}"
+        return [
+            element
+            for element in self.elements.get(local, [])
+            if element.tag == tag
+            and (context_ref is None or element.get("contextRef") == context_ref)
         ]
-        for tag in candidates:
-            el = self.root.findall(
-                f'.//{self.jp_prefix}:{tag}[@contextRef="FilingDateInstant"]',
-                self.ns,
-            )
+
+    def extract_officer_block(self):
+        """
+        XBRLから役員情報TextBlockを抽出する（柔軟対応）
+        """
+        for tag in OFFICER_BLOCKS:
+            el = self._findall(tag, "FilingDateInstant")
             if len(el) > 0 and el[0].text:
                 return el
         return []
 
     def get_directors_and_auditors(self):
+        """
+        役員情報をLLMを使わずに抽出する
+
+        氏名・役職名・生年月日はXBRLの要素から、略歴・所有株式数は役員の状況の表から取得する。
+        表の役員の行（生年月日の列に日付があるもの）と要素の数が一致しない場合は ParsingError。
+        """
         try:
             # 役員
-            names = self.root.findall(
-                ".//jp:NameInformationAboutDirectorsAndCorporateAuditors", self.ns
-            )
-            titles = self.root.findall(
-                ".//jp:OfficialTitleOrPositionInformationAboutDirectorsAndCorporateAuditors",
-                self.ns,
-            )
-            births = self.root.findall(
-                ".//jp:DateOfBirthInformationAboutDirectorsAndCorporateAuditors",
-                self.ns,
-            )
-            # information_table = self.root.findall(
-            #     './/jp:InformationAboutdirectorsTextBlock[@contextRef="FilingDateInstant"]',
-            #     self.ns,
-            # )
+            names = self._findall(OFFICER_NAME)
+            titles = self._findall(OFFICER_TITLE)
+            births = self._findall(OFFICER_BIRTH)
             information_table = self.extract_officer_block()
+            if not information_table:
+                return []
             information_table = html_table_to_array(information_table[0].text)
+            # 見出し・合計の行を除く
+            information_rows = [
+                row
+                for row in information_table
+                if len(row) >= 6 and re.search(r"\d+年", row[2])
+            ]
+            if not (len(names) == len(titles) == len(births) == len(information_rows)):
+                raise ParsingError(
+                    f"役員の人数が一致しません（要素:{len(names)}件 表:{len(information_rows)}件）"
+                )
             directors = []
             for name, title, birth, information_row in zip(
-                names, titles, births, information_table
+                names, titles, births, information_rows
             ):
-                if len(information_row) < 4:
-                    continue
                 directors.append(
                     Director(
                         name=clean_text(name.text),  # 氏名
@@ -100,15 +251,19 @@ class XbrlParser:
             raise ParsingError(f"役員情報のパースに失敗しました: {e}")
 
     def get_major_shareholders(self):
+        """
+        大株主情報をLLMを使わずに抽出する（見出しの行は除き、「計」の行は含める）
+        """
         try:
-            block = self.root.find(".//jp:MajorShareholdersTextBlock", self.ns)
-            if block is None or not block.text:
+            text = self.get_major_shareholders_text()
+            if text is None:
                 return []
 
-            information_table = html_table_to_array(block.text)
+            information_table = html_table_to_array(text)
             shareholders = []
             for row in information_table:
-                if len(row) < 4:
+                # 所有株式数の列に数字がない行は見出し
+                if len(row) < 4 or not re.search(r"\d", row[2]):
                     continue
                 shareholders.append(
                     Shareholder(
@@ -123,14 +278,21 @@ class XbrlParser:
         except Exception as e:
             raise ParsingError(f"株主情報のパースに失敗しました: {e}")
 
+    def get_major_shareholders_text(self):
+        """
+        大株主の状況のTextBlockの内容を返す（ない場合は None）
+        """
+        blocks = self._findall(SHAREHOLDER_BLOCK)
+        if not blocks or not blocks[0].text:
+            return None
+        return blocks[0].text
+
     def get_major_shareholders_by_llm(self):
         try:
-            block = self.root.find(
-                f".//{self.jp_prefix}:MajorShareholdersTextBlock", self.ns
-            )
-            if block is None or not block.text:
+            text = self.get_major_shareholders_text()
+            if text is None:
                 return []
-            json_data = ai_parser(block.text, "shareholder_prompt.txt")
+            json_data = ai_parser(text, "shareholder_prompt.txt")
             return json_data
         except Exception as e:
             raise ParsingError(f"株主情報のパースに失敗しました: {e}")
@@ -140,7 +302,131 @@ class XbrlParser:
             block = self.extract_officer_block()
             if block is None or not block[0].text:
                 return []
-            json_data = ai_parser(block[0].text, "officer_prompt.txt")
+            json_data = ai_parser_officers(block[0].text)
             return json_data
         except Exception as e:
             raise ParsingError(f"役員情報のパースに失敗しました: {e}")
+
+    def get_stakeholders_by_llm(self, combined: bool = True):
+        """
+        役員情報・株主情報をLLMで抽出する
+
+        combined が True の場合は両方のTextBlockを1回の呼び出しで抽出し、
+        応答がスキーマに合わない場合はTextBlockごとの呼び出しにフォールバックする。
+        役員のTextBlockが分割の対象になる大きさの場合は、一括では呼び出さずに個別に抽出する。
+
+        Returns:
+            tuple: (役員の状況, 大株主の状況)
+        """
+        if combined:
+            try:
+                officer_block = self.extract_officer_block()
+                shareholder_text = self.get_major_shareholders_text()
+                if officer_block and officer_block[0].text and shareholder_text:
+                    result = ai_parser_combined(officer_block[0].text, shareholder_text)
+                    if result is not None:
+                        return result
+                    logger.warning(
+                        "役員・株主情報の一括抽出に失敗したため個別に抽出します"
+                    )
+            except Exception as e:
+                raise ParsingError(f"役員・株主情報のパースに失敗しました: {e}")
+
+        return self.get_major_officers_by_llm(), self.get_major_shareholders_by_llm()
+
+    def to_parsed(self) -> "ParsedXbrl":
+        """
+        抽出に使うTextBlockと表から取り出した行だけを ParsedXbrl にまとめる
+        """
+        officer_block = self.extract_officer_block()
+        parsed = ParsedXbrl(
+            jp_prefix=self.jp_prefix,
+            officer_block=officer_block[0].text if officer_block else None,
+            shareholder_text=self.get_major_shareholders_text(),
+        )
+        try:
+            parsed.directors = self.get_directors_and_auditors()
+        except ParsingError as e:
+            parsed.directors_error = str(e)
+        try:
+            parsed.shareholders = self.get_major_shareholders()
+        except ParsingError as e:
+            parsed.shareholders_error = str(e)
+        return parsed
+
+
+@dataclass
+class ParsedXbrl:
+    """
+    XbrlParser の抽出結果（TextBlockと表の行だけを持ち、プロセス間で受け渡せる）
+
+    XbrlParser と同じメソッドを持つため、StakeholderExtractor にそのまま渡せる。
+    """
+
+    jp_prefix: str
+    officer_block: Optional[str] = None
+    shareholder_text: Optional[str] = None
+    directors: List[Director] = field(default_factory=list)
+    shareholders: List[Shareholder] = field(default_factory=list)
+    directors_error: Optional[str] = None  # 表の解析に失敗した場合の ParsingError の内容
+    shareholders_error: Optional[str] = None
+
+    def extract_officer_block(self):
+        if not self.officer_block:
+            return []
+        element = ET.Element(OFFICER_BLOCKS[0])
+        element.text = self.officer_block
+        return [element]
+
+    def get_directors_and_auditors(self):
+        if self.directors_error is not None:
+            raise ParsingError(self.directors_error)
+        return self.directors
+
+    def get_major_shareholders(self):
+        if self.shareholders_error is not None:
+            raise ParsingError(self.shareholders_error)
+        return self.shareholders
+
+    def get_major_shareholders_text(self):
+        return self.shareholder_text
+
+    # LLMでの抽出はTextBlockだけを使うため XbrlParser と共通
+    get_major_shareholders_by_llm = XbrlParser.get_major_shareholders_by_llm
+    get_major_officers_by_llm = XbrlParser.get_major_officers_by_llm
+    get_stakeholders_by_llm = XbrlParser.get_stakeholders_by_llm
+
+
+def get_major_shareholders_by_llm_packed(parsers):
+    """
+    複数文書の大株主情報をLLMの1回の呼び出しでまとめて抽出する
+
+    Args:
+        parsers (dict): 文書番号 → XbrlParser
+
+    Returns:
+        dict: 文書番号 → 大株主の状況（TextBlockがない文書は []、抽出できなかった文書は ParsingError）
+    """
+    results = {}
+    blocks = {}
+    for doc_id, parser in parsers.items():
+        text = parser.get_major_shareholders_text()
+        if text is None:
+            results[doc_id] = []
+        else:
+            blocks[doc_id] = text
+    if not blocks:
+        return results
+
+    try:
+        packed = ai_parser_packed(blocks)
+    except Exception as e:
+        error = ParsingError(f"株主情報のパースに失敗しました: {e}")
+        return {**results, **{doc_id: error for doc_id in blocks}}
+
+    for doc_id in blocks:
+        if packed.get(doc_id) is None:
+            results[doc_id] = ParsingError("株主情報のパースに失敗しました")
+        else:
+            results[doc_id] = packed[doc_id]
+    return results
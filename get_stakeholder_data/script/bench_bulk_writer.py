@@ -0,0 +1,117 @@
+import argparse
+import os
+import tempfile
+import time
+
+# ベンチマークは一時DBに書き込むため、アプリのDB設定は不要
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.interface.bulk_writer import BulkWriter
+from get_stakeholder_data.interface.database import create_db_engine
+from get_stakeholder_data.models.base import Base
+from get_stakeholder_data.services.store import save_document
+
+
+def make_documents(count: int, directors: int = 15, shareholders: int = 10):
+    """
+    有報1件あたりの役員・大株主の件数を模したダミーデータを作成する
+    """
+    documents = []
+    for i in range(count):
+        doc = Doc(
+            doc_id=f"S{i:07d}",
+            sec_code="12345",
+            filer_name="テスト株式会社",
+            period_start="2024-04-01",
+            period_end="2025-03-31",
+            submit_datetime="2025-06-20 15:00",
+            doc_description="有価証券報告書－第100期(2024/04/01－2025/03/31)",
+        )
+        docs_directors = [
+            Director(
+                name=f"役員 {j}",
+                title="取締役",
+                birth_date="1960年1月1日生",
+                biography="1983年4月 当社入社 " * 10,
+                shares_owned="10",
+            )
+            for j in range(directors)
+        ]
+        docs_shareholders = [
+            Shareholder(
+                name=f"株主 {j}",
+                address="東京都千代田区",
+                shares_held="1,000",
+                ownership_ratio="5.00",
+            )
+            for j in range(shareholders)
+        ]
+        documents.append((doc, docs_directors, docs_shareholders))
+    return documents
+
+
+def bench_orm(url: str, documents) -> float:
+    """
+    変更前: ORMで1行ずつ追加し、文書ごとにコミットする
+    """
+    engine = create_engine(url, future=True)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, future=True)()
+    started = time.perf_counter()
+    for doc, directors, shareholders in documents:
+        save_document(session, doc, directors, shareholders)
+        session.commit()
+    elapsed = time.perf_counter() - started
+    session.close()
+    engine.dispose()
+    return elapsed
+
+
+def bench_bulk(url: str, documents, batch_size: int) -> float:
+    """
+    変更後: PRAGMAを設定したエンジンで batch_size 件ずつ一括INSERTする
+    """
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    writer = BulkWriter(engine, batch_size=batch_size)
+    started = time.perf_counter()
+    for doc, directors, shareholders in documents:
+        writer.add(doc, directors, shareholders)
+    writer.flush()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="DB書き込みのベンチマーク")
+    arg_parser.add_argument("--docs", type=int, default=500, help="文書数")
+    arg_parser.add_argument("--batch-size", type=int, default=50, help="バッチサイズ")
+    args = arg_parser.parse_args()
+
+    documents = make_documents(args.docs)
+    rows = sum(1 + len(d) + len(s) for _, d, s in documents)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        orm = bench_orm(f"sqlite:///{os.path.join(tmp, 'orm.db')}", documents)
+        bulk = bench_bulk(
+            f"sqlite:///{os.path.join(tmp, 'bulk.db')}", documents, args.batch_size
+        )
+
+    print(f"文書数: {args.docs} 行数: {rows}")
+    print(f"ORM（1件ずつコミット）: {orm:.2f}秒 {rows / orm:,.0f}行/秒")
+    print(
+        f"一括INSERT（{args.batch_size}件ごとにコミット・WAL）: "
+        f"{bulk:.2f}秒 {rows / bulk:,.0f}行/秒"
+    )
+    print(f"高速化: {orm / bulk:.1f}倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import glob
+import gzip
+import html
+import time
+
+from get_stakeholder_data.parser.xbrl_parser import XbrlParser
+from get_stakeholder_data.utils.process_text import (
+    html_table_to_array,
+    html_table_to_array_soup,
+)
+
+
+def make_officer_block(officers: int = 20) -> str:
+    """
+    役員の状況のTextBlockを模したダミーデータを作成する（XBRLと同じくエスケープ済み）
+    """
+    row = (
+        '<tr><td style="text-align: left"><p style="margin: 0">代表取締役<br/>社長</p></td>'
+        '<td><p style="margin: 0">山田　太郎</p></td><td><p>1960年1月1日生</p></td><td>'
+        + "".join(f"<p>{1983 + i}年4月</p><p>当社入社</p>" for i in range(8))
+        + "</td><td><p>(注)3</p></td><td><p>120</p></td></tr>"
+    )
+    block = (
+        '<p style="margin: 0"><span>男性 10名 女性 2名</span></p>'
+        '<table style="width: 100%"><colgroup><col/><col/></colgroup><tbody>'
+        + row * officers
+        + "</tbody></table>"
+    )
+    return html.escape(block, quote=False)
+
+
+def load_blocks(pattern: str):
+    """
+    XBRLファイル（*.xbrl.gz も可）から役員・大株主のTextBlockを取り出す
+    """
+    blocks = []
+    for path in sorted(glob.glob(pattern)):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            parser = XbrlParser(f)
+        officer_block = parser.extract_officer_block()
+        if officer_block:
+            blocks.append(officer_block[0].text)
+        shareholder_text = parser.get_major_shareholders_text()
+        if shareholder_text:
+            blocks.append(shareholder_text)
+    return blocks
+
+
+def measure(func, blocks, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for block in blocks:
+            func(block)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="HTMLの表の変換のベンチマーク")
+    arg_parser.add_argument(
+        "--files", help="TextBlockを取り出すXBRLファイルのglob（省略時はダミーデータ）"
+    )
+    arg_parser.add_argument("--blocks", type=int, default=100, help="ダミーのTextBlock数")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数")
+    args = arg_parser.parse_args()
+
+    blocks = load_blocks(args.files) if args.files else [make_officer_block()] * args.blocks
+    mismatches = sum(
+        1 for block in blocks if html_table_to_array(block) != html_table_to_array_soup(block)
+    )
+
+    soup = measure(html_table_to_array_soup, blocks, args.repeat)
+    fast = measure(html_table_to_array, blocks, args.repeat)
+    print(f"TextBlock数: {len(blocks)} 結果の不一致: {mismatches}")
+    print(f"BeautifulSoup: {soup:.2f}秒 {len(blocks) / soup:,.0f}件/秒")
+    print(f"lxml（XHTML）: {fast:.2f}秒 {len(blocks) / fast:,.0f}件/秒")
+    print(f"高速化: {soup / fast:.1f}倍")
+
+
+if __name__ == "__main__":
+    main()
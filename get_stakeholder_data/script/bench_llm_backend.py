@@ -0,0 +1,103 @@
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from get_stakeholder_data.services.ai_parser import SHAREHOLDER_PROMPT, GeminiExtractor
+from get_stakeholder_data.services.llm_backend import ReplayBackend
+from get_stakeholder_data.services.rate_limiter import RateLimiter
+
+
+def make_blocks(count: int, rows: int = 10):
+    """
+    大株主の状況のTextBlockを模したダミーデータを作成する（文書ごとに内容を変える）
+    """
+    blocks = []
+    for i in range(count):
+        cells = "".join(
+            f"<tr><td>株主 {i}-{j}</td><td>東京都千代田区</td><td>1,000</td><td>5.00</td></tr>"
+            for j in range(rows)
+        )
+        blocks.append(f"<p>2025年3月31日現在</p><table>{cells}</table>")
+    return blocks
+
+
+def synthetic_response(rows: int = 10):
+    """
+    記録がないプロンプトに返す、検証を通る大株主の応答
+    """
+    text = json.dumps(
+        {
+            "大株主の状況": {
+                "date": "2025年3月31日現在",
+                "data": [
+                    {
+                        "氏名又は名称": f"株主 {j}",
+                        "住所": "東京都千代田区",
+                        "所有株式数(千株)": "1,000",
+                        "所有割合(％)": "5.00",
+                    }
+                    for j in range(rows)
+                ],
+            }
+        },
+        ensure_ascii=False,
+    )
+    return f"```json\n{text}\n```"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="記録済み応答を返すLLMバックエンドでの抽出スループットのベンチマーク"
+    )
+    arg_parser.add_argument("--docs", type=int, default=200, help="文書数")
+    arg_parser.add_argument("--workers", type=int, default=8, help="並行数")
+    arg_parser.add_argument("--recordings", help="RecordingBackend で記録したJSONL")
+    arg_parser.add_argument("--latency", type=float, default=0.5, help="応答の遅延（秒）")
+    arg_parser.add_argument("--jitter", type=float, default=0.2, help="遅延のばらつき（秒）")
+    arg_parser.add_argument("--error-502", type=float, default=0.0, help="502 の発生率")
+    arg_parser.add_argument("--error-503", type=float, default=0.02, help="503 の発生率")
+    arg_parser.add_argument("--error-429", type=float, default=0.01, help="429 の発生率")
+    arg_parser.add_argument("--server-rpm", type=int, help="バックエンド側のRPM上限")
+    arg_parser.add_argument("--rpm", type=float, help="クライアント側のRPM予算")
+    arg_parser.add_argument("--tpm", type=float, help="クライアント側のTPM予算")
+    arg_parser.add_argument("--stream", action="store_true", help="ストリーミングで受け取る")
+    arg_parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = arg_parser.parse_args()
+
+    options = dict(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rates={429: args.error_429, 502: args.error_502, 503: args.error_503},
+        rpm=args.server_rpm,
+        default=synthetic_response(),
+        seed=args.seed,
+    )
+    if args.recordings:
+        backend = ReplayBackend.load(args.recordings, **options)
+    else:
+        backend = ReplayBackend(**options)
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    extractor = GeminiExtractor(
+        use_cache=False, limiter=limiter, stream=args.stream, backend=backend
+    )
+
+    blocks = make_blocks(args.docs)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(
+            pool.map(lambda block: extractor.extract(block, SHAREHOLDER_PROMPT), blocks)
+        )
+    elapsed = time.perf_counter() - started
+
+    succeeded = sum(1 for result in results if result is not None)
+    errors = " ".join(f"{code}:{n}" for code, n in sorted(backend.errors.items()))
+    print(f"文書数: {args.docs} 並行数: {args.workers} 遅延: {args.latency}秒")
+    print(f"経過時間: {elapsed:.2f}秒 スループット: {succeeded / elapsed * 60:,.0f}件/分")
+    print(f"成功: {succeeded} 失敗: {args.docs - succeeded}")
+    print(f"呼び出し: {backend.calls} エラー: {errors or 'なし'}")
+    print(f"レート制限による待機: {limiter.waited_seconds:.1f}秒")
+
+
+if __name__ == "__main__":
+    main()
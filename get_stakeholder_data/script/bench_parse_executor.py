@@ -0,0 +1,85 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from get_stakeholder_data.parser.xbrl_parser import XbrlParser
+from get_stakeholder_data.script.bench_html_table import make_officer_block
+from get_stakeholder_data.script.bench_xbrl_parser import make_xbrl
+from get_stakeholder_data.services.parse_executor import ParseExecutor
+
+
+def make_files(directory: str, count: int, facts: int):
+    """
+    役員の状況の表を含むダミーのXBRLファイルを count 件作成する
+    """
+    data = make_xbrl(facts).replace(
+        b"</xbrli:xbrl>",
+        b'<jpcrp_cor:InformationAboutDirectorsTextBlock contextRef="FilingDateInstant">'
+        + make_officer_block(40).encode("utf-8")
+        + b"</jpcrp_cor:InformationAboutDirectorsTextBlock></xbrli:xbrl>",
+    )
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"S{i:07d}.xbrl")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def run_serial(paths):
+    started = time.perf_counter()
+    for path in paths:
+        XbrlParser(path).to_parsed()
+    return time.perf_counter() - started
+
+
+def run_pool(paths, workers: int):
+    with ParseExecutor(workers) as executor:
+        # プロセスの起動を計測に含めないよう、先に1件ずつ処理させておく
+        list(executor.map(paths[:workers]))
+        started = time.perf_counter()
+        list(executor.map(paths))
+        elapsed = time.perf_counter() - started
+    return elapsed, executor
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="XBRLの並列パースのベンチマーク")
+    arg_parser.add_argument(
+        "--files", help="計測に使うXBRLファイルのglob（*.xbrl.gz も可、省略時はダミーデータ）"
+    )
+    arg_parser.add_argument("--count", type=int, default=40, help="ダミーのファイル数")
+    arg_parser.add_argument("--facts", type=int, default=5000, help="ダミーの要素数")
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="計測するワーカープロセス数",
+    )
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (
+            sorted(glob.glob(args.files))
+            if args.files
+            else make_files(tmp, args.count, args.facts)
+        )
+        serial = run_serial(paths)
+        print(f"ファイル数: {len(paths)}")
+        print(f"  逐次（1プロセス）: {serial:.2f}秒 {len(paths) / serial:.1f}件/秒")
+        for workers in args.workers:
+            elapsed, executor = run_pool(paths, workers)
+            print(
+                f"  プロセス{workers}: {elapsed:.2f}秒 {len(paths) / elapsed:.1f}件/秒 "
+                f"({serial / elapsed:.1f}倍)"
+            )
+            for stats in executor.stats():
+                print(f"    {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
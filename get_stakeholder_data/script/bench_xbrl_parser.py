@@ -0,0 +1,134 @@
+import argparse
+import glob
+import gzip
+import io
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from get_stakeholder_data.parser.xbrl_parser import XbrlParser
+
+JPCRP = "http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2024-11-01/jpcrp_cor"
+JPPFS = "http://disclosure.edinet-fsa.go.jp/taxonomy/jppfs/2024-11-01/jppfs_cor"
+
+
+def make_xbrl(facts: int = 20000, block_chars: int = 50000) -> bytes:
+    """
+    有報のXBRLを模したダミーデータを作成する（数値の要素 facts 件と大きなTextBlock）
+    """
+    table = "&lt;tr&gt;&lt;td&gt;株主&lt;/td&gt;&lt;td&gt;東京都&lt;/td&gt;&lt;/tr&gt;"
+    block = table * (block_chars // len(table))
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" '
+        f'xmlns:jpcrp_cor="{JPCRP}" xmlns:jppfs_cor="{JPPFS}">',
+    ]
+    for i in range(facts):
+        parts.append(
+            f'<jppfs_cor:NetSales contextRef="CurrentYearDuration" unitRef="JPY" '
+            f'decimals="-6">{i * 1000000}</jppfs_cor:NetSales>'
+        )
+        if i % 500 == 0:
+            parts.append(
+                f'<jpcrp_cor:OtherTextBlock contextRef="FilingDateInstant">{block}'
+                "</jpcrp_cor:OtherTextBlock>"
+            )
+    parts.append(
+        '<jpcrp_cor:InformationAboutOfficersTextBlock contextRef="FilingDateInstant">'
+        f"{block}</jpcrp_cor:InformationAboutOfficersTextBlock>"
+    )
+    parts.append(
+        '<jpcrp_cor:MajorShareholdersTextBlock contextRef="CurrentYearInstant">'
+        f"{block}</jpcrp_cor:MajorShareholdersTextBlock>"
+    )
+    parts.append("</xbrli:xbrl>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def parse_twice(data: bytes):
+    """
+    変更前: 木全体を構築し、名前空間の収集のためにもう一度走査して、プレフィックスごとに全体を検索する
+    """
+    root = ET.parse(io.BytesIO(data)).getroot()
+    namespaces = dict(
+        node for _, node in ET.iterparse(io.BytesIO(data), events=["start-ns"])
+    )
+    for prefix, uri in namespaces.items():
+        block = root.find(f".//{prefix}:MajorShareholdersTextBlock", {prefix: uri})
+        if block is not None:
+            return block.text
+    return None
+
+
+def parse_etree(data: bytes):
+    """
+    ElementTreeで1回だけ走査し、名前空間と必要な要素だけを集める
+    """
+    return XbrlParser(data, backend="etree").get_major_shareholders_text()
+
+
+def parse_lxml(data: bytes):
+    """
+    lxmlで木を構築し、ルート直下の必要な要素を集める
+    """
+    return XbrlParser(data, backend="lxml").get_major_shareholders_text()
+
+
+def measure(func, data: bytes, repeat: int):
+    """
+    平均の処理時間と、Pythonのオブジェクトのピークメモリを計測する
+
+    tracemalloc はC側で確保したメモリ（lxmlの木）を計測しないため、lxml のメモリは参考値。
+    """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="XBRLのパースのベンチマーク（変更前・ElementTree・lxml）"
+    )
+    arg_parser.add_argument(
+        "--files", help="計測に使うXBRLファイルのglob（*.xbrl.gz も可、省略時はダミーデータ）"
+    )
+    arg_parser.add_argument("--facts", type=int, default=20000, help="ダミーの要素数")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数")
+    args = arg_parser.parse_args()
+
+    if args.files:
+        documents = []
+        for path in sorted(glob.glob(args.files)):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rb") as f:
+                documents.append(f.read())
+    else:
+        documents = [make_xbrl(args.facts)]
+
+    candidates = [
+        ("2回パース（変更前）", parse_twice),
+        ("ElementTree 1回走査", parse_etree),
+        ("lxml", parse_lxml),
+    ]
+    for data in documents:
+        expected = parse_twice(data)
+        assert parse_etree(data) == expected and parse_lxml(data) == expected
+        print(f"サイズ: {len(data) / 1e6:.1f}MB")
+        baseline = None
+        for label, func in candidates:
+            elapsed, peak = measure(func, data, args.repeat)
+            baseline = baseline or elapsed
+            print(
+                f"  {label}: {elapsed * 1000:.0f}ms "
+                f"({baseline / elapsed:.1f}倍) ピークメモリ {peak / 1e6:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
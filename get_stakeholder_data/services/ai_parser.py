@@ -1,86 +1,710 @@
 import json
 import os
 from pathlib import Path
+import random
 import re
-from dotenv import load_dotenv
-from typing import Any, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from google import genai
 from google.genai.errors import APIError
 
+from get_stakeholder_data.services.json_stream import (
+    JsonStreamParser,
+    MalformedStreamError,
+    TruncatedStreamError,
+)
+from get_stakeholder_data.services.llm_backend import (
+    MODEL_NAME,
+    GeminiBackend,
+    LlmBackend,
+    Usage,
+    create_backend,
+)
+from get_stakeholder_data.services.llm_cache import LlmCache, get_llm_cache
+from get_stakeholder_data.services.llm_metrics import (
+    LlmCallRecord,
+    LlmMetrics,
+    current_doc_id,
+    doc_context,
+    get_llm_metrics,
+)
 from get_stakeholder_data.services.logger import Logger
-import time
+from get_stakeholder_data.services.rate_limiter import (
+    RateLimiter,
+    estimate_tokens,
+    get_rate_limiter,
+)
+from get_stakeholder_data.services.store import (
+    OFFICER_FIELDS,
+    OFFICER_ID_FIELDS,
+    SHAREHOLDER_FIELDS,
+    is_valid_row,
+    is_valid_section,
+    merge_sections,
+    split_combined,
+)
+from get_stakeholder_data.utils.process_text import compact_block, split_table_rows
 
 logger = Logger()
 
+# 役員・大株主を1回で抽出するプロンプト
+COMBINED_PROMPT = "combined_prompt.txt"
+SHAREHOLDER_PROMPT = "shareholder_prompt.txt"
+OFFICER_PROMPT = "officer_prompt.txt"
+# 複数文書の大株主をまとめて抽出するプロンプト
+SHAREHOLDER_PACK_PROMPT = "shareholder_pack_prompt.txt"
+# ストリーミング時に、閉じた行ごとに検証する項目（プロンプトごと）
+ROW_FIELDS = {OFFICER_PROMPT: OFFICER_FIELDS, SHAREHOLDER_PROMPT: SHAREHOLDER_FIELDS}
 
-def load_prompt_template(filename: str, **kwargs) -> str:
+# リトライ対象のステータス（クォータ超過とサーバーエラー）
+RETRY_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 2.0  # 秒
+BACKOFF_MAX = 120.0  # 秒
+
+# 役員のTextBlockを分割して抽出する設定（圧縮後の文字数・チャンク間で重ねる行数・並行数）
+CHUNK_CHARS = 12000
+CHUNK_OVERLAP = 1
+CHUNK_CONCURRENCY = 4
+
+
+PROMPT_DIR = Path(__file__).resolve().parents[1] / "prompts"  # プロジェクトルート/prompts
+
+
+def read_prompt_template(filename: str, prompt_dir: Path = PROMPT_DIR) -> str:
     """
-    指定されたテンプレートファイルを読み込み、変数を埋め込んで返す
+    指定されたテンプレートファイルを変数を埋め込まずに読み込む
     """
-    base_dir = Path(__file__).resolve().parents[1]  # プロジェクトルート
-    prompt_path = base_dir / "prompts" / filename
+    prompt_path = Path(prompt_dir) / filename
 
     with open(prompt_path, encoding="utf-8") as f:
-        template = f.read()
-    return template.format(**kwargs)
+        return f.read()
 
 
-def ai_parser(xml_data: str, prompt_filename: str) -> Optional[Dict[str, Any]]:
+def load_prompt_template(filename: str, **kwargs) -> str:
     """
-    Gemini APIを使って大株主情報のJSONデータを辞書で返す。
+    指定されたテンプレートファイルを読み込み、変数を埋め込んで返す
+    """
+    return read_prompt_template(filename).format(**kwargs)
 
-    Returns:
-        dict: パース済みのデータ（辞書形式）。失敗時は None。
+
+@dataclass
+class CompactionStats:
+    """
+    TextBlockの圧縮前後の推定トークン数の累計
     """
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
 
-    if not api_key:
-        raise ValueError("GEMINI_API_KEYが設定されていません")
+    calls: int = 0
+    raw_tokens: int = 0
+    compacted_tokens: int = 0
 
-    prompt = load_prompt_template(prompt_filename, xml_data=xml_data)
+    @property
+    def saved_tokens(self) -> int:
+        return self.raw_tokens - self.compacted_tokens
 
-    max_retries = 3
-    retry_delay = 60  # 秒
+    @property
+    def saved_rate(self) -> float:
+        return self.saved_tokens / self.raw_tokens if self.raw_tokens else 0.0
 
-    for attempt in range(1, max_retries + 1):
+    def summary(self) -> str:
+        return (
+            f"プロンプト圧縮 - 呼び出し:{self.calls} "
+            f"トークン:{self.raw_tokens} -> {self.compacted_tokens} "
+            f"(削減率:{self.saved_rate:.1%})"
+        )
+
+
+class GeminiExtractor:
+    """
+    Gemini APIでTextBlockから構造化データを抽出する長寿命のオブジェクト
+
+    設定の読み込み・プロンプトテンプレートの読み込み・クライアントの作成は初期化時に一度だけ行い、
+    以降の呼び出しでは同じクライアント（コネクションを再利用する）を使う。
+    状態を持たないため、複数のスレッドや asyncio.to_thread から共有して呼び出せる。
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = MODEL_NAME,
+        cache: Optional[LlmCache] = None,
+        use_cache: bool = True,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        prompt_dir: Path = PROMPT_DIR,
+        compact: bool = True,
+        stream: bool = False,
+        backend: Optional[LlmBackend] = None,
+        metrics: Optional[LlmMetrics] = None,
+        chunk_chars: Optional[int] = CHUNK_CHARS,
+        chunk_concurrency: int = CHUNK_CONCURRENCY,
+    ):
+        """
+        Args:
+            api_key (str): Gemini APIキー（省略時は環境変数 GEMINI_API_KEY）
+            model (str): 使用するモデル名
+            cache (LlmCache): 抽出結果のキャッシュ（省略時は共有キャッシュ）
+            use_cache (bool): False の場合はキャッシュを使わない
+            limiter (RateLimiter): レートリミッター（省略時は共有のリミッター）
+            max_retries (int): 最大試行回数
+            prompt_dir (Path): プロンプトテンプレートのディレクトリ
+            compact (bool): TextBlockのHTMLをTSVなどの最小限のテキストに圧縮してから送る
+            stream (bool): 応答をストリーミングで受け取り、逐次解析する
+            backend (LlmBackend): LLMの呼び出し先（省略時は Gemini API。model はバックエンドのものを使う）
+            metrics (LlmMetrics): 呼び出しごとの記録の集計先（省略時は共有のメトリクス）
+            chunk_chars (int): 役員のTextBlockが圧縮後にこの文字数を超えたら表の行で分割する（None なら分割しない）
+            chunk_concurrency (int): 分割したチャンクを並行に抽出する数
+
+        Raises:
+            ValueError: APIキーが設定されていない場合
+        """
+        self.backend = backend or GeminiBackend(api_key, model)
+        # キャッシュキーにはバックエンドのモデル名を使う（記録の再生結果が混ざらない）
+        self.model = self.backend.model
+        self.use_cache = use_cache
+        self.cache = (cache or get_llm_cache()) if use_cache else None
+        self.limiter = limiter or get_rate_limiter()
+        self.metrics = metrics or get_llm_metrics()
+        self.chunk_chars = chunk_chars
+        self.chunk_concurrency = chunk_concurrency
+        self.max_retries = max_retries
+        self.compact = compact
+        self.stream = stream
+        self.compaction = CompactionStats()
+        self._stats_lock = threading.Lock()
+        # テンプレートはすべて読み込んでおく（呼び出しごとにファイルを読まない）
+        self.templates = {
+            path.name: read_prompt_template(path.name, prompt_dir)
+            for path in sorted(Path(prompt_dir).glob("*.txt"))
+        }
+
+    def template(self, prompt_filename: str) -> str:
         try:
-            client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-lite",
-                contents=prompt,
+            return self.templates[prompt_filename]
+        except KeyError:
+            raise ValueError(f"プロンプトテンプレートが見つかりません: {prompt_filename}")
+
+    def extract(self, xml_data: str, prompt_filename: str) -> Optional[Dict[str, Any]]:
+        """
+        TextBlockをプロンプトに埋め込んで抽出し、JSONを辞書で返す
+
+        Returns:
+            dict: パース済みのデータ（辞書形式）。JSONのパースに失敗した場合は None。
+
+        Raises:
+            APIError: リトライしても失敗した場合、またはリトライ対象外のエラーの場合
+        """
+        fields = self.compact_fields({"xml_data": xml_data})
+        return self.generate(prompt_filename, fields)
+
+    def extract_officers(self, xml_data: str) -> Optional[Dict[str, Any]]:
+        """
+        役員のTextBlockを抽出する
+
+        圧縮後のテキストが chunk_chars を超える場合は表の行の境目でチャンクに分け、
+        並行に抽出して順につなぐ（境目で重ねた行の重複は除く）。
+        1回の応答が出力トークンの上限で途切れて壊れることを避けるため。
+
+        Returns:
+            dict: {"役員の状況": ...}。いずれかのチャンクの抽出に失敗した場合は None。
+
+        Raises:
+            APIError: リトライしても失敗した場合、またはリトライ対象外のエラーの場合
+        """
+        return self._extract_officer_text(self.compact_fields({"xml_data": xml_data})["xml_data"])
+
+    def _extract_officer_text(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        圧縮済みの役員のTextBlockを、必要ならチャンクに分けて抽出する
+        """
+        chunks = (
+            split_table_rows(text, self.chunk_chars, CHUNK_OVERLAP)
+            if self._needs_split(text)
+            else [text]
+        )
+        if len(chunks) == 1:
+            return self.generate(OFFICER_PROMPT, {"xml_data": text})
+
+        logger.info(f"役員のTextBlockが大きいため {len(chunks)} 件に分割して抽出します ({len(text)}文字)")
+        workers = min(self.chunk_concurrency, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 文書番号（メトリクス用）をワーカーのスレッドに引き継ぐ
+            futures = [
+                pool.submit(
+                    copy_context().run,
+                    self.generate,
+                    OFFICER_PROMPT,
+                    {"xml_data": chunk},
+                    lambda r: is_valid_section(r, "役員の状況", OFFICER_FIELDS),
+                )
+                for chunk in chunks
+            ]
+            results = [future.result() for future in futures]
+
+        if any(result is None for result in results):
+            logger.warning("分割した役員のTextBlockの一部を抽出できませんでした")
+            return None
+        return merge_sections(results, "役員の状況", OFFICER_ID_FIELDS)
+
+    def _needs_split(self, text: str) -> bool:
+        return bool(self.compact and self.chunk_chars) and len(text) > self.chunk_chars
+
+    def extract_combined(
+        self, officer_data: str, shareholder_data: str
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        役員・大株主のTextBlockを1回の呼び出しで抽出し、それぞれの形に分けて返す
+
+        圧縮後の役員のTextBlockが chunk_chars を超える場合は、一括では呼び出さず
+        役員（チャンクに分割）と大株主を個別に抽出する。
+
+        Returns:
+            tuple: (役員の状況, 大株主の状況)。応答がスキーマに合わない場合は None。
+
+        Raises:
+            APIError: リトライしても失敗した場合、またはリトライ対象外のエラーの場合
+        """
+        fields = self.compact_fields(
+            {"officer_data": officer_data, "shareholder_data": shareholder_data}
+        )
+        if self._needs_split(fields["officer_data"]):
+            logger.info(
+                f"役員のTextBlockが大きいため一括抽出せず個別に抽出します "
+                f"({len(fields['officer_data'])}文字)"
             )
-            # Markdownコードブロック（```json ～ ```）を除去
-            cleaned_text = re.sub(
-                r"^```json\s*|\s*```$", "", response.text.strip(), flags=re.DOTALL
+            return (
+                self._extract_officer_text(fields["officer_data"]),
+                self.generate(SHAREHOLDER_PROMPT, {"xml_data": fields["shareholder_data"]}),
             )
-            return json.loads(cleaned_text)
+        result = self.generate(
+            COMBINED_PROMPT,
+            fields,
+            validate=lambda r: split_combined(r) is not None,
+        )
+        return split_combined(result) if result is not None else None
 
-        except APIError as e:  # API制限エラー
-            if e.code in {502, 503, 504}:
-                logger.warning(
-                    f"サーバーエラー {e.status_code}が発生しました。リトライ {attempt}/{max_retries}"
-                )
-                if attempt < max_retries:
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    logger.error(f"リトライ回数を超えました: {e}")
-                    raise SystemExit(
-                        "Gemini APIのサーバエラーにより、プログラムを終了します。"
-                    ) < e
+    def extract_packed(self, blocks: Dict[str, str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        複数文書の大株主のTextBlockを、文書ごとの区切りとIDを付けて1回の呼び出しで抽出する
+
+        応答をパースできない・一部の文書が欠けている場合は、失敗した文書だけを
+        まとめ直して（進展がなければ半分に分けて）再度抽出し、1件になったら通常の呼び出しを行う。
+
+        Args:
+            blocks (dict): 文書番号 → 大株主のTextBlock
+
+        Returns:
+            dict: 文書番号 → {"大株主の状況": ...}（抽出できなかった文書は None）
+
+        Raises:
+            APIError: リトライしても失敗した場合、またはリトライ対象外のエラーの場合
+        """
+        texts = {
+            doc_id: self.compact_fields({"xml_data": text})["xml_data"]
+            for doc_id, text in blocks.items()
+        }
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        template = self.template(SHAREHOLDER_PACK_PROMPT)
+        pending = []
+        for doc_id, text in texts.items():
+            cached = (
+                self.cache.get(text, SHAREHOLDER_PACK_PROMPT, template, self.model)
+                if self.use_cache
+                else None
+            )
+            if cached is not None:
+                results[doc_id] = cached
             else:
-                logger.error(f"Gemini APIの制限に達しました: {e}")
-                raise SystemExit(
-                    "Gemini APIの制限に達したため、プログラムを終了します。"
+                pending.append(doc_id)
+
+        self._extract_pack(pending, texts, results)
+        return results
+
+    def _extract_pack(
+        self,
+        doc_ids: List[str],
+        texts: Dict[str, str],
+        results: Dict[str, Optional[Dict[str, Any]]],
+    ) -> None:
+        if not doc_ids:
+            return
+        if len(doc_ids) == 1:
+            doc_id = doc_ids[0]
+            with doc_context(doc_id):
+                result = self.generate(
+                    SHAREHOLDER_PROMPT,
+                    {"xml_data": texts[doc_id]},
+                    validate=lambda r: is_valid_section(r, "大株主の状況", SHAREHOLDER_FIELDS),
                 )
+            results[doc_id] = result
+            if result is not None and self.use_cache:
+                # 次回の extract_packed のキャッシュの確認で見つかるよう、まとめたときのキーでも保存する
+                self.cache.put(
+                    texts[doc_id],
+                    SHAREHOLDER_PACK_PROMPT,
+                    self.template(SHAREHOLDER_PACK_PROMPT),
+                    self.model,
+                    result,
+                )
+            return
 
-        except json.JSONDecodeError as e:
-            logger.error(f"[JSON ERROR] パース失敗: {e}")
-            logger.error(f"[RAW OUTPUT] {response.text}")
-            return None
+        documents = "\n".join(
+            f"=== doc_id: {doc_id} ===\n{texts[doc_id]}\n=== end: {doc_id} ==="
+            for doc_id in doc_ids
+        )
+        with doc_context(",".join(doc_ids)):
+            response = self.generate(
+                SHAREHOLDER_PACK_PROMPT,
+                {"doc_ids": ", ".join(doc_ids), "documents": documents},
+                cacheable=False,
+            )
+
+        template = self.template(SHAREHOLDER_PACK_PROMPT)
+        failed = []
+        for doc_id in doc_ids:
+            result = _find_packed_document(response, doc_id)
+            if result is None:
+                failed.append(doc_id)
+                continue
+            results[doc_id] = result
+            if self.use_cache:
+                self.cache.put(
+                    texts[doc_id], SHAREHOLDER_PACK_PROMPT, template, self.model, result
+                )
+
+        if failed:
+            logger.warning(
+                f"まとめて抽出した {len(doc_ids)} 件のうち {len(failed)} 件に失敗したため分割して再抽出します"
+            )
+        if len(failed) == len(doc_ids):
+            # 進展がない場合は半分に分ける
+            half = len(failed) // 2
+            self._extract_pack(failed[:half], texts, results)
+            self._extract_pack(failed[half:], texts, results)
+        else:
+            self._extract_pack(failed, texts, results)
+
+    def compact_fields(self, fields: Dict[str, str]) -> Dict[str, str]:
+        """
+        TextBlockを圧縮し、圧縮前後の推定トークン数を記録する
+        """
+        if not self.compact:
+            return fields
+        compacted = {key: compact_block(value) for key, value in fields.items()}
+        raw_tokens = sum(estimate_tokens(v) for v in fields.values())
+        compacted_tokens = sum(estimate_tokens(v) for v in compacted.values())
+        with self._stats_lock:
+            self.compaction.calls += 1
+            self.compaction.raw_tokens += raw_tokens
+            self.compaction.compacted_tokens += compacted_tokens
+        logger.debug(
+            f"TextBlockを圧縮しました - トークン:{raw_tokens} -> {compacted_tokens}"
+        )
+        return compacted
+
+    def generate(
+        self,
+        prompt_filename: str,
+        fields: Dict[str, str],
+        validate: Optional[Callable[[Any], bool]] = None,
+        cacheable: bool = True,
+    ) -> Optional[Any]:
+        """
+        fields をテンプレートに埋め込んで呼び出し、応答のJSONを返す
+
+        同じ入力・プロンプト・モデルの結果はキャッシュから返し、APIを呼ばない。
+        呼び出しはレートリミッターの予算内で行い、429/5xx はサーバーの指示に従って待ってからリトライする。
+        呼び出しごとの入出力のトークン数・所要時間・試行回数・エラーを metrics に記録する。
 
-        except Exception as e:
-            logger.error(f"予期しないエラーが発生しました: {e}")
+        Args:
+            prompt_filename (str): プロンプトテンプレートのファイル名
+            fields (dict): テンプレートに埋め込む値
+            validate: 応答の検証関数（False を返した応答はキャッシュせず None を返す）
+            cacheable (bool): False の場合は応答全体をキャッシュしない
+
+        Returns:
+            パース済みのJSON。パース・検証に失敗した場合は None。
+        """
+        template = self.template(prompt_filename)
+        cache_text = "\0".join(fields.values())
+        cacheable = cacheable and self.use_cache
+        if cacheable:
+            cached = self.cache.get(cache_text, prompt_filename, template, self.model)
+            if cached is not None:
+                self.metrics.record(
+                    LlmCallRecord(prompt_filename, current_doc_id(), cached=True)
+                )
+                return cached
+
+        prompt = template.format(**fields)
+        call = LlmCallRecord(
+            prompt_filename,
+            current_doc_id(),
+            input_chars=len(prompt),
+            input_tokens=estimate_tokens(prompt),
+        )
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_retries + 1):
+                call.attempts = attempt
+                # RPM・TPMの予算を使い切っている場合は補充されるまで待つ
+                reserved = call.input_tokens
+                self.limiter.acquire(reserved)
+                usage = Usage()
+                used = None
+                try:
+                    result, output = self._request(
+                        prompt, usage, ROW_FIELDS.get(prompt_filename)
+                    )
+                    call.output_chars = len(output)
+                    # APIが返したトークン数を記録し、返さないバックエンド（replay）では概算する
+                    if usage.input_tokens is not None:
+                        call.input_tokens = usage.input_tokens
+                    if usage.output_tokens is not None:
+                        call.output_tokens = usage.output_tokens
+                    else:
+                        call.output_tokens = estimate_tokens(output) if output else 0
+                    used = call.input_tokens + call.output_tokens
+                    if validate is not None and not validate(result):
+                        logger.warning(f"応答がスキーマに一致しません: {prompt_filename}")
+                        call.error = "ValidationError"
+                        return None
+                    if cacheable:
+                        self.cache.put(cache_text, prompt_filename, template, self.model, result)
+                    return result
+
+                except APIError as e:  # API制限・サーバーエラー
+                    if e.code not in RETRY_CODES:
+                        logger.error(f"Gemini APIでエラーが発生しました: {e}")
+                        call.error = f"APIError{e.code}"
+                        raise
+                    if attempt >= self.max_retries:
+                        logger.error(f"リトライ回数を超えました: {e}")
+                        call.error = f"APIError{e.code}"
+                        raise
+                    call.retried.append(f"APIError{e.code}")
+                    delay = retry_delay(e, attempt)
+                    logger.warning(
+                        f"Gemini APIがステータス {e.code} を返しました。"
+                        f"{delay:.1f}秒後にリトライします ({attempt}/{self.max_retries})"
+                    )
+                    # 他のスレッドの呼び出しもまとめて止める
+                    self.limiter.pause(delay)
+
+                except TruncatedStreamError as e:
+                    # 出力の上限で途中までしか返らない応答は、再送しても同じく途中で終わる
+                    logger.error(f"[JSON ERROR] パース失敗: {e}")
+                    call.error = type(e).__name__
+                    return None
+
+                except MalformedStreamError as e:
+                    # 不正な文字・括弧の不一致は最後まで待たずに打ち切って再試行する
+                    if attempt >= self.max_retries:
+                        logger.error(f"[JSON ERROR] パース失敗: {e}")
+                        call.error = type(e).__name__
+                        return None
+                    call.retried.append(type(e).__name__)
+                    logger.warning(
+                        f"応答が壊れているため打ち切って再試行します "
+                        f"({attempt}/{self.max_retries}): {e}"
+                    )
+
+                except json.JSONDecodeError as e:
+                    logger.error(f"[JSON ERROR] パース失敗: {e}")
+                    call.error = type(e).__name__
+                    return None
+
+                except Exception as e:
+                    logger.error(f"予期しないエラーが発生しました: {e}")
+                    call.error = type(e).__name__
+                    return None
+
+                finally:
+                    # 入力の概算で確保した予算を、出力を含む実際のトークン数に精算する
+                    # （失敗した場合はAPIが返したトークン数、返していなければ0）
+                    if used is None:
+                        used = (usage.input_tokens or 0) + (usage.output_tokens or 0)
+                    self.limiter.settle(reserved, used)
+        finally:
+            call.latency = time.perf_counter() - started
+            self.metrics.record(call)
+
+    def _request(
+        self, prompt: str, usage: Usage, row_fields: Optional[Tuple[str, ...]] = None
+    ) -> Tuple[Any, str]:
+        """
+        1回分の呼び出しを行い、応答のJSONと受け取った応答のテキストを返す（トークン数は usage に書き込む）
+
+        ストリーミング時は断片ごとに逐次解析し、壊れていると分かった時点で打ち切る。
+        row_fields を指定すると、行が閉じるたびにその項目を検証し、欠けていればその時点で打ち切る。
+
+        Raises:
+            MalformedStreamError: ストリーミング中に応答が壊れていると分かった場合
+            TruncatedStreamError: ストリーミングの応答がJSONの途中で終わった場合
+            json.JSONDecodeError: 応答をパースできない場合
+        """
+        if not self.stream:
+            text = self.backend.generate(prompt, usage)
+            # Markdownコードブロック（```json ～ ```）を除去
+            cleaned_text = re.sub(r"^```json\s*|\s*```$", "", text.strip(), flags=re.DOTALL)
+            try:
+                return json.loads(cleaned_text), text
+            except json.JSONDecodeError:
+                logger.error(f"[RAW OUTPUT] {text}")
+                raise
+
+        parser = JsonStreamParser()
+        chunks = []
+        stream = self.backend.stream(prompt, usage)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                for row in parser.feed(chunk):
+                    if row_fields and not is_valid_row(row, row_fields):
+                        raise MalformedStreamError(f"行に必要な項目がありません: {row}")
+                if parser.done:
+                    break
+        finally:
+            # 打ち切った場合も接続を閉じる
+            stream.close()
+        return parser.result(), "".join(chunks)
+
+
+_extractor: Optional[GeminiExtractor] = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor() -> GeminiExtractor:
+    """
+    プロセス内で共有する抽出器を返す（初回のみ設定・テンプレートを読み込む）
+    """
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = GeminiExtractor(
+                    stream=True,
+                    backend=create_backend(),
+                    chunk_chars=int(os.getenv("LLM_CHUNK_CHARS", CHUNK_CHARS)),
+                )
+    return _extractor
+
+
+def log_compaction_stats() -> None:
+    """
+    共有の抽出器のプロンプト圧縮の累計をログに出力する（LLMを使わなかった場合は何もしない）
+    """
+    if _extractor is not None:
+        logger.info(_extractor.compaction.summary())
+
+
+def ai_parser(
+    xml_data: str,
+    prompt_filename: str,
+    extractor: Optional[GeminiExtractor] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Gemini APIを使って大株主情報のJSONデータを辞書で返す。
+
+    Args:
+        extractor (GeminiExtractor): 使用する抽出器（省略時は共有の抽出器）
+
+    Returns:
+        dict: パース済みのデータ（辞書形式）。失敗時は None。
+    """
+    return (extractor or get_extractor()).extract(xml_data, prompt_filename)
+
+
+def ai_parser_officers(
+    xml_data: str, extractor: Optional[GeminiExtractor] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    役員のTextBlockを抽出する（大きい場合は表の行で分割して並行に抽出する）
+
+    Returns:
+        dict: {"役員の状況": ...}（失敗した場合は None）
+    """
+    return (extractor or get_extractor()).extract_officers(xml_data)
+
+
+def ai_parser_combined(
+    officer_data: str,
+    shareholder_data: str,
+    extractor: Optional[GeminiExtractor] = None,
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Gemini APIを1回呼び出して役員情報・大株主情報を抽出する。
+
+    Returns:
+        tuple: (役員の状況, 大株主の状況)。失敗時は None。
+    """
+    return (extractor or get_extractor()).extract_combined(officer_data, shareholder_data)
+
+
+def ai_parser_packed(
+    blocks: Dict[str, str],
+    extractor: Optional[GeminiExtractor] = None,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Gemini APIで複数文書の大株主情報をまとめて抽出する。
+
+    Args:
+        blocks (dict): 文書番号 → 大株主のTextBlock
+
+    Returns:
+        dict: 文書番号 → パース済みのデータ（失敗した文書は None）
+    """
+    return (extractor or get_extractor()).extract_packed(blocks)
+
+
+def _find_packed_document(response: Any, doc_id: str) -> Optional[Dict[str, Any]]:
+    """
+    まとめて抽出した応答から文書番号に対応する大株主の状況を取り出す（不正ならNone）
+    """
+    documents = response.get("documents") if isinstance(response, dict) else None
+    if not isinstance(documents, list):
+        return None
+    for document in documents:
+        if isinstance(document, dict) and document.get("doc_id") == doc_id:
+            result = {"大株主の状況": document.get("大株主の状況")}
+            if is_valid_section(result, "大株主の状況", SHAREHOLDER_FIELDS):
+                return result
             return None
+    return None
+
+
+def retry_delay(error: APIError, attempt: int) -> float:
+    """
+    リトライまでの待機秒数を返す
+
+    サーバーが retryDelay（google.rpc.RetryInfo）や Retry-After を返していればそれに従い、
+    なければジッター付きの指数バックオフとする。
+    """
+    hint = _server_retry_hint(error)
+    if hint is not None:
+        return min(hint, BACKOFF_MAX)
+    cap = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+    return random.uniform(cap / 2, cap)
+
+
+def _server_retry_hint(error: APIError) -> Optional[float]:
+    details = error.details if isinstance(error.details, dict) else {}
+    for detail in details.get("error", details).get("details", []) or []:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if delay:
+            try:
+                return float(str(delay).rstrip("s"))
+            except ValueError:
+                pass
+
+    headers = getattr(error.response, "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return None
@@ -0,0 +1,480 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from sqlalchemy.exc import IntegrityError
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.interface.bulk_writer import BulkWriter, WriteResult
+from get_stakeholder_data.parser.xbrl_parser import ParsedXbrl, ParsingError, XbrlParser
+from get_stakeholder_data.services.get_document import get_document, get_document_path
+from get_stakeholder_data.services.get_documents import date_range, get_documents
+from get_stakeholder_data.services.list_cache import DocumentListCache
+from get_stakeholder_data.services.known_docs import KnownDocIds
+from get_stakeholder_data.services.ai_parser import log_compaction_stats
+from get_stakeholder_data.services.llm_metrics import export_llm_metrics
+from get_stakeholder_data.services.logger import Logger
+from get_stakeholder_data.services.parse_executor import ParseExecutor
+from get_stakeholder_data.services.run_state import RunState
+from get_stakeholder_data.services.extraction import MODE_LLM, StakeholderExtractor
+
+logger = Logger()
+
+
+@dataclass
+class PipelineConfig:
+    """
+    非同期取り込みの設定（ステージごとのワーカー数とキューの長さ）
+    """
+
+    list_concurrency: int = 2
+    fetch_concurrency: int = 4
+    parse_concurrency: int = 2
+    parse_workers: int = 0  # 1以上ならパースをこの数のプロセスで並列に行う（0ならスレッド）
+    extract_concurrency: int = 8  # LLMの呼び出し速度はレートリミッターが制御する
+    persist_concurrency: int = 1
+    batch_size: int = 20  # 1トランザクションにまとめる文書数
+    queue_size: int = 16
+    report_interval: float = 30.0
+    save_dir: str = "xbrl_data"
+    list_cache_dir: str = "edinet_list_cache"
+    combined_llm: bool = False  # 役員・株主情報を1回のLLM呼び出しで抽出する
+    extraction_mode: str = MODE_LLM  # hybrid: 表の解析に失敗した場合だけLLMを使う
+    pack_size: int = 1  # 2以上なら大株主を単独でLLMに送る文書をこの件数ずつまとめる
+
+
+@dataclass
+class WorkItem:
+    """
+    ステージ間を流れる1文書分の作業単位
+    """
+
+    doc: Doc
+    date: datetime
+    xbrl: Optional[Union[bytes, memoryview, str]] = None  # データ、またはキャッシュのパス
+    parser: Optional[Union[XbrlParser, ParsedXbrl]] = None
+    directors: List[Director] = field(default_factory=list)
+    shareholders: List[Shareholder] = field(default_factory=list)
+
+
+@dataclass
+class StageStats:
+    """
+    ステージごとの計測値
+    """
+
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0  # 処理にかかった時間の合計
+    wait_seconds: float = 0.0  # キューに入ってから取り出されるまでの時間の合計
+    depth: int = 0
+    max_depth: int = 0
+
+    @property
+    def avg_wait(self) -> float:
+        done = self.processed + self.failed
+        return self.wait_seconds / done if done else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """
+        ワーカーあたりの稼働時間（大きいほどボトルネック）
+        """
+        return self.busy_seconds / self.workers if self.workers else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"[{self.name}] 処理:{self.processed} 失敗:{self.failed} "
+            f"キュー:{self.depth}(最大{self.max_depth}) "
+            f"平均待ち:{self.avg_wait:.2f}秒 稼働:{self.busy_seconds:.1f}秒"
+        )
+
+
+@dataclass
+class PipelineStats:
+    """
+    非同期取り込みの処理結果
+    """
+
+    processed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def docs_per_minute(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.processed / self.elapsed * 60
+
+    @property
+    def bottleneck(self) -> Optional[str]:
+        """
+        ワーカーあたりの稼働時間が最も長いステージ名
+        """
+        if not self.stages:
+            return None
+        return max(self.stages.values(), key=lambda s: s.utilization).name
+
+
+class Stage:
+    """
+    入力キューから取り出して処理し、結果を次のステージのキューへ渡すワーカー群
+
+    キューは長さに上限があり、下流が詰まると上流の put が待たされる（バックプレッシャー）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[List[Any]]],
+        workers: int,
+        queue_size: int,
+        on_error: Callable[[Any, Exception], Awaitable[None]],
+        next_stage: Optional["Stage"] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.on_error = on_error
+        self.next_stage = next_stage
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = StageStats(name=name, workers=workers)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    async def put(self, item: Any) -> None:
+        await self.queue.put((time.monotonic(), item))
+        self.stats.depth = self.queue.qsize()
+        self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+
+    async def _worker(self) -> None:
+        while True:
+            enqueued_at, item = await self.queue.get()
+            self.stats.depth = self.queue.qsize()
+            started = time.monotonic()
+            self.stats.wait_seconds += started - enqueued_at
+            try:
+                results = await self.handler(item)
+                self.stats.processed += 1
+            except Exception as e:
+                self.stats.failed += 1
+                await self.on_error(item, e)
+                results = []
+            finally:
+                self.stats.busy_seconds += time.monotonic() - started
+
+            try:
+                if self.next_stage is not None:
+                    for result in results:
+                        await self.next_stage.put(result)
+            finally:
+                self.queue.task_done()
+
+    async def join(self) -> None:
+        """
+        キューに入った作業がすべて処理されるまで待つ
+        """
+        await self.queue.join()
+
+    async def cancel(self) -> None:
+        """
+        ワーカーを停止する
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class AsyncPipeline:
+    """
+    一覧取得 → XBRL取得 → パース → LLM抽出 → DB保存 のステージを
+    長さ制限付きのキューでつないだパイプライン
+
+    ブロッキングな処理はスレッドで実行し、ステージごとにワーカー数を設定できる。
+    DBへの書き込みは batch_size 件ごとに1トランザクションとし、失敗した文書だけをスキップする。
+    """
+
+    def __init__(
+        self,
+        config: Optional[PipelineConfig] = None,
+        run_state: Optional[RunState] = None,
+        writer: Optional[BulkWriter] = None,
+    ):
+        self.config = config or PipelineConfig()
+        self.stats = PipelineStats()
+        self.list_cache = DocumentListCache(self.config.list_cache_dir)
+        self.run_state = run_state or RunState()
+        self.known_doc_ids = KnownDocIds()
+        self.writer = writer or BulkWriter(batch_size=self.config.batch_size)
+        self.extractor = StakeholderExtractor(
+            self.config.extraction_mode, self.config.combined_llm
+        )
+        # 日付ごとの文書番号と未完了の文書数（日付の完了判定に使う）
+        self._date_docs: Dict[datetime, List[str]] = {}
+        self._remaining: Dict[datetime, int] = {}
+        # 大株主をまとめて抽出するために保留している文書
+        self._pack: List[WorkItem] = []
+        self.parse_executor: Optional[ParseExecutor] = None
+
+    async def run(self, start_date: datetime, end_date: datetime) -> PipelineStats:
+        """
+        指定期間の有価証券報告書を取り込む
+        """
+        self.stats = PipelineStats()
+        config = self.config
+        # 取り込み済みの文書番号を一度だけ読み込む
+        self.known_doc_ids = await asyncio.to_thread(self._load_known_doc_ids)
+        # 前回までに完了した日付は一覧取得ごとスキップする
+        dates = await asyncio.to_thread(
+            self.run_state.pending_dates, date_range(start_date, end_date)
+        )
+
+        parse_concurrency = config.parse_concurrency
+        if config.parse_workers > 0:
+            self.parse_executor = ParseExecutor(config.parse_workers)
+            # プロセスプールが空かないよう、ワーカー数以上を同時に投入する
+            parse_concurrency = max(parse_concurrency, config.parse_workers)
+
+        # 下流から順に組み立てる
+        persist = self._stage("persist", self._persist_stage, config.persist_concurrency)
+        extract = self._stage(
+            "extract", self._extract_stage, config.extract_concurrency, persist
+        )
+        parse = self._stage("parse", self._parse_stage, parse_concurrency, extract)
+        fetch = self._stage("fetch", self._fetch_stage, config.fetch_concurrency, parse)
+        listing = self._stage("list", self._list_stage, config.list_concurrency, fetch)
+        stages = [listing, fetch, parse, extract, persist]
+        reporter = asyncio.create_task(self._report(stages))
+
+        try:
+            for current in dates:
+                await listing.put(current)
+
+            # 上流から順にキューが空になるのを待つ
+            for stage in stages:
+                await stage.join()
+                if stage is extract:
+                    # まとめて抽出するために保留している残りの文書を抽出する
+                    batch, self._pack = self._pack, []
+                    for item in await self._extract_pack(batch):
+                        await persist.put(item)
+            # 書き込み待ちの文書をコミットする
+            await self._record(await asyncio.to_thread(self.writer.flush))
+        finally:
+            reporter.cancel()
+            for stage in stages:
+                await stage.cancel()
+            if self.parse_executor is not None:
+                await asyncio.to_thread(self.parse_executor.shutdown)
+
+        self.stats.finished_at = time.monotonic()
+        for stage in stages:
+            logger.info(stage.stats.summary())
+        logger.info(
+            f"非同期取り込み完了 - 処理:{self.stats.processed} "
+            f"スキップ:{self.stats.skipped} 失敗:{self.stats.failed} "
+            f"経過:{self.stats.elapsed:.1f}秒 "
+            f"スループット:{self.stats.docs_per_minute:.1f}件/分 "
+            f"ボトルネック:{self.stats.bottleneck}"
+        )
+        logger.info(self.extractor.stats.summary())
+        log_compaction_stats()
+        if self.parse_executor is not None:
+            self.parse_executor.log_stats()
+        export_llm_metrics()
+        return self.stats
+
+    def _stage(self, name, handler, workers, next_stage=None) -> Stage:
+        stage = Stage(
+            name, handler, workers, self.config.queue_size, self.on_error, next_stage
+        )
+        self.stats.stages[name] = stage.stats
+        return stage
+
+    async def _report(self, stages: List[Stage]) -> None:
+        while True:
+            await asyncio.sleep(self.config.report_interval)
+            logger.info(
+                "キュー長/平均待ち - "
+                + " ".join(
+                    f"{s.name}:{s.queue.qsize()}/{s.stats.avg_wait:.1f}秒"
+                    for s in stages
+                )
+                + f" 処理済:{self.stats.processed}"
+            )
+
+    async def on_error(self, item: Any, e: Exception) -> None:
+        """
+        ステージでの失敗を記録する（その文書のみスキップする）
+        """
+        if not isinstance(item, WorkItem):
+            logger.error(
+                f"文書一覧の取得に失敗しました - current_date:{item:%Y-%m-%d}, エラー内容: {e}"
+            )
+            return
+
+        self.stats.failed += 1
+        doc = item.doc
+        if isinstance(e, IntegrityError):
+            logger.error(f"主キーの重複エラーをスキップ: {doc}")
+        elif isinstance(e, ParsingError):
+            logger.error(f"パーサーエラーをスキップ: {doc}, エラー内容: {e}")
+        else:
+            logger.error(f"予期しないエラーが発生: {doc}, エラー内容: {e}")
+        await self._finish_doc(item, e)
+
+    async def _finish_doc(self, item: WorkItem, error: Optional[Exception] = None):
+        """
+        文書の処理結果を記録し、日付内の文書がすべて終わったら日付の状態を記録する
+        """
+        await asyncio.to_thread(
+            self.run_state.finish_doc, item.doc.doc_id, item.date, error
+        )
+        self._remaining[item.date] -= 1
+        if self._remaining[item.date] == 0:
+            await asyncio.to_thread(
+                self.run_state.finish_date, item.date, self._date_docs.pop(item.date)
+            )
+
+    async def _list_stage(self, current: datetime) -> List[WorkItem]:
+        docs = await asyncio.to_thread(get_documents, current, cache=self.list_cache)
+        new_docs, known_docs = self.known_doc_ids.partition(docs.documents)
+        if known_docs:
+            logger.info(
+                f"{len(known_docs)} 件のドキュメントは既に存在するためスキップします"
+            )
+            self.stats.skipped += len(known_docs)
+        items = [WorkItem(doc=doc, date=current) for doc in new_docs]
+
+        self._date_docs[current] = [doc.doc_id for doc in docs.documents]
+        self._remaining[current] = len(items)
+        if not items:
+            await asyncio.to_thread(
+                self.run_state.finish_date, current, self._date_docs.pop(current)
+            )
+        return items
+
+    async def _fetch_stage(self, item: WorkItem) -> List[WorkItem]:
+        await asyncio.to_thread(self.run_state.start_doc, item.doc.doc_id, item.date)
+        await self._fetch(item)
+        return [item]
+
+    async def _fetch(self, item: WorkItem) -> None:
+        # 別プロセスでパースする場合はキャッシュのパスだけを渡す
+        fetch = get_document if self.parse_executor is None else get_document_path
+        item.xbrl = await asyncio.to_thread(
+            fetch,
+            item.doc.doc_id,
+            company_code=item.doc.sec_code,
+            save_dir=self.config.save_dir,
+        )
+
+    async def _parse_stage(self, item: WorkItem) -> List[WorkItem]:
+        if self.parse_executor is None:
+            item.parser = await asyncio.to_thread(XbrlParser, item.xbrl)
+        else:
+            try:
+                item.parser = await asyncio.wrap_future(self.parse_executor.submit(item.xbrl))
+            except FileNotFoundError:
+                # パスを渡してからワーカーが開くまでにキャッシュから削除された場合は取得し直す
+                logger.warning(
+                    f"XBRLファイルがキャッシュから削除されたため取得し直します - doc_id:{item.doc.doc_id}"
+                )
+                await self._fetch(item)
+                item.parser = await asyncio.wrap_future(self.parse_executor.submit(item.xbrl))
+        item.xbrl = None  # パース後は不要なので解放する
+        return [item]
+
+    async def _extract_stage(self, item: WorkItem) -> List[WorkItem]:
+        item.directors, shareholders = await asyncio.to_thread(
+            self.extractor.extract,
+            item.parser,
+            self.config.pack_size > 1,
+            item.doc.doc_id,
+        )
+        if shareholders is not None:
+            item.shareholders = shareholders
+            item.parser = None
+            return [item]
+
+        # 大株主は pack_size 件たまったらまとめて抽出する
+        self._pack.append(item)
+        if len(self._pack) < self.config.pack_size:
+            return []
+        batch, self._pack = self._pack, []
+        return await self._extract_pack(batch)
+
+    async def _extract_pack(self, batch: List[WorkItem]) -> List[WorkItem]:
+        """
+        保留していた文書の大株主をまとめて抽出する（失敗した文書のみスキップ）
+        """
+        if not batch:
+            return []
+        try:
+            results = await asyncio.to_thread(
+                self.extractor.extract_packed,
+                {item.doc.doc_id: item.parser for item in batch},
+            )
+        except Exception as e:
+            results = {item.doc.doc_id: e for item in batch}
+
+        items = []
+        for item in batch:
+            item.parser = None
+            result = results[item.doc.doc_id]
+            if isinstance(result, Exception):
+                self.stats.stages["extract"].failed += 1
+                await self.on_error(item, result)
+            else:
+                item.shareholders = result
+                items.append(item)
+        return items
+
+    async def _persist_stage(self, item: WorkItem) -> List[WorkItem]:
+        # batch_size 件たまったらまとめてコミットされる
+        results = await asyncio.to_thread(
+            self.writer.add, item.doc, item.directors, item.shareholders, item
+        )
+        await self._record(results)
+        return []
+
+    async def _record(self, results: List[WriteResult]) -> None:
+        """
+        書き込み結果を統計・実行状態に反映する（失敗はその文書のみスキップ）
+        """
+        for result in results:
+            item = result.tag
+            if result.error is not None:
+                await self.on_error(item, result.error)
+                continue
+            self.stats.processed += 1
+            self.known_doc_ids.add(item.doc.doc_id)
+            logger.info(f"ドキュメント {item.doc.doc_id} の処理が完了しました")
+            await self._finish_doc(item)
+
+    @staticmethod
+    def _load_known_doc_ids() -> KnownDocIds:
+        return KnownDocIds.load()
+
+
+def run_async(
+    start_date: datetime,
+    end_date: datetime,
+    config: Optional[PipelineConfig] = None,
+) -> PipelineStats:
+    """
+    非同期パイプラインを実行する（同期コードからの呼び出し用）
+    """
+    return asyncio.run(AsyncPipeline(config).run(start_date, end_date))
@@ -0,0 +1,190 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+# リトライ対象のHTTPステータス
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class EdinetConfig:
+    """
+    EDINET APIの接続設定
+    """
+
+    api_key: Optional[str]
+    endpoint_list: Optional[str]
+    endpoint_doc: Optional[str]
+
+    @classmethod
+    def from_env(cls) -> "EdinetConfig":
+        """
+        環境変数（.env）から設定を読み込む
+        """
+        load_dotenv()  # .env を読み込む
+        return cls(
+            api_key=os.getenv("EDINET_API_KEY"),
+            endpoint_list=os.getenv("EDINET_API_ENDPOINT_LIST"),
+            endpoint_doc=os.getenv("EDINET_API_ENDPOINT_DOC"),
+        )
+
+
+class EdinetClient:
+    """
+    EDINET APIのクライアント
+
+    コネクションプール（Keep-Alive）を持つセッションを共有し、
+    タイムアウトと429/5xxに対するジッター付き指数バックオフのリトライを行う。
+    """
+
+    def __init__(
+        self,
+        config: Optional[EdinetConfig] = None,
+        pool_maxsize: int = 16,
+        timeout: tuple = (10, 120),
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        Args:
+            config (EdinetConfig): 接続設定（省略時は環境変数から読み込む）
+            pool_maxsize (int): ホストごとに保持するコネクション数
+            timeout (tuple): (接続タイムアウト, 読み込みタイムアウト) 秒
+            max_retries (int): 最大リトライ回数
+            backoff_base (float): バックオフの基準秒数
+            backoff_max (float): バックオフの上限秒数
+        """
+        self.config = config or EdinetConfig.from_env()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_document_list(self, date_str: str, **kwargs) -> requests.Response:
+        """
+        指定した日付の書類一覧を取得する
+
+        Args:
+            date_str (str): 取得対象の日付（YYYY-MM-DD）
+
+        Raises:
+            ValueError: 必要な環境変数が設定されていない場合
+            requests.exceptions.RequestException: リトライしても失敗した場合
+        """
+        if not self.config.api_key or not self.config.endpoint_list:
+            raise ValueError(
+                "EDINET_API_KEY または EDINET_API_ENDPOINT_LIST が設定されていません"
+            )
+        params = {
+            "date": date_str,
+            "type": "2",
+            "Subscription-Key": self.config.api_key,
+        }
+        return self.get(self.config.endpoint_list, params=params, **kwargs)
+
+    def get_document(self, doc_id: str, **kwargs) -> requests.Response:
+        """
+        文書番号をキーに書類（ZIP）を取得する
+
+        Args:
+            doc_id (str): 文書番号
+
+        Raises:
+            ValueError: 必要な環境変数が設定されていない場合
+            requests.exceptions.RequestException: リトライしても失敗した場合
+        """
+        if not self.config.api_key or not self.config.endpoint_doc:
+            raise ValueError(
+                "EDINET_API_KEY または EDINET_API_ENDPOINT_DOC が設定されていません"
+            )
+        url = f"{self.config.endpoint_doc}/{doc_id}"
+        params = {"type": 1, "Subscription-Key": self.config.api_key}
+        return self.get(url, params=params, **kwargs)
+
+    def get(self, url: str, params=None, stream: bool = False) -> requests.Response:
+        """
+        GETリクエストを送信する（429/5xx・接続エラー時はリトライ）
+
+        Raises:
+            requests.exceptions.RequestException: リトライしても失敗した場合
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(
+                    url, params=params, timeout=self.timeout, stream=stream
+                )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"EDINET APIへの接続に失敗しました。{delay:.1f}秒後にリトライします "
+                    f"({attempt + 1}/{self.max_retries}): {e}"
+                )
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logger.warning(
+                    f"EDINET APIがステータス {response.status_code} を返しました。"
+                    f"{delay:.1f}秒後にリトライします ({attempt + 1}/{self.max_retries})"
+                )
+                response.close()
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()  # HTTPエラーが発生した場合に例外をスロー
+            return response
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        リトライまでの待機秒数（Retry-Afterがあれば優先、なければフルジッター）
+        """
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        cap = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, cap)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[EdinetClient] = None
+_client_lock = threading.Lock()
+
+
+def get_edinet_client() -> EdinetClient:
+    """
+    プロセス内で共有するEDINETクライアントを返す（初回のみ設定を読み込む）
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EdinetClient()
+    return _client
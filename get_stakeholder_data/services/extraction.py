@@ -0,0 +1,266 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.parser.xbrl_parser import (
+    ParsingError,
+    XbrlParser,
+    get_major_shareholders_by_llm_packed,
+)
+from get_stakeholder_data.services.llm_metrics import doc_context
+from get_stakeholder_data.services.logger import Logger
+from get_stakeholder_data.services.store import to_directors, to_shareholders
+
+# ロガーの初期化
+logger = Logger()
+
+MODE_HYBRID = "hybrid"  # 表の解析を先に行い、検証に失敗した場合だけLLMを使う
+MODE_LLM = "llm"  # すべてLLMで抽出する
+MODES = (MODE_HYBRID, MODE_LLM)
+
+# 所有株式数が「なし」を表す記号
+EMPTY_MARKS = {"", "-", "－", "―", "—", "‐", "ー"}
+MAX_SHAREHOLDERS = 30
+MAX_DIRECTORS = 60
+
+
+def parse_number(text: str) -> Optional[float]:
+    """
+    「1,234」「10.50％」のような表の値を数値に変換する（変換できなければNone）
+    """
+    text = re.sub(r"[,，\s株％%]", "", text or "")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def validate_shareholders(shareholders: List[Shareholder]) -> Optional[str]:
+    """
+    表から抽出した大株主が妥当か検証する
+
+    - 株主の行数が 1〜MAX_SHAREHOLDERS 件
+    - 所有株式数・所有割合が数値で、所有割合は 0〜100
+    - 所有割合の合計が 100 以下で、「計」の行があればその値と一致する
+
+    Returns:
+        str: 不正な理由（妥当な場合は None）
+    """
+    rows = [s for s in shareholders if s.name != "計"]
+    totals = [s for s in shareholders if s.name == "計"]
+    if not 1 <= len(rows) <= MAX_SHAREHOLDERS:
+        return f"株主の行数が不正です: {len(rows)}"
+
+    ratio_sum = 0.0
+    for shareholder in rows:
+        if not shareholder.name:
+            return "氏名又は名称が空です"
+        if parse_number(shareholder.shares_held) is None:
+            return f"所有株式数が数値ではありません: {shareholder.shares_held}"
+        ratio = parse_number(shareholder.ownership_ratio)
+        if ratio is None or not 0 <= ratio <= 100:
+            return f"所有割合が不正です: {shareholder.ownership_ratio}"
+        ratio_sum += ratio
+
+    if ratio_sum > 100.5:
+        return f"所有割合の合計が100%を超えています: {ratio_sum:.2f}"
+    if totals:
+        total = parse_number(totals[0].ownership_ratio)
+        # 各行の端数処理の誤差を許容する
+        if total is not None and abs(total - ratio_sum) > 0.01 * len(rows) + 0.05:
+            return f"所有割合の合計が「計」と一致しません: {ratio_sum:.2f} != {total:.2f}"
+    return None
+
+
+# 生年月日のXBRLの要素は日付型（1960-01-01）、表では「1960年1月1日生」
+BIRTH_DATE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}|\d+年")
+
+
+def validate_directors(directors: List[Director]) -> Optional[str]:
+    """
+    表から抽出した役員が妥当か検証する
+
+    - 役員の行数が 1〜MAX_DIRECTORS 件
+    - 氏名・役職名があり、生年月日が日付（1960-01-01 または 1960年1月1日）で、
+      所有株式数が数値（または「－」）
+
+    Returns:
+        str: 不正な理由（妥当な場合は None）
+    """
+    if not 1 <= len(directors) <= MAX_DIRECTORS:
+        return f"役員の行数が不正です: {len(directors)}"
+    for director in directors:
+        if not director.name or not director.title:
+            return "氏名または役職名が空です"
+        if not BIRTH_DATE.search(director.birth_date):
+            return f"生年月日が不正です: {director.birth_date}"
+        if (
+            director.shares_owned not in EMPTY_MARKS
+            and parse_number(director.shares_owned) is None
+        ):
+            return f"所有株式数が数値ではありません: {director.shares_owned}"
+    return None
+
+
+@dataclass
+class ExtractionStats:
+    """
+    抽出方法ごとの件数
+    """
+
+    documents: int = 0
+    llm_documents: int = 0  # 役員・株主のどちらかでLLMを使った文書数
+    officer_fallbacks: int = 0
+    shareholder_fallbacks: int = 0
+    packs: int = 0  # 複数文書の大株主をまとめて抽出した呼び出し数
+    packed_documents: int = 0
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.llm_documents / self.documents if self.documents else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"抽出 - 文書:{self.documents} LLM使用:{self.llm_documents} "
+            f"(役員:{self.officer_fallbacks} 株主:{self.shareholder_fallbacks}) "
+            f"フォールバック率:{self.fallback_rate:.1%} "
+            f"まとめて抽出:{self.packed_documents}件/{self.packs}回"
+        )
+
+
+class StakeholderExtractor:
+    """
+    XBRLから役員・大株主を抽出する
+
+    hybrid モードでは表を解析して検証し、検証に失敗した側だけをLLMで抽出する。
+    両方とも失敗した場合は役員・株主をまとめて1回で抽出する。
+    llm モードでは常にLLMで抽出する。
+    大株主だけをLLMに送る文書は、呼び出し側で複数文書分をまとめて extract_packed に渡せる。
+    """
+
+    def __init__(self, mode: str = MODE_HYBRID, combined_llm: bool = True):
+        """
+        Args:
+            mode (str): hybrid または llm
+            combined_llm (bool): 役員・株主情報を1回のLLM呼び出しで抽出する
+        """
+        if mode not in MODES:
+            raise ValueError(f"不明な抽出モードです: {mode}")
+        self.mode = mode
+        self.combined_llm = combined_llm
+        self.stats = ExtractionStats()
+        self._lock = threading.Lock()
+
+    def extract(
+        self,
+        parser: XbrlParser,
+        defer_shareholders: bool = False,
+        doc_id: Optional[str] = None,
+    ) -> Tuple[List[Director], Optional[List[Shareholder]]]:
+        """
+        役員・大株主を抽出する
+
+        Args:
+            defer_shareholders (bool): True の場合、大株主を単独でLLMに送る必要があれば
+                抽出せずに None を返す（呼び出し側で extract_packed にまとめる）
+            doc_id (str): LLM呼び出しのメトリクスに記録する文書番号
+
+        Returns:
+            tuple: (役員のリスト, 大株主のリスト（「計」の行を除く）または None)
+        """
+        with doc_context(doc_id):
+            return self._extract(parser, defer_shareholders)
+
+    def _extract(
+        self, parser: XbrlParser, defer_shareholders: bool
+    ) -> Tuple[List[Director], Optional[List[Shareholder]]]:
+        directors = shareholders = None
+        if self.mode == MODE_HYBRID:
+            directors = self._deterministic(
+                parser.get_directors_and_auditors, validate_directors, "役員"
+            )
+            shareholders = self._deterministic(
+                parser.get_major_shareholders, validate_shareholders, "株主"
+            )
+
+        if (
+            directors is None
+            and shareholders is None
+            and (self.combined_llm or not defer_shareholders)
+        ):
+            officers, major_shareholders = parser.get_stakeholders_by_llm(
+                combined=self.combined_llm
+            )
+            directors = to_directors(officers)
+            shareholders = to_shareholders(major_shareholders)
+            self._count(officer_fallback=True, shareholder_fallback=True)
+            return directors, _without_total(shareholders)
+
+        officer_fallback = directors is None
+        shareholder_fallback = shareholders is None
+        if officer_fallback:
+            directors = to_directors(parser.get_major_officers_by_llm())
+        if shareholder_fallback and not defer_shareholders:
+            shareholders = to_shareholders(parser.get_major_shareholders_by_llm())
+        self._count(officer_fallback, shareholder_fallback)
+
+        if shareholders is None:
+            return directors, None
+        return directors, _without_total(shareholders)
+
+    def extract_packed(self, parsers: Dict[str, XbrlParser]) -> Dict[str, Any]:
+        """
+        extract で保留した複数文書の大株主を、LLMの1回の呼び出しでまとめて抽出する
+
+        Args:
+            parsers (dict): 文書番号 → XbrlParser
+
+        Returns:
+            dict: 文書番号 → 大株主のリスト（「計」の行を除く）、失敗した文書は ParsingError
+        """
+        results = {}
+        for doc_id, result in get_major_shareholders_by_llm_packed(parsers).items():
+            if isinstance(result, Exception):
+                results[doc_id] = result
+                continue
+            # 変換できない文書は、その文書だけを失敗とする
+            try:
+                results[doc_id] = _without_total(to_shareholders(result))
+            except (KeyError, TypeError, AttributeError) as e:
+                results[doc_id] = ParsingError(f"株主情報の変換に失敗しました: {e!r}")
+        with self._lock:
+            self.stats.packs += 1
+            self.stats.packed_documents += len(parsers)
+        return results
+
+    def _deterministic(self, parse, validate, label: str):
+        """
+        表を解析して検証する（失敗した場合は None）
+        """
+        try:
+            result = parse()
+        except ParsingError as e:
+            logger.info(f"{label}の表を解析できないためLLMで抽出します: {e}")
+            return None
+        reason = validate(result)
+        if reason is not None:
+            logger.info(f"{label}の表の検証に失敗したためLLMで抽出します: {reason}")
+            return None
+        return result
+
+    def _count(self, officer_fallback: bool = False, shareholder_fallback: bool = False):
+        with self._lock:
+            self.stats.documents += 1
+            if officer_fallback or shareholder_fallback:
+                self.stats.llm_documents += 1
+            if officer_fallback:
+                self.stats.officer_fallbacks += 1
+            if shareholder_fallback:
+                self.stats.shareholder_fallbacks += 1
+
+
+def _without_total(shareholders: List[Shareholder]) -> List[Shareholder]:
+    return [s for s in shareholders if s.name != "計"]
@@ -1,78 +1,199 @@
-import io
 import os
+import tempfile
 import zipfile
-from dotenv import load_dotenv
+from contextlib import contextmanager
+from typing import IO, Iterator, Union
+
 import requests
+from get_stakeholder_data.services.edinet_client import (
+    EdinetClient,
+    get_edinet_client,
+)
 from get_stakeholder_data.services.logger import Logger
+from get_stakeholder_data.services.xbrl_cache import XbrlCache, get_xbrl_cache
 
 # ロガーの初期化
 logger = Logger()
 
+# ダウンロード時のチャンクサイズ（バイト）
+CHUNK_SIZE = 1024 * 1024
+
 
-def get_document(doc_id: str, company_code="unknown", save_dir="xbrl_data") -> bytes:
+def get_document(
+    doc_id: str,
+    company_code="unknown",
+    save_dir="xbrl_data",
+    client: EdinetClient = None,
+    cache: XbrlCache = None,
+) -> memoryview:
     """
     指定した日付の有価証券報告書を取得する
 
+    XBRLファイルはキャッシュに保存し、メモリマップした読み取り専用のビューを返す。
+    文書全体をPythonのヒープにコピーしないため、XbrlParser へそのまま渡す。
+
     Args:
         doc_id (str): 取得対象の日付
         company_code(str): 企業コード
-        save_dir (str): 保存先ディレクトリ
+        save_dir (str): 保存先（XBRLキャッシュ）ディレクトリ
+        client (EdinetClient): EDINETクライアント（省略時は共有クライアント）
+        cache (XbrlCache): XBRLキャッシュ（省略時は save_dir の共有キャッシュ）
 
     Returns:
-        str: XBRLファイルのバイナリデータ
+        memoryview: XBRLファイルのバイナリデータ（読み取り専用）
 
     Raises:
         ValueError: 必要な環境変数が設定されていない場合
         RuntimeError: APIリクエストが失敗した場合
     """
-    load_dotenv()
-    api_key = os.getenv("EDINET_API_KEY")
-    api_endpoint_doc = os.getenv("EDINET_API_ENDPOINT_DOC")
-    if not api_key or not api_endpoint_doc:
-        raise Exception(
-            "EDINET_API_KEY または EDINET_API_ENDPOINT_DOC が設定されていません"
+    cache = cache or get_xbrl_cache(save_dir)
+
+    # キャッシュの確認
+    xbrl_view = cache.view(doc_id)
+    if xbrl_view is not None:
+        logger.info(
+            f"既存のXBRLファイルを使用します - doc_id:{doc_id} - company_code:{company_code}"
         )
+        return xbrl_view
+    return _fetch_document(doc_id, company_code, save_dir, client, cache)
+
+
+def get_document_path(
+    doc_id: str,
+    company_code="unknown",
+    save_dir="xbrl_data",
+    client: EdinetClient = None,
+    cache: XbrlCache = None,
+) -> str:
+    """
+    有価証券報告書をキャッシュに保存し、XBRLファイルのパスを返す
+
+    別プロセスでパースする場合に、データの代わりにパスだけを渡すために使う。
+    保存・検証のどちらでもファイルを展開しない。
+
+    Returns:
+        str: キャッシュのXBRLファイルのパス（.xbrl.gz または .xbrl）
+    """
+    cache = cache or get_xbrl_cache(save_dir)
+    path = cache.locate(doc_id)
+    if path is not None:
+        return path
+    return _fetch_document(doc_id, company_code, save_dir, client, cache, path_only=True)
+
 
-    company_dir = os.path.join(save_dir, company_code)
-    os.makedirs(company_dir, exist_ok=True)
+def _fetch_document(
+    doc_id: str,
+    company_code: str,
+    save_dir: str,
+    client: EdinetClient,
+    cache: XbrlCache,
+    path_only: bool = False,
+) -> Union[memoryview, str]:
+    """
+    キャッシュにない文書を旧形式のファイルから移行するか、ダウンロードして保存する
 
-    save_path = os.path.join(company_dir, f"{doc_id}.xbrl")
+    path_only が True の場合は内容を読み出さず、保存先のパスを返す。
+    """
+    store = cache.store_stream if path_only else cache.put_stream
+    # 旧形式（非圧縮）の既存ファイルがあればキャッシュへ移行する
+    legacy_path = os.path.join(save_dir, company_code, f"{doc_id}.xbrl")
+    if os.path.exists(legacy_path):
+        # 非圧縮のキャッシュでは旧形式と同じパスなので、書き直さずにそのまま登録する
+        if os.path.abspath(cache.path_for(doc_id, company_code)) == os.path.abspath(
+            legacy_path
+        ):
+            logger.info(
+                f"既存のXBRLファイルをキャッシュに登録します - doc_id:{doc_id} - company_code:{company_code}"
+            )
+            xbrl_view = cache.index_existing(doc_id, company_code)
+            return legacy_path if path_only else xbrl_view
 
-    # 既存ファイルの確認
-    if os.path.exists(save_path):
         logger.info(
-            f"既存のXBRLファイルを使用します - doc_id:{doc_id} - company_code:{company_code}"
+            f"既存のXBRLファイルをキャッシュへ移行します - doc_id:{doc_id} - company_code:{company_code}"
         )
-        with open(save_path, "rb") as existing_file:
-            return existing_file.read()
+        with open(legacy_path, "rb") as existing_file:
+            xbrl = store(doc_id, existing_file, company_code=company_code)
+        os.remove(legacy_path)
+        return xbrl
+
+    # ZIPを一時ファイルにストリーミングし、XBRLファイルのみを展開しながら保存
+    with open_document(doc_id, client=client) as member:
+        xbrl = store(doc_id, member, company_code=company_code)
+
+    # TODO：ログ出力する
+    logger.info(f"XBRL取得完了 - doc_id:{doc_id} - company_code:{company_code}")
+    return xbrl
+
+
+@contextmanager
+def open_document(doc_id: str, client: EdinetClient = None) -> Iterator[IO[bytes]]:
+    """
+    書類のZIPをダウンロードし、XBRLファイルをファイルライクオブジェクトとして開く
 
+    ZIPはメモリに載せずにチャンク単位で一時ファイルへ書き出し、
+    XBRLファイルはZIPから逐次展開しながら読み出す。
+
+    Args:
+        doc_id (str): 文書番号
+        client (EdinetClient): EDINETクライアント（省略時は共有クライアント）
+
+    Yields:
+        IO[bytes]: XBRLファイルの読み取り用ストリーム
+
+    Raises:
+        RuntimeError: APIリクエストが失敗した場合
+    """
+    with tempfile.TemporaryFile(suffix=".zip") as spool:
+        download_document(doc_id, spool, client=client)
+        spool.seek(0)
+
+        # ZIPファイルからXBRLファイルを抽出
+        try:
+            with zipfile.ZipFile(spool) as zf:
+                with zf.open(find_xbrl_member(zf)) as member:
+                    yield member
+        except zipfile.BadZipFile as e:
+            raise Exception(f"ZIPファイルが不正です: {e}")
+
+
+def download_document(doc_id: str, out: IO[bytes], client: EdinetClient = None) -> int:
+    """
+    書類のZIPをチャンク単位でファイルに書き出す
+
+    Returns:
+        int: 書き出したバイト数
+
+    Raises:
+        RuntimeError: APIリクエストが失敗した場合
+    """
     # APIリクエスト
-    url = f"{api_endpoint_doc}/{doc_id}"
-    params = {"type": 1, "Subscription-Key": api_key}
+    client = client or get_edinet_client()
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # HTTPエラーが発生した場合に例外をスロー
+        response = client.get_document(doc_id, stream=True)
     except requests.exceptions.RequestException as e:
         raise RuntimeError(f"EDINET APIリクエストに失敗しました: {e}")
 
-    # ZIPファイルからXBRLファイルを抽出
+    size = 0
     try:
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-            if not zf.namelist():
-                raise Exception("ZIPファイルが空です")
-            for name in zf.namelist():
-                if name.endswith(".xbrl"):
-                    with zf.open(name) as f:
-                        xbrl_bytes = f.read()
-                    break
-            else:
-                raise Exception("XBRLファイルが見つかりませんでした")
-    except zipfile.BadZipFile as e:
-        raise Exception(f"ZIPファイルが不正です: {e}")
-
-    with open(save_path, "wb") as out:
-        out.write(xbrl_bytes)
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if chunk:
+                out.write(chunk)
+                size += len(chunk)
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"EDINET APIリクエストに失敗しました: {e}")
+    finally:
+        response.close()
+    return size
 
-    # TODO：ログ出力する
-    logger.info(f"XBRL取得完了 - doc_id:{doc_id} - company_code:{company_code}")
-    return xbrl_bytes
+
+def find_xbrl_member(zf: zipfile.ZipFile) -> str:
+    """
+    ZIP内のXBRLファイル名を返す
+    """
+    names = zf.namelist()
+    if not names:
+        raise Exception("ZIPファイルが空です")
+    for name in names:
+        if name.endswith(".xbrl"):
+            return name
+    raise Exception("XBRLファイルが見つかりませんでした")
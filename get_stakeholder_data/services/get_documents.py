@@ -1,21 +1,34 @@
-import os
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Tuple
+
 import requests
 
 from get_stakeholder_data.domain.doc import Doc
 from get_stakeholder_data.domain.docs import Docs
+from get_stakeholder_data.services.edinet_client import (
+    EdinetClient,
+    get_edinet_client,
+)
+from get_stakeholder_data.services.list_cache import DocumentListCache
 from get_stakeholder_data.services.logger import Logger
 
 # ロガーの初期化
 logger = Logger()
 
 
-def get_documents(current_date):
+def get_documents(
+    current_date,
+    client: EdinetClient = None,
+    cache: DocumentListCache = None,
+):
     """
     指定した日付の有価証券報告書を取得する
 
     Args:
         current_date (datetime): 取得対象の日付
+        client (EdinetClient): EDINETクライアント（省略時は共有クライアント）
+        cache (DocumentListCache): 書類一覧のキャッシュ（省略時はキャッシュしない）
 
     Returns:
         list: 文書情報のリスト
@@ -24,30 +37,115 @@ def get_documents(current_date):
         ValueError: 必要な環境変数が設定されていない場合
         RuntimeError: APIリクエストが失敗した場合
     """
-    load_dotenv()  # .env を読み込む
-    api_key = os.getenv("EDINET_API_KEY")
-    api_endpoint_list = os.getenv("EDINET_API_ENDPOINT_LIST")
-    if not api_key or not api_endpoint_list:
-        raise Exception(
-            "EDINET_API_KEY または EDINET_API_ENDPOINT_LIST が設定されていません"
+    obj = cache.load(current_date) if cache else None
+    if obj is None:
+        obj = fetch_document_list(current_date, client)
+        if cache and obj.get("metadata", {}).get("status") == "200":
+            cache.save(current_date, obj)
+    else:
+        logger.info(
+            f"書類一覧のキャッシュを使用します - current_date:{current_date.strftime("%Y-%m-%d")}"
+        )
+
+    docs = parse_documents(obj)
+    logger.info(
+        f"有価証券報告書一覧取得完了 - current_date:{current_date.strftime("%Y-%m-%d")}"
+    )
+    return docs
+
+
+def get_documents_range(
+    start_date,
+    end_date,
+    max_workers: int = 4,
+    client: EdinetClient = None,
+    cache: DocumentListCache = None,
+) -> List[Tuple]:
+    """
+    指定した期間の有価証券報告書を日付ごとに並行して取得する
+
+    Args:
+        start_date (datetime): 取得開始日
+        end_date (datetime): 取得終了日（この日を含む）
+        max_workers (int): 同時に取得する日数
+        client (EdinetClient): EDINETクライアント（省略時は共有クライアント）
+        cache (DocumentListCache): 書類一覧のキャッシュ（省略時は既定の保存先）
+
+    Returns:
+        list: (日付, Docs) のリスト（日付順）
+
+    Raises:
+        RuntimeError: APIリクエストが失敗した場合
+    """
+    return get_documents_for_dates(
+        date_range(start_date, end_date),
+        max_workers=max_workers,
+        client=client,
+        cache=cache,
+    )
+
+
+def get_documents_for_dates(
+    dates,
+    max_workers: int = 4,
+    client: EdinetClient = None,
+    cache: DocumentListCache = None,
+) -> List[Tuple]:
+    """
+    指定した日付ごとの有価証券報告書を並行して取得する
+
+    Returns:
+        list: (日付, Docs) のリスト（指定した順）
+
+    Raises:
+        RuntimeError: APIリクエストが失敗した場合
+    """
+    client = client or get_edinet_client()
+    cache = cache or DocumentListCache()
+    dates = list(dates)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda d: get_documents(d, client=client, cache=cache), dates
         )
+        return list(zip(dates, results))
+
+
+def date_range(start_date, end_date) -> list:
+    """
+    開始日から終了日まで（両端を含む）の日付のリストを返す
+    """
+    dates = []
+    current = start_date
+    while current <= end_date:
+        dates.append(current)
+        current += timedelta(days=1)
+    return dates
+
 
-    params = {
-        "date": current_date.strftime("%Y-%m-%d"),
-        "type": "2",
-        "Subscription-Key": api_key,
-    }
+def fetch_document_list(current_date, client: EdinetClient = None) -> dict:
+    """
+    指定した日付の書類一覧APIのレスポンス（JSON）を取得する
+
+    Raises:
+        RuntimeError: APIリクエストが失敗した場合
+    """
+    client = client or get_edinet_client()
     try:
-        res = requests.get(api_endpoint_list, params=params)
-        res.raise_for_status()  # HTTPエラーが発生した場合に例外をスロー
+        res = client.get_document_list(current_date.strftime("%Y-%m-%d"))
     except requests.exceptions.RequestException as e:
         raise RuntimeError(f"EDINET APIリクエストに失敗しました: {e}")
 
     try:
-        obj = res.json()
+        return res.json()
     except ValueError as e:
         raise RuntimeError(f"APIレスポンスのJSONパースに失敗しました: {e}")
 
+
+def parse_documents(obj: dict) -> Docs:
+    """
+    書類一覧APIのレスポンスから有価証券報告書（訂正を除く）を抽出する
+    """
     if obj.get("metadata", {}).get("status") == "404":
         return Docs(documents=[])
 
@@ -69,7 +167,4 @@ def get_documents(current_date):
                 doc_description=record.get("docDescription"),
             )
             docs.append(doc)
-    logger.info(
-        f"有価証券報告書一覧取得完了 - current_date:{current_date.strftime("%Y-%m-%d")}"
-    )
     return Docs(documents=docs)
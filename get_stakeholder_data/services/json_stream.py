@@ -0,0 +1,149 @@
+import json
+from typing import Any, List, Optional
+
+
+class MalformedStreamError(ValueError):
+    """ストリーミング中の応答がJSONとして明らかに壊れていることを表す例外"""
+
+    pass
+
+
+class TruncatedStreamError(MalformedStreamError):
+    """応答がJSONの途中で終わったことを表す例外（出力トークン数の上限で打ち切られた場合など）"""
+
+    pass
+
+
+# 文字列の外に現れてよい文字（リテラル true / false / null と数値を含む）
+_VALUE_CHARS = set("0123456789+-.eEtrufalsn")
+_WHITESPACE = set(" \t\r\n")
+
+
+class JsonStreamParser:
+    """
+    LLMの応答を断片ごとに受け取り、JSONを逐次解析する
+
+    - 先頭の Markdownコードブロック（```json）と末尾の ``` は読み飛ばす
+    - キー row_key の配列の要素（オブジェクト）が閉じるたびに、その行を返す
+    - JSONとして成立しない文字・括弧の不一致を見つけた時点で MalformedStreamError を送出する
+    """
+
+    def __init__(self, row_key: str = "data"):
+        self.row_key = row_key
+        self.rows = 0
+        self.done = False
+        self._buffer = ""
+        self._pos = 0
+        self._start: Optional[int] = None  # JSON本体の開始位置
+        self._end: Optional[int] = None
+        self._stack: List[list] = []  # [括弧, 開始位置, キー]
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        応答の断片を追加し、新たに閉じた行を返す
+
+        Raises:
+            MalformedStreamError: JSONとして成立しないことが分かった場合
+        """
+        self._buffer += text
+        rows = []
+        if self._start is None and not self._find_start():
+            return rows
+
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self.done:
+            i = self._pos
+            ch = buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start : i + 1]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                parent_key = self._pending_key
+                self._stack.append([ch, i, parent_key])
+                self._pending_key = None
+            elif ch in "}]":
+                if not self._stack or self._stack[-1][0] != ("{" if ch == "}" else "["):
+                    raise MalformedStreamError(f"括弧が対応していません: 位置{i}")
+                opened, start, _ = self._stack.pop()
+                if (
+                    opened == "{"
+                    and self._stack
+                    and self._stack[-1][0] == "["
+                    and self._stack[-1][2] == self.row_key
+                ):
+                    rows.append(self._loads(buffer[start : i + 1]))
+                if not self._stack:
+                    self.done = True
+                    self._end = i + 1
+            elif ch == ":":
+                if self._last_string is None:
+                    raise MalformedStreamError(f"キーがありません: 位置{i}")
+                self._pending_key = self._loads(self._last_string)
+            elif ch == ",":
+                self._pending_key = None
+                self._last_string = None
+            elif ch not in _WHITESPACE and ch not in _VALUE_CHARS:
+                raise MalformedStreamError(f"JSONではない文字があります: {ch!r}")
+
+        self.rows += len(rows)
+        return rows
+
+    def result(self) -> Any:
+        """
+        解析し終えたJSON全体を返す
+
+        Raises:
+            TruncatedStreamError: JSONが閉じていない場合
+            MalformedStreamError: パースできない場合
+        """
+        if not self.done:
+            raise TruncatedStreamError("応答のJSONが途中で終わっています")
+        return self._loads(self._buffer[self._start : self._end])
+
+    def _find_start(self) -> bool:
+        """
+        コードブロックの開始を読み飛ばし、JSON本体の開始位置を探す
+        """
+        stripped = self._buffer.lstrip()
+        if not stripped:
+            return False
+        if stripped.startswith("`"):
+            if len(stripped) < 3:
+                return False
+            if not stripped.startswith("```"):
+                raise MalformedStreamError(f"応答がJSONで始まっていません: {stripped[:20]!r}")
+            newline = stripped.find("\n")
+            if newline < 0:
+                return False  # ```json の行がまだ終わっていない
+            stripped = stripped[newline + 1 :].lstrip()
+            if not stripped:
+                return False
+        if stripped[0] not in "{[":
+            raise MalformedStreamError(f"応答がJSONで始まっていません: {stripped[:20]!r}")
+        self._start = len(self._buffer) - len(stripped)
+        self._pos = self._start
+        return True
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise MalformedStreamError(f"JSONのパースに失敗しました: {e}")
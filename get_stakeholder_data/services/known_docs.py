@@ -0,0 +1,73 @@
+import threading
+from typing import Iterable, List, Set
+
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.interface.database import SessionLocal
+from get_stakeholder_data.models.docs_model import DocsModel
+
+# SQLiteのバインド変数の上限を超えないように分割する件数
+CHUNK_SIZE = 500
+
+
+def find_existing_doc_ids(session, doc_ids: Iterable[str]) -> Set[str]:
+    """
+    指定した文書番号のうち、既にDBに取り込まれているものを1回（件数が多い場合は分割）のクエリで返す
+    """
+    doc_ids = list(doc_ids)
+    existing = set()
+    for i in range(0, len(doc_ids), CHUNK_SIZE):
+        chunk = doc_ids[i : i + CHUNK_SIZE]
+        existing.update(
+            doc_id
+            for (doc_id,) in session.query(DocsModel.doc_id).filter(
+                DocsModel.doc_id.in_(chunk)
+            )
+        )
+    return existing
+
+
+class KnownDocIds:
+    """
+    取り込み済みの文書番号をプロセス内に保持する集合
+
+    起動時に一度だけDBから読み込み、以降は取り込みのたびに追加する。
+    再実行時のスキップ判定でDBへの問い合わせが発生しない。
+    """
+
+    def __init__(self, doc_ids: Iterable[str] = ()):
+        self._doc_ids = set(doc_ids)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session_factory=SessionLocal) -> "KnownDocIds":
+        """
+        DBから取り込み済みの文書番号をすべて読み込む
+        """
+        session = session_factory()
+        try:
+            return cls(doc_id for (doc_id,) in session.query(DocsModel.doc_id))
+        finally:
+            session.close()
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_ids
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def add(self, doc_id: str) -> None:
+        with self._lock:
+            self._doc_ids.add(doc_id)
+
+    def partition(self, docs: Iterable[Doc]) -> tuple:
+        """
+        文書を未取り込み・取り込み済みに振り分ける
+
+        Returns:
+            tuple: (未取り込みの文書のリスト, 取り込み済みの文書のリスト)
+        """
+        new_docs: List[Doc] = []
+        known_docs: List[Doc] = []
+        for doc in docs:
+            (known_docs if doc.doc_id in self._doc_ids else new_docs).append(doc)
+        return new_docs, known_docs
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+# 一覧が変わりうるため再取得する直近の日数（当日を含まない）
+REFRESH_DAYS = 3
+
+
+class DocumentListCache:
+    """
+    EDINETの書類一覧APIのレスポンス（生のJSON）を日付ごとにディスクへ保存するキャッシュ
+
+    過去日の一覧は変わらないため、refresh_days より古い日付はキャッシュから返す。
+    当日と直近の日付は書類が追加・訂正されうるため、毎回取得し直す。
+    """
+
+    def __init__(self, cache_dir: str = "edinet_list_cache", refresh_days: int = REFRESH_DAYS):
+        """
+        Args:
+            cache_dir (str): キャッシュの保存先ディレクトリ
+            refresh_days (int): 当日から何日前までを再取得の対象とするか
+        """
+        self.cache_dir = cache_dir
+        self.refresh_days = refresh_days
+
+    def _path(self, target: date) -> str:
+        return os.path.join(
+            self.cache_dir, f"{target:%Y}", f"{target:%Y-%m-%d}.json"
+        )
+
+    def is_cacheable(self, target, today: Optional[date] = None) -> bool:
+        """
+        キャッシュから返してよい（確定済みの）日付か判定する
+        """
+        if isinstance(target, datetime):
+            target = target.date()
+        today = today or date.today()
+        return target < today - timedelta(days=self.refresh_days)
+
+    def load(self, target) -> Optional[Dict[str, Any]]:
+        """
+        確定済みの日付であればキャッシュしたレスポンスを返す（なければNone）
+        """
+        if isinstance(target, datetime):
+            target = target.date()
+        if not self.is_cacheable(target):
+            return None
+        path = self._path(target)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"書類一覧キャッシュの読み込みに失敗しました: {path}, {e}")
+            return None
+
+    def save(self, target, obj: Dict[str, Any]) -> None:
+        """
+        レスポンスを保存する（一時ファイルに書いてから置き換える）
+        """
+        if isinstance(target, datetime):
+            target = target.date()
+        path = self._path(target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(obj, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,335 @@
+import abc
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Union
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai.errors import APIError
+
+from get_stakeholder_data.services.json_stream import JsonStreamParser, MalformedStreamError
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+MODEL_NAME = "gemini-2.0-flash-lite"
+
+RETRY_INFO_TYPE = "type.googleapis.com/google.rpc.RetryInfo"
+ERROR_STATUSES = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    502: "BAD_GATEWAY",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+
+def prompt_key(prompt: str) -> str:
+    """
+    記録済みの応答を引くためのプロンプトのハッシュ
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Usage:
+    """
+    APIが返した1回分のトークン数（返さないバックエンドでは None のまま）
+    """
+
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class LlmBackend(abc.ABC):
+    """
+    LLMの呼び出し先のインターフェース
+
+    generate はプロンプトに対する応答の全文を、stream は応答の断片を順に返す。
+    usage を渡すと、APIが返した入出力のトークン数をそこに書き込む。
+    失敗は google.genai.errors.APIError（code に HTTPステータス）で送出する。
+    """
+
+    model: str = ""
+
+    @abc.abstractmethod
+    def generate(self, prompt: str, usage: Optional[Usage] = None) -> str:
+        ...
+
+    def stream(self, prompt: str, usage: Optional[Usage] = None) -> Iterator[str]:
+        yield self.generate(prompt, usage)
+
+
+class GeminiBackend(LlmBackend):
+    """
+    Gemini APIを呼び出すバックエンド（クライアントは1つを使い回す）
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = MODEL_NAME):
+        """
+        Args:
+            api_key (str): Gemini APIキー（省略時は環境変数 GEMINI_API_KEY）
+            model (str): 使用するモデル名
+
+        Raises:
+            ValueError: APIキーが設定されていない場合
+        """
+        if api_key is None:
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEYが設定されていません")
+        self.model = model
+        self.client = genai.Client(api_key=api_key)
+
+    def generate(self, prompt: str, usage: Optional[Usage] = None) -> str:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+        )
+        _read_usage(response, usage)
+        return response.text
+
+    def stream(self, prompt: str, usage: Optional[Usage] = None) -> Iterator[str]:
+        stream = self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+        )
+        try:
+            for chunk in stream:
+                # 各断片の usage_metadata はそこまでの累計なので、最後に受け取った値を使う
+                _read_usage(chunk, usage)
+                yield chunk.text or ""
+        finally:
+            # 途中で打ち切られた場合も接続を閉じる
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+
+def _read_usage(response, usage: Optional[Usage]) -> None:
+    """
+    応答の usage_metadata からトークン数を読み取る
+    """
+    if usage is None:
+        return
+    metadata = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(metadata, "prompt_token_count", None)
+    output_tokens = getattr(metadata, "candidates_token_count", None)
+    if isinstance(prompt_tokens, int):
+        usage.input_tokens = prompt_tokens
+    if isinstance(output_tokens, int):
+        usage.output_tokens = output_tokens
+
+
+class ReplayBackend(LlmBackend):
+    """
+    記録済みの応答を返すローカルのバックエンド（ネットワークなしでの性能測定用）
+
+    プロンプトのハッシュで記録を引き、設定した遅延を入れて返す。
+    error_rates の確率で 429/502/503 などを、rpm を超えた呼び出しには
+    retryDelay 付きの 429 を、実際のAPIと同じ APIError で返す。
+    トークン数は返さない（呼び出し側で概算する）。
+    """
+
+    model = "replay"
+
+    def __init__(
+        self,
+        recordings: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rates: Optional[Dict[int, float]] = None,
+        rpm: Optional[int] = None,
+        default: Union[str, Callable[[str], str], None] = None,
+        chunk_size: int = 256,
+        seed: Optional[int] = None,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            recordings (dict): プロンプトのハッシュ → 応答のテキスト
+            latency (float): 応答までの遅延（秒）
+            jitter (float): 遅延に加える 0〜jitter 秒のばらつき
+            error_rates (dict): HTTPステータス → 発生確率（例: {503: 0.05, 429: 0.01}）
+            rpm (int): 1分あたりの呼び出し上限（超えた場合は 429）
+            default: 記録がないプロンプトへの応答（文字列、またはプロンプトを受け取る関数）
+            chunk_size (int): stream で返す断片の文字数
+            seed (int): エラー・遅延の乱数のシード
+        """
+        self.recordings = dict(recordings or {})
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates or {})
+        self.rpm = rpm
+        self.default = default
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.errors: Counter = Counter()
+        self._random = random.Random(seed)
+        self._sleep = sleep
+        self._clock = clock
+        self._window: deque = deque()  # 直近1分間の呼び出し時刻
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "ReplayBackend":
+        """
+        RecordingBackend が書き出したJSONLファイルから記録を読み込む
+        """
+        recordings = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recordings[record["prompt_key"]] = record["response"]
+        return cls(recordings, **kwargs)
+
+    def generate(self, prompt: str, usage: Optional[Usage] = None) -> str:
+        with self._lock:
+            self.calls += 1
+            now = self._clock()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if self.rpm and len(self._window) >= self.rpm:
+                wait = 60 - (now - self._window[0])
+                raise self._error(429, retry_delay=wait)
+            self._window.append(now)
+
+            roll = self._random.random()
+            for code, rate in sorted(self.error_rates.items()):
+                if roll < rate:
+                    raise self._error(code)
+                roll -= rate
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        self._sleep(delay)
+        response = self.recordings.get(prompt_key(prompt))
+        if response is not None:
+            return response
+        if callable(self.default):
+            return self.default(prompt)
+        if self.default is not None:
+            return self.default
+        raise KeyError(f"記録がないプロンプトです: {prompt_key(prompt)[:12]}")
+
+    def stream(self, prompt: str, usage: Optional[Usage] = None) -> Iterator[str]:
+        text = self.generate(prompt, usage)
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i : i + self.chunk_size]
+
+    def _error(self, code: int, retry_delay: Optional[float] = None) -> APIError:
+        # 呼び出し側でロックを保持している
+        self.errors[code] += 1
+        details = []
+        if retry_delay is not None:
+            details.append({"@type": RETRY_INFO_TYPE, "retryDelay": f"{retry_delay:.1f}s"})
+        return APIError(
+            code,
+            {
+                "error": {
+                    "code": code,
+                    "message": "replay backend error",
+                    "status": ERROR_STATUSES.get(code, "UNKNOWN"),
+                    "details": details,
+                }
+            },
+        )
+
+
+class RecordingBackend(LlmBackend):
+    """
+    別のバックエンドの応答を JSONL に記録する（ReplayBackend.load で読み込める）
+    """
+
+    def __init__(self, backend: LlmBackend, path: str):
+        self.backend = backend
+        self.model = backend.model
+        self.path = path
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, usage: Optional[Usage] = None) -> str:
+        response = self.backend.generate(prompt, usage)
+        self._record(prompt, response)
+        return response
+
+    def stream(self, prompt: str, usage: Optional[Usage] = None) -> Iterator[str]:
+        chunks = []
+        try:
+            for chunk in self.backend.stream(prompt, usage):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # 呼び出し側はJSONが閉じた時点で打ち切るため、JSONとして完結した応答を記録する
+            response = "".join(chunks)
+            if _is_complete(response):
+                self._record(prompt, response)
+
+    def _record(self, prompt: str, response: str) -> None:
+        line = json.dumps(
+            {"prompt_key": prompt_key(prompt), "response": response}, ensure_ascii=False
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _is_complete(response: str) -> bool:
+    parser = JsonStreamParser()
+    try:
+        parser.feed(response)
+    except MalformedStreamError:
+        return False
+    return parser.done
+
+
+def parse_error_rates(value: str) -> Dict[int, float]:
+    """
+    "429:0.01,503:0.05" の形式の文字列を HTTPステータス → 発生確率 に変換する
+    """
+    rates = {}
+    for item in value.split(","):
+        if item.strip():
+            code, rate = item.split(":")
+            rates[int(code)] = float(rate)
+    return rates
+
+
+def create_backend(api_key: Optional[str] = None) -> LlmBackend:
+    """
+    環境変数 LLM_BACKEND に応じたバックエンドを作成する
+
+    - gemini（既定）: Gemini API
+    - replay: LLM_REPLAY_PATH の記録を返す（LLM_REPLAY_LATENCY 秒の遅延）
+      LLM_REPLAY_JITTER・LLM_REPLAY_ERROR_RATES・LLM_REPLAY_RPM・LLM_REPLAY_SEED で
+      遅延のばらつき・エラーの発生確率・1分あたりの上限・乱数のシードを指定できる。
+    LLM_RECORD_PATH を指定すると、応答をそのファイルに記録する。
+    """
+    load_dotenv()
+    kind = os.getenv("LLM_BACKEND", "gemini")
+    if kind == "replay":
+        backend: LlmBackend = ReplayBackend.load(
+            os.environ["LLM_REPLAY_PATH"],
+            latency=float(os.getenv("LLM_REPLAY_LATENCY", "0")),
+            jitter=float(os.getenv("LLM_REPLAY_JITTER", "0")),
+            error_rates=parse_error_rates(os.getenv("LLM_REPLAY_ERROR_RATES", "")),
+            rpm=int(os.getenv("LLM_REPLAY_RPM", "0")) or None,
+            seed=int(os.environ["LLM_REPLAY_SEED"]) if os.getenv("LLM_REPLAY_SEED") else None,
+        )
+    elif kind == "gemini":
+        backend = GeminiBackend(api_key)
+    else:
+        raise ValueError(f"不明なLLMバックエンドです: {kind}")
+
+    record_path = os.getenv("LLM_RECORD_PATH")
+    if record_path:
+        backend = RecordingBackend(backend, record_path)
+    logger.info(f"LLMバックエンド: {kind} (model:{backend.model})")
+    return backend
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+PROMPT_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(block_text: str, template: str, model: str) -> str:
+    """
+    TextBlockの内容・プロンプトテンプレートの内容・モデル名からキャッシュキーを作る
+    """
+    return _sha256("\0".join([_sha256(block_text), _sha256(template), model]))
+
+
+@dataclass
+class LlmCacheStats:
+    """
+    LLMキャッシュの統計情報
+    """
+
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LlmCache:
+    """
+    LLMによる抽出結果（パース済みJSON）を保存するキャッシュ
+
+    キーは TextBlock・プロンプトテンプレート・モデル名のハッシュなので、
+    同じ入力の再処理ではLLMを呼ばずに結果を返せる。
+    テンプレートを変更した場合は自動的に別キーとなり、古いエントリは
+    invalidate_stale() で削除できる。
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite3"):
+        """
+        Args:
+            path (str): キャッシュのSQLiteファイルのパス
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_results (
+                cache_key TEXT PRIMARY KEY,
+                prompt_filename TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(
+        self, block_text: str, prompt_filename: str, template: str, model: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュ済みの抽出結果を返す（なければNone）
+        """
+        key = make_cache_key(block_text, template, model)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM llm_results WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(
+        self,
+        block_text: str,
+        prompt_filename: str,
+        template: str,
+        model: str,
+        result: Dict[str, Any],
+    ) -> None:
+        """
+        抽出結果を保存する
+        """
+        key = make_cache_key(block_text, template, model)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_results
+                    (cache_key, prompt_filename, prompt_hash, model, result, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    prompt_filename,
+                    _sha256(template),
+                    model,
+                    json.dumps(result, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+
+    def invalidate_stale(self, prompt_dir: Path = PROMPT_DIR) -> int:
+        """
+        現在のプロンプトテンプレートと内容が異なる（変更前の）エントリを削除する
+
+        Returns:
+            int: 削除した件数
+        """
+        deleted = 0
+        with self._lock:
+            filenames = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT prompt_filename FROM llm_results"
+                )
+            ]
+            for filename in filenames:
+                path = Path(prompt_dir) / filename
+                if path.exists():
+                    current = _sha256(path.read_text(encoding="utf-8"))
+                    cursor = self._conn.execute(
+                        "DELETE FROM llm_results WHERE prompt_filename = ? AND prompt_hash != ?",
+                        (filename, current),
+                    )
+                else:
+                    cursor = self._conn.execute(
+                        "DELETE FROM llm_results WHERE prompt_filename = ?", (filename,)
+                    )
+                deleted += cursor.rowcount
+        if deleted:
+            logger.info(f"プロンプトの変更により LLMキャッシュを {deleted} 件削除しました")
+        return deleted
+
+    def stats(self) -> LlmCacheStats:
+        """
+        ヒット数・ミス数・保存件数を返す
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+        return LlmCacheStats(self.hits, self.misses, entries)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_cache: Optional[LlmCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LlmCache:
+    """
+    プロセス内で共有するLLMキャッシュを返す
+
+    保存先は環境変数 LLM_CACHE_PATH で指定する（既定: llm_cache.sqlite3）。
+    初回作成時にプロンプトが変更されたエントリを削除する。
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            load_dotenv()
+            _cache = LlmCache(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"))
+            _cache.invalidate_stale()
+        return _cache
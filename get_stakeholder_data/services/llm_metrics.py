@@ -0,0 +1,254 @@
+import heapq
+import os
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+# 待機・リトライを含む1回の抽出の所要時間（秒）
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+# 1回の抽出の入出力のトークン数
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+_doc_id: ContextVar[Optional[str]] = ContextVar("llm_doc_id", default=None)
+
+
+@contextmanager
+def doc_context(doc_id: Optional[str]) -> Iterator[None]:
+    """
+    ブロック内のLLM呼び出しを文書番号と紐付ける（asyncio.to_thread にも引き継がれる）
+    """
+    token = _doc_id.set(doc_id)
+    try:
+        yield
+    finally:
+        _doc_id.reset(token)
+
+
+def current_doc_id() -> Optional[str]:
+    return _doc_id.get()
+
+
+@dataclass
+class LlmCallRecord:
+    """
+    抽出1回分（リトライを含む）の記録
+    """
+
+    prompt_filename: str
+    doc_id: Optional[str] = None
+    input_chars: int = 0
+    input_tokens: int = 0
+    output_chars: int = 0
+    output_tokens: int = 0
+    latency: float = 0.0  # レート制限の待機・リトライを含む経過時間（秒）
+    attempts: int = 0
+    error: Optional[str] = None  # 最終的に失敗した場合のエラーの種類
+    retried: List[str] = field(default_factory=list)  # リトライしたエラーの種類
+    cached: bool = False
+
+    @property
+    def outcome(self) -> str:
+        if self.cached:
+            return "cached"
+        return self.error or "ok"
+
+
+class Histogram:
+    """
+    Prometheusのヒストグラムと同じ累積バケット
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        lines = [
+            f'{name}_bucket{{{labels},le="{bound:g}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:g}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class LlmMetrics:
+    """
+    LLM呼び出しの記録をプロンプトごとのカウンター・ヒストグラムに集計する
+
+    時間・トークン数の大きい呼び出しは文書番号付きで上位 keep 件を保持し、
+    クォータの見積もりや遅い・高コストな文書の特定に使う。
+    """
+
+    def __init__(self, keep: int = 10):
+        self.keep = keep
+        self.calls: Counter = Counter()  # (プロンプト, 結果) → 件数
+        self.retries: Counter = Counter()  # (プロンプト, エラーの種類) → 件数
+        self.attempts: Counter = Counter()
+        self.input_tokens: Counter = Counter()
+        self.output_tokens: Counter = Counter()
+        self.latency: Dict[str, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.input_histogram: Dict[str, Histogram] = defaultdict(
+            lambda: Histogram(TOKEN_BUCKETS)
+        )
+        self.output_histogram: Dict[str, Histogram] = defaultdict(
+            lambda: Histogram(TOKEN_BUCKETS)
+        )
+        self._slowest: List[Tuple[float, int, LlmCallRecord]] = []
+        self._largest: List[Tuple[float, int, LlmCallRecord]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def record(self, call: LlmCallRecord) -> None:
+        prompt = call.prompt_filename
+        with self._lock:
+            self.calls[(prompt, call.outcome)] += 1
+            if call.cached:
+                return
+            for error in call.retried:
+                self.retries[(prompt, error)] += 1
+            self.attempts[prompt] += call.attempts
+            self.input_tokens[prompt] += call.input_tokens
+            self.output_tokens[prompt] += call.output_tokens
+            self.latency[prompt].observe(call.latency)
+            self.input_histogram[prompt].observe(call.input_tokens)
+            if call.output_tokens:
+                self.output_histogram[prompt].observe(call.output_tokens)
+            self._seq += 1
+            self._push(self._slowest, call.latency, call)
+            self._push(self._largest, call.input_tokens + call.output_tokens, call)
+
+    def _push(self, heap, value: float, call: LlmCallRecord) -> None:
+        entry = (value, self._seq, call)
+        if len(heap) < self.keep:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+
+    def slowest(self) -> List[LlmCallRecord]:
+        """
+        所要時間の長い順の呼び出し
+        """
+        with self._lock:
+            return [call for _, _, call in sorted(self._slowest, reverse=True)]
+
+    def largest(self) -> List[LlmCallRecord]:
+        """
+        入出力のトークン数の多い順の呼び出し
+        """
+        with self._lock:
+            return [call for _, _, call in sorted(self._largest, reverse=True)]
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheusのテキスト形式で出力する
+        """
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP llm_calls_total LLM extraction calls by outcome",
+                "# TYPE llm_calls_total counter",
+            ]
+            for (prompt, outcome), count in sorted(self.calls.items()):
+                lines.append(f'llm_calls_total{{prompt="{prompt}",outcome="{outcome}"}} {count}')
+            lines += [
+                "# HELP llm_retries_total Retried LLM requests by error",
+                "# TYPE llm_retries_total counter",
+            ]
+            for (prompt, error), count in sorted(self.retries.items()):
+                lines.append(f'llm_retries_total{{prompt="{prompt}",error="{error}"}} {count}')
+            for name, counter, help_text in (
+                ("llm_attempts_total", self.attempts, "LLM requests including retries"),
+                ("llm_input_tokens_total", self.input_tokens, "Prompt tokens"),
+                ("llm_output_tokens_total", self.output_tokens, "Response tokens"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for prompt, count in sorted(counter.items()):
+                    lines.append(f'{name}{{prompt="{prompt}"}} {count}')
+            for name, histograms, help_text in (
+                ("llm_latency_seconds", self.latency, "Wall time per extraction"),
+                ("llm_input_tokens", self.input_histogram, "Prompt tokens per call"),
+                ("llm_output_tokens", self.output_histogram, "Response tokens per call"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for prompt, histogram in sorted(histograms.items()):
+                    lines += histogram.lines(name, f'prompt="{prompt}"')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        node_exporter の textfile collector が途中の内容を読まないよう、一時ファイルから置き換える
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        with self._lock:
+            total = sum(self.calls.values())
+            cached = sum(n for (_, outcome), n in self.calls.items() if outcome == "cached")
+            failed = sum(
+                n for (_, outcome), n in self.calls.items() if outcome not in ("ok", "cached")
+            )
+            attempts = sum(self.attempts.values())
+            tokens = sum(self.input_tokens.values()) + sum(self.output_tokens.values())
+        return (
+            f"LLM呼び出し - 抽出:{total} (キャッシュ:{cached} 失敗:{failed}) "
+            f"リクエスト:{attempts} トークン:{tokens}"
+        )
+
+
+_metrics: Optional[LlmMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_llm_metrics() -> LlmMetrics:
+    """
+    プロセス内で共有するLLMのメトリクスを返す
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = LlmMetrics()
+        return _metrics
+
+
+def export_llm_metrics(metrics: Optional[LlmMetrics] = None) -> None:
+    """
+    集計をログに出力し、環境変数 LLM_METRICS_PATH があればPrometheus形式で書き出す
+    """
+    metrics = metrics or get_llm_metrics()
+    logger.info(metrics.summary())
+    for call in metrics.slowest()[:3]:
+        logger.info(
+            f"時間のかかったLLM呼び出し - {call.doc_id} {call.prompt_filename}: "
+            f"{call.latency:.1f}秒 試行:{call.attempts} トークン:{call.input_tokens}"
+        )
+    load_dotenv()
+    path = os.getenv("LLM_METRICS_PATH")
+    if path:
+        metrics.write_prometheus(path)
+        logger.info(f"LLMのメトリクスを書き出しました: {path}")
@@ -24,10 +24,18 @@ class Logger:
         )
         self.logger = logging.getLogger("GetStakeholderData")
 
+    def debug(self, message):
+        """デバッグログを出力"""
+        self.logger.debug(message)
+
     def info(self, message):
         """情報ログを出力"""
         self.logger.info(message)
 
+    def warning(self, message):
+        """警告ログを出力"""
+        self.logger.warning(message)
+
     def error(self, message):
         """エラーログを出力"""
         self.logger.error(message)
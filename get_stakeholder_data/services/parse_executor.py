@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from get_stakeholder_data.parser.xbrl_parser import ParsedXbrl, XbrlParser
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+
+@dataclass
+class WorkerResult:
+    """
+    ワーカープロセスでの1文書分のパース結果
+    """
+
+    pid: int
+    seconds: float
+    size: int  # XBRLファイルのサイズ（バイト）
+    parsed: Optional[ParsedXbrl] = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class WorkerStats:
+    """
+    ワーカープロセスごとの処理件数と処理時間
+    """
+
+    pid: int
+    documents: int = 0
+    failed: int = 0
+    bytes: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1e6 / self.busy_seconds if self.busy_seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"[pid:{self.pid}] 文書:{self.documents} 失敗:{self.failed} "
+            f"稼働:{self.busy_seconds:.1f}秒 {self.docs_per_second:.1f}件/秒 "
+            f"{self.mb_per_second:.1f}MB/秒"
+        )
+
+
+def parse_file(path: str, backend: Optional[str] = None) -> WorkerResult:
+    """
+    ワーカープロセスでXBRLファイルをパースし、TextBlockと表の行だけを返す
+    """
+    started = time.perf_counter()
+    # キャッシュから削除されていれば FileNotFoundError を呼び出し側に返す（取得し直す）
+    size = os.path.getsize(path)
+    try:
+        parsed, error = XbrlParser(path, backend=backend).to_parsed(), None
+    except Exception as e:
+        parsed, error = None, e
+    return WorkerResult(
+        pid=os.getpid(),
+        seconds=time.perf_counter() - started,
+        size=size,
+        parsed=parsed,
+        error=error,
+    )
+
+
+class ParseExecutor:
+    """
+    XbrlParser をプロセスプールで並列に実行する
+
+    XMLのパース・表の変換・テキストの整形はGILを保持するため、スレッドでは1コアしか使えない。
+    ワーカーにはXBRLファイルのパスだけを渡し、結果は ParsedXbrl（TextBlockと表の行）で受け取る。
+    """
+
+    def __init__(self, workers: Optional[int] = None, backend: Optional[str] = None):
+        """
+        Args:
+            workers (int): ワーカープロセス数
+                （省略時は環境変数 XBRL_PARSE_WORKERS、未設定ならCPU数）
+            backend (str): XbrlParser のバックエンド（etree / lxml）
+        """
+        if workers is None:
+            load_dotenv()
+            workers = int(os.getenv("XBRL_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"ワーカー数は1以上を指定してください: {workers}")
+        self.workers = workers
+        self.backend = backend
+        self.started_at = time.monotonic()
+        self._stats: Dict[int, WorkerStats] = {}
+        self._lock = threading.Lock()
+        # 呼び出し側のスレッドを引き継がないよう spawn で起動する
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, path: str) -> "Future[ParsedXbrl]":
+        """
+        XBRLファイル（.xbrl または .xbrl.gz）のパースを投入する
+        """
+        future: Future = Future()
+
+        def done(worker_future: Future) -> None:
+            try:
+                result = worker_future.result()
+            except Exception as e:
+                # ワーカープロセスが異常終了した場合など
+                future.set_exception(e)
+                return
+            self._record(result)
+            if result.error is not None:
+                future.set_exception(result.error)
+            else:
+                future.set_result(result.parsed)
+
+        self._pool.submit(parse_file, os.fspath(path), self.backend).add_done_callback(done)
+        return future
+
+    def parse(self, path: str) -> ParsedXbrl:
+        return self.submit(path).result()
+
+    def map(self, paths: Iterable[str]) -> Iterator[ParsedXbrl]:
+        """
+        まとめて投入し、投入した順に結果を返す
+        """
+        futures = [self.submit(path) for path in paths]
+        for future in futures:
+            yield future.result()
+
+    def _record(self, result: WorkerResult) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(result.pid, WorkerStats(pid=result.pid))
+            if result.error is None:
+                stats.documents += 1
+            else:
+                stats.failed += 1
+            stats.bytes += result.size
+            stats.busy_seconds += result.seconds
+
+    def stats(self) -> List[WorkerStats]:
+        with self._lock:
+            return [self._stats[pid] for pid in sorted(self._stats)]
+
+    def summary(self) -> str:
+        stats = self.stats()
+        documents = sum(s.documents for s in stats)
+        elapsed = time.monotonic() - self.started_at
+        return (
+            f"並列パース - ワーカー:{self.workers} 文書:{documents} "
+            f"失敗:{sum(s.failed for s in stats)} 経過:{elapsed:.1f}秒 "
+            f"{documents / elapsed if elapsed else 0.0:.1f}件/秒"
+        )
+
+    def log_stats(self) -> None:
+        """
+        全体とワーカーごとのスループットをログに出力する
+        """
+        logger.info(self.summary())
+        for stats in self.stats():
+            logger.info(stats.summary())
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+    def __enter__(self) -> "ParseExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
@@ -0,0 +1,170 @@
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+
+# Geminiのトークナイザーでの1トークンあたりの文字数（count_tokens で実測した値から多めに丸めたもの）
+# 英数字・記号・タグは約4文字で1トークン、日本語は約1文字で1トークン
+ASCII_CHARS_PER_TOKEN = 4.0
+NON_ASCII_CHARS_PER_TOKEN = 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する（実際のトークン数は応答の usage_metadata で精算する）
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    tokens = (
+        ascii_chars / ASCII_CHARS_PER_TOKEN
+        + (len(text) - ascii_chars) / NON_ASCII_CHARS_PER_TOKEN
+    )
+    return max(1, math.ceil(tokens))
+
+
+class TokenBucket:
+    """
+    capacity まで貯まり、1分あたり capacity ずつ補充されるトークンバケット
+    """
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # 1秒あたりの補充量
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        amount 分のトークンが貯まるまでの秒数（0なら即時に取得できる）
+        """
+        self._refill()
+        # 上限を超える要求は満タンになるまで待てば通す
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """
+        amount 分を追加で消費する（負なら返却する）
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """
+    LLM APIの呼び出しを1分あたりのリクエスト数（RPM）とトークン数（TPM）の予算内に抑える
+
+    スレッドから並行に acquire() を呼ぶと、予算がある限りは即時に通し、
+    使い切った場合は補充されるまで待たせる（終了はしない）。
+    サーバーから待機時間の指示（429 の retryDelay など）があれば pause() で全体を止める。
+    トークン数は呼び出し前に入力の概算で確保し、応答後に settle() で実際の入出力の合計に精算する。
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            rpm (float): 1分あたりのリクエスト数の上限（None なら制限しない）
+            tpm (float): 1分あたりの入出力トークン数の上限（None なら制限しない）
+        """
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self.waited_seconds = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        環境変数 GEMINI_RPM / GEMINI_TPM から予算を読み込む
+        """
+        load_dotenv()
+        rpm = os.getenv("GEMINI_RPM")
+        tpm = os.getenv("GEMINI_TPM")
+        return cls(
+            rpm=float(rpm) if rpm else None,
+            tpm=float(tpm) if tpm else None,
+        )
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        1リクエスト分と tokens 分の予算を確保する（足りなければ待つ）
+
+        Returns:
+            float: 待機した秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = max(0.0, self._paused_until - self._clock())
+                if self.requests:
+                    delay = max(delay, self.requests.wait_time(1))
+                if self.tokens:
+                    delay = max(delay, self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    if self.requests:
+                        self.requests.consume(1)
+                    if self.tokens:
+                        self.tokens.consume(tokens)
+                    self.waited_seconds += waited
+                    return waited
+            self._sleep(delay)
+            waited += delay
+
+    def settle(self, reserved: int, used: int) -> None:
+        """
+        acquire() で確保した reserved 分のトークンを、実際に使った used 分に精算する
+        """
+        if not self.tokens:
+            return
+        with self._lock:
+            self.tokens.adjust(used - reserved)
+
+    def pause(self, seconds: float) -> None:
+        """
+        サーバーの指示に従い、seconds 秒間すべての呼び出しを止める
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    プロセス内で共有するレートリミッターを返す
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter.from_env()
+        return _limiter
@@ -0,0 +1,163 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+from get_stakeholder_data.interface.database import SessionLocal
+from get_stakeholder_data.models.run_dates_model import RunDatesModel
+from get_stakeholder_data.models.run_docs_model import RunDocsModel
+from get_stakeholder_data.services.known_docs import find_existing_doc_ids
+from get_stakeholder_data.services.list_cache import REFRESH_DAYS
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+STATUS_IN_FLIGHT = "in_flight"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_PARTIAL = "partial"
+
+
+def _date_key(target) -> str:
+    return target.strftime("%Y-%m-%d")
+
+
+class RunState:
+    """
+    取り込みの進捗（日付・文書ごとの状態）をDBに保存し、再実行時に再開できるようにする
+
+    - run_dates: すべての文書の処理が終わった日付（done）と、失敗が残る日付（partial）
+    - run_docs: 文書ごとの状態（in_flight / done / failed）と試行回数・エラー内容
+
+    再実行時は done の日付を一覧取得ごとスキップし、それ以外の日付から再開する。
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_attempts: int = 3,
+        refresh_days: int = REFRESH_DAYS,
+    ):
+        """
+        Args:
+            session_factory: セッションのファクトリ
+            max_attempts (int): この回数失敗した文書は諦めて日付の完了判定から除外する
+            refresh_days (int): 一覧を再取得する直近の日数（DocumentListCache と同じ値にする）
+        """
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.refresh_days = refresh_days
+
+    def pending_dates(self, dates: Iterable[datetime]) -> List[datetime]:
+        """
+        処理が完了していない日付だけを返す
+        """
+        dates = list(dates)
+        if not dates:
+            return []
+        session = self.session_factory()
+        try:
+            done = {
+                row.date
+                for row in session.query(RunDatesModel.date).filter(
+                    RunDatesModel.date.in_([_date_key(d) for d in dates]),
+                    RunDatesModel.status == STATUS_DONE,
+                )
+            }
+        finally:
+            session.close()
+        pending = [d for d in dates if _date_key(d) not in done]
+        if len(pending) < len(dates):
+            logger.info(
+                f"処理済みの {len(dates) - len(pending)} 日分をスキップします"
+                + (f" - 再開日:{_date_key(pending[0])}" if pending else "")
+            )
+        return pending
+
+    def start_doc(self, doc_id: str, target_date) -> None:
+        """
+        文書の処理開始を記録する
+        """
+        self._update_doc(doc_id, target_date, STATUS_IN_FLIGHT)
+
+    def finish_doc(
+        self, doc_id: str, target_date, error: Optional[Exception] = None
+    ) -> None:
+        """
+        文書の処理結果を記録する（error があれば失敗として記録）
+        """
+        if error is None:
+            self._update_doc(doc_id, target_date, STATUS_DONE)
+        else:
+            self._update_doc(doc_id, target_date, STATUS_FAILED, str(error))
+
+    def _update_doc(
+        self, doc_id: str, target_date, status: str, error: Optional[str] = None
+    ) -> None:
+        session = self.session_factory()
+        try:
+            row = session.get(RunDocsModel, doc_id)
+            if row is None:
+                row = RunDocsModel(doc_id=doc_id, attempts=0)
+                session.add(row)
+            row.date = _date_key(target_date)
+            row.status = status
+            row.error = error
+            row.updated_at = datetime.now()
+            if status == STATUS_IN_FLIGHT:
+                row.attempts = (row.attempts or 0) + 1
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"実行状態の保存に失敗しました - doc_id:{doc_id}, エラー内容: {e}")
+        finally:
+            session.close()
+
+    def finish_date(self, target_date, doc_ids: Iterable[str]) -> bool:
+        """
+        日付内の文書がすべて処理済みか判定し、日付の状態を記録する
+
+        当日と直近 refresh_days 日は書類が追加されうる（一覧を再取得する）ため完了扱いにしない。
+
+        Returns:
+            bool: 完了（done）として記録した場合 True
+        """
+        doc_ids = list(doc_ids)
+        key = _date_key(target_date)
+        session = self.session_factory()
+        try:
+            ingested = find_existing_doc_ids(session, doc_ids)
+            failed = [
+                row
+                for row in session.query(RunDocsModel).filter(
+                    RunDocsModel.doc_id.in_(doc_ids),
+                    RunDocsModel.status != STATUS_DONE,
+                )
+                if row.doc_id not in ingested
+            ]
+            given_up = [r for r in failed if r.attempts >= self.max_attempts]
+            remaining = [d for d in doc_ids if d not in ingested]
+            settled = _as_date(target_date) < date.today() - timedelta(days=self.refresh_days)
+            is_done = len(remaining) == len(given_up) and settled
+
+            row = session.get(RunDatesModel, key) or RunDatesModel(date=key)
+            row.status = STATUS_DONE if is_done else STATUS_PARTIAL
+            row.doc_count = len(doc_ids)
+            row.failed_count = len(failed)
+            row.updated_at = datetime.now()
+            session.merge(row)
+            session.commit()
+            if given_up:
+                logger.warning(
+                    f"{len(given_up)} 件の文書は {self.max_attempts} 回失敗したため再試行しません - date:{key}"
+                )
+            return is_done
+        except Exception as e:
+            session.rollback()
+            logger.error(f"実行状態の保存に失敗しました - date:{key}, エラー内容: {e}")
+            return False
+        finally:
+            session.close()
+
+
+def _as_date(target) -> date:
+    return target.date() if isinstance(target, datetime) else target
@@ -0,0 +1,174 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.models.directors_model import DirectorsModel
+from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.models.shareholders_model import ShareholdersModel
+
+# LLMの出力の各行に必要な項目（値が文字列である必要があるもの）
+OFFICER_FIELDS = ("役職名", "氏名", "生年月日", "略歴", "所有株式数(千株)")
+SHAREHOLDER_FIELDS = ("氏名又は名称", "住所", "所有株式数(千株)", "所有割合(％)")
+# 分割して抽出した役員の重複を判定する項目
+OFFICER_ID_FIELDS = ("氏名", "生年月日")
+
+
+def to_directors(officers: Optional[Dict[str, Any]]) -> List[Director]:
+    """
+    LLMの出力（役員の状況）をDirectorのリストに変換する
+    """
+    directors = []
+    for officer in officers["役員の状況"]["data"]:
+        directors.append(
+            Director(
+                name=officer["氏名"].replace("\u3000", " ").replace("\n", " ").strip(),
+                title=officer["役職名"].replace("\u3000", " ").strip(),
+                birth_date=officer["生年月日"].replace("\u3000", " ").strip(),
+                biography=officer["略歴"].replace("\u3000", " ").strip(),
+                shares_owned=officer["所有株式数(千株)"],
+            )
+        )
+    return directors
+
+
+def to_shareholders(major_shareholders: Optional[Dict[str, Any]]) -> List[Shareholder]:
+    """
+    LLMの出力（大株主の状況）をShareholderのリストに変換する（「計」の行は除く）
+    """
+    shareholders = []
+    for shareholder in major_shareholders["大株主の状況"]["data"]:
+        if shareholder["氏名又は名称"] == "計":
+            continue
+        shareholders.append(
+            Shareholder(
+                name=shareholder["氏名又は名称"].replace("\u3000", " ").strip(),
+                address=shareholder["住所"].replace("\u3000", " ").strip(),
+                shares_held=shareholder["所有株式数(千株)"],
+                ownership_ratio=shareholder["所有割合(％)"],
+            )
+        )
+    return shareholders
+
+
+def is_valid_section(result: Any, key: str, fields: Tuple[str, ...]) -> bool:
+    """
+    LLMの出力が {key: {"data": [行, ...]}} の形で、各行に fields の文字列を持つか判定する
+    """
+    section = result.get(key) if isinstance(result, dict) else None
+    if not isinstance(section, dict):
+        return False
+    rows = section.get("data")
+    if not isinstance(rows, list) or not rows:
+        return False
+    return all(is_valid_row(row, fields) for row in rows)
+
+
+def is_valid_row(row: Any, fields: Tuple[str, ...]) -> bool:
+    """
+    LLMの出力の1行が fields の文字列を持つか判定する
+    """
+    return isinstance(row, dict) and all(isinstance(row.get(f), str) for f in fields)
+
+
+def split_combined(
+    result: Any,
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    役員・大株主をまとめて抽出した出力を、それぞれの形に分ける
+
+    Returns:
+        tuple: ({"役員の状況": ...}, {"大株主の状況": ...})。形が不正な場合は None。
+    """
+    if not is_valid_section(result, "役員の状況", OFFICER_FIELDS):
+        return None
+    if not is_valid_section(result, "大株主の状況", SHAREHOLDER_FIELDS):
+        return None
+    return {"役員の状況": result["役員の状況"]}, {"大株主の状況": result["大株主の状況"]}
+
+
+def merge_sections(
+    results: List[Dict[str, Any]], key: str, id_fields: Tuple[str, ...]
+) -> Dict[str, Any]:
+    """
+    分割して抽出した出力を順につなぎ、チャンクの境目で重複した行を除く
+
+    Args:
+        results (list): {key: {"date": ..., "data": [...]}} のリスト（チャンクの順）
+        id_fields (tuple): 同じ行とみなす項目（空白の違いは無視する）
+
+    Returns:
+        dict: {key: {"date": 最初の date, "data": [...]}}
+    """
+    date = ""
+    rows = []
+    seen = set()
+    for result in results:
+        section = result[key]
+        date = date or section.get("date", "")
+        for row in section["data"]:
+            identity = tuple(re.sub(r"\s+", "", str(row.get(f, ""))) for f in id_fields)
+            if identity in seen:
+                continue
+            seen.add(identity)
+            rows.append(row)
+    return {key: {"date": date, "data": rows}}
+
+
+def doc_row(doc: Doc) -> Dict[str, Any]:
+    """
+    docsテーブルへの一括INSERT用の行
+    """
+    return {
+        "doc_id": doc.doc_id,
+        "sec_code": doc.sec_code,
+        "filer_name": doc.filer_name,
+        "period_start": doc.period_start,
+        "period_end": doc.period_end,
+        "submit_datetime": doc.submit_datetime,
+        "doc_description": doc.doc_description,
+    }
+
+
+def director_row(director: Director, doc_id: str) -> Dict[str, Any]:
+    """
+    directorsテーブルへの一括INSERT用の行
+    """
+    return {
+        "doc_id": doc_id,
+        "name": director.name,
+        "title": director.title,
+        "birth_date": director.birth_date,
+        "biography": director.biography,
+        "shares_owned": director.shares_owned,
+    }
+
+
+def shareholder_row(shareholder: Shareholder, doc_id: str) -> Dict[str, Any]:
+    """
+    shareholdersテーブルへの一括INSERT用の行
+    """
+    return {
+        "doc_id": doc_id,
+        "name": shareholder.name,
+        "address": shareholder.address,
+        "shares_held": shareholder.shares_held,
+        "ownership_ratio": shareholder.ownership_ratio,
+    }
+
+
+def save_document(
+    session,
+    doc: Doc,
+    directors: List[Director],
+    shareholders: List[Shareholder],
+) -> None:
+    """
+    1文書分のドキュメント・役員・株主をセッションに追加する（コミットは呼び出し側）
+    """
+    session.add(DocsModel.from_dataclass(doc))
+    for director in directors:
+        session.add(DirectorsModel.from_dataclass(director, doc.doc_id))
+    for shareholder in shareholders:
+        session.add(ShareholdersModel.from_dataclass(shareholder, doc.doc_id))
@@ -0,0 +1,563 @@
+import gzip
+import hashlib
+import io
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import IO, Optional, Union
+
+from dotenv import load_dotenv
+
+from get_stakeholder_data.services.logger import Logger
+
+# ロガーの初期化
+logger = Logger()
+
+INDEX_FILENAME = "index.sqlite3"
+# 保存・展開時のチャンクサイズ（バイト）
+CHUNK_SIZE = 1024 * 1024
+# 壊れた・途中で切れたファイルを読んだときの例外（BadGzipFile は OSError）
+CORRUPT_ERRORS = (OSError, EOFError, zlib.error)
+
+
+@dataclass
+class XbrlCacheStats:
+    """
+    XBRLキャッシュの統計情報
+    """
+
+    hits: int
+    misses: int
+    entries: int
+    raw_bytes: int
+    stored_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.raw_bytes - self.stored_bytes
+
+
+class XbrlCache:
+    """
+    XBRLファイルを圧縮して保存するキャッシュ
+
+    ファイルは {cache_dir}/{company_code}/{doc_id}.xbrl.gz にgzip圧縮で保存し
+    （compress=False なら {doc_id}.xbrl に非圧縮で保存し）、
+    doc_id から保存先・サイズ・チェックサム（展開後の内容と保存したファイルのそれぞれ）を
+    引くインデックスをSQLiteで持つ。
+    max_bytes を超えた場合は最終アクセスが古いものから削除する（LRU）。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "xbrl_data",
+        max_bytes: Optional[int] = None,
+        compress_level: int = 6,
+        compress: bool = True,
+    ):
+        """
+        Args:
+            cache_dir (str): キャッシュの保存先ディレクトリ
+            max_bytes (int): 圧縮後の合計サイズの上限（Noneなら無制限）
+            compress_level (int): gzipの圧縮レベル（1-9）
+            compress (bool): gzip圧縮して保存するか（Falseならファイルをそのままメモリマップできる）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, INDEX_FILENAME),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                doc_id TEXT PRIMARY KEY,
+                company_code TEXT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                checksum TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                stored_checksum TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "stored_checksum" not in columns:
+            # 保存したファイルのチェックサムを持たない旧形式のインデックス
+            self._conn.execute("ALTER TABLE entries ADD COLUMN stored_checksum TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)"
+        )
+
+    def path_for(self, doc_id: str, company_code: str = "unknown") -> str:
+        """
+        XBRLファイルの保存先のパス
+        """
+        suffix = ".xbrl.gz" if self.compress else ".xbrl"
+        return os.path.join(self.cache_dir, company_code, f"{doc_id}{suffix}")
+
+    def _lookup(self, doc_id: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, checksum, stored_checksum FROM entries WHERE doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+            if row is None or not os.path.exists(os.path.join(self.cache_dir, row[0])):
+                if row is not None:
+                    # ファイルが消えている場合はインデックスからも削除
+                    self._conn.execute("DELETE FROM entries WHERE doc_id = ?", (doc_id,))
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE doc_id = ?",
+                (time.time(), doc_id),
+            )
+            return row
+
+    def _hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def _invalidate(self, doc_id: str, reason: str) -> None:
+        """
+        読み出せないエントリを削除し、キャッシュミスとして数える
+        """
+        logger.warning(f"XBRLキャッシュの{reason} - doc_id:{doc_id}")
+        self.delete(doc_id)
+        with self._lock:
+            self.misses += 1
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, doc_id: str, verify: bool = True) -> Optional[bytes]:
+        """
+        キャッシュからXBRLファイルを読み込む（なければNone）
+
+        Args:
+            doc_id (str): 文書番号
+            verify (bool): チェックサムを検証するか
+        """
+        row = self._lookup(doc_id)
+        if row is None:
+            return None
+        path, _, checksum, _ = row
+        try:
+            with _open_entry(os.path.join(self.cache_dir, path)) as f:
+                data = f.read()
+        except CORRUPT_ERRORS as e:
+            self._invalidate(doc_id, f"ファイルが壊れています: {e}")
+            return None
+        if verify and hashlib.sha256(data).hexdigest() != checksum:
+            self._invalidate(doc_id, "チェックサムが一致しません")
+            return None
+        self._hit()
+        return data
+
+    def open(self, doc_id: str) -> Optional[IO[bytes]]:
+        """
+        キャッシュのXBRLファイルを展開しながら読むストリームを返す（なければNone）
+        """
+        row = self._lookup(doc_id)
+        if row is None:
+            return None
+        self._hit()
+        return _open_entry(os.path.join(self.cache_dir, row[0]))
+
+    def locate(self, doc_id: str, verify: bool = True) -> Optional[str]:
+        """
+        キャッシュのXBRLファイルのパスを返す（なければNone）
+
+        .xbrl.gz のパスは XbrlParser が展開しながら読む。
+        検証は保存したファイルのチェックサムで行い、展開はしない
+        （チェックサムを持たない旧形式のエントリのみ、一度だけ展開して検証する）。
+
+        Args:
+            doc_id (str): 文書番号
+            verify (bool): チェックサムを検証するか
+        """
+        row = self._lookup(doc_id)
+        if row is None:
+            return None
+        rel_path, _, checksum, stored_checksum = row
+        path = os.path.join(self.cache_dir, rel_path)
+        if verify:
+            try:
+                if stored_checksum is None:
+                    with _open_entry(path) as f:
+                        valid = _sha256(f) == checksum
+                    if valid:
+                        self._set_stored_checksum(doc_id, path)
+                else:
+                    with open(path, "rb") as f:
+                        valid = _sha256(f) == stored_checksum
+            except CORRUPT_ERRORS as e:
+                self._invalidate(doc_id, f"ファイルが壊れています: {e}")
+                return None
+            if not valid:
+                self._invalidate(doc_id, "チェックサムが一致しません")
+                return None
+        self._hit()
+        return path
+
+    def _set_stored_checksum(self, doc_id: str, path: str) -> None:
+        with open(path, "rb") as f:
+            stored_checksum = _sha256(f)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET stored_checksum = ? WHERE doc_id = ?",
+                (stored_checksum, doc_id),
+            )
+
+    def view(self, doc_id: str, verify: bool = True) -> Optional[memoryview]:
+        """
+        キャッシュのXBRLファイルをメモリマップした読み取り専用のビューを返す（なければNone）
+
+        非圧縮のファイルはそのままメモリマップし、圧縮したファイルは匿名のメモリマップへ展開する。
+        いずれもPythonのヒープには文書全体をコピーしない。
+
+        Args:
+            doc_id (str): 文書番号
+            verify (bool): チェックサムを検証するか
+        """
+        row = self._lookup(doc_id)
+        if row is None:
+            return None
+        path, size, checksum, _ = row
+        try:
+            buffer = _map_entry(os.path.join(self.cache_dir, path), size)
+        except CORRUPT_ERRORS as e:
+            self._invalidate(doc_id, f"ファイルが壊れています: {e}")
+            return None
+        if buffer is None or (
+            verify and hashlib.sha256(buffer).hexdigest() != checksum
+        ):
+            self._invalidate(doc_id, "チェックサムが一致しません")
+            return None
+        self._hit()
+        return memoryview(buffer).toreadonly()
+
+    def put(self, doc_id: str, data: bytes, company_code: str = "unknown") -> None:
+        """
+        XBRLファイルを圧縮して保存する
+        """
+        self._store(doc_id, io.BytesIO(data), company_code)
+        self.evict()
+
+    def put_stream(
+        self, doc_id: str, stream: IO[bytes], company_code: str = "unknown"
+    ) -> memoryview:
+        """
+        ストリームからXBRLファイルをチャンク単位で保存し、保存した内容の読み取り専用のビューを返す
+
+        非圧縮のキャッシュでは保存したファイルをそのままメモリマップする。
+        圧縮する場合は保存したファイルを展開し直さず、受け取った内容を書いた一時ファイルをマップする。
+        """
+        if not self.compress:
+            rel_path, size = self._store(doc_id, stream, company_code)
+            # 上限が小さくすぐに削除される場合でも、先にマップしておけば読み出せる
+            buffer = _map_entry(os.path.join(self.cache_dir, rel_path), size)
+        else:
+            with tempfile.TemporaryFile() as spool:
+                _, size = self._store(doc_id, stream, company_code, copy=spool)
+                spool.flush()
+                buffer = (
+                    mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+                )
+        self.evict()
+        return memoryview(buffer).toreadonly()
+
+    def store_stream(
+        self, doc_id: str, stream: IO[bytes], company_code: str = "unknown"
+    ) -> str:
+        """
+        ストリームからXBRLファイルをチャンク単位で保存し、保存先のパスを返す（内容は読み出さない）
+
+        別プロセスでパースする場合に使う。保存した文書自体は上限を超えても直後には削除しない。
+        """
+        rel_path, _ = self._store(doc_id, stream, company_code)
+        self.evict(keep=doc_id)
+        return os.path.join(self.cache_dir, rel_path)
+
+    def index_existing(self, doc_id: str, company_code: str = "unknown") -> memoryview:
+        """
+        非圧縮のキャッシュの保存先に既にあるファイルを、書き直さずにインデックスへ登録する
+
+        Returns:
+            memoryview: ファイルをメモリマップした読み取り専用のビュー
+
+        Raises:
+            ValueError: 圧縮して保存するキャッシュの場合
+        """
+        if self.compress:
+            raise ValueError("既存ファイルの登録は非圧縮のキャッシュでのみ使えます")
+        path = self.path_for(doc_id, company_code)
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        rel_path = os.path.relpath(path, self.cache_dir)
+        checksum = digest.hexdigest()
+        self._index(doc_id, company_code, rel_path, size, checksum, checksum)
+        buffer = _map_entry(path, size)
+        self.evict()
+        return memoryview(buffer).toreadonly()
+
+    def _store(
+        self,
+        doc_id: str,
+        stream: IO[bytes],
+        company_code: str,
+        copy: Optional[IO[bytes]] = None,
+    ) -> tuple:
+        path = self.path_for(doc_id, company_code)
+        rel_path = os.path.relpath(path, self.cache_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 一時ファイルに書いてから置き換える
+        digest = hashlib.sha256()
+        stored_digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                raw = _HashingWriter(file, stored_digest)
+                out = raw
+                if self.compress:
+                    out = gzip.GzipFile(
+                        fileobj=raw, mode="wb", compresslevel=self.compress_level, mtime=0
+                    )
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+                    if copy is not None:
+                        copy.write(chunk)
+                if out is not raw:
+                    out.close()
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._index(
+            doc_id,
+            company_code,
+            rel_path,
+            size,
+            digest.hexdigest(),
+            stored_digest.hexdigest(),
+        )
+        return rel_path, size
+
+    def _index(
+        self,
+        doc_id: str,
+        company_code: str,
+        rel_path: str,
+        size: int,
+        checksum: str,
+        stored_checksum: str,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (doc_id, company_code, path, size, stored_size, checksum,
+                     created_at, last_access, stored_checksum)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    doc_id,
+                    company_code,
+                    rel_path,
+                    size,
+                    os.path.getsize(os.path.join(self.cache_dir, rel_path)),
+                    checksum,
+                    now,
+                    now,
+                    stored_checksum,
+                ),
+            )
+
+    def delete(self, doc_id: str) -> None:
+        """
+        キャッシュからエントリを削除する
+        """
+        with self._lock:
+            self._delete_locked(doc_id)
+
+    def _delete_locked(self, doc_id: str) -> None:
+        row = self._conn.execute(
+            "SELECT path FROM entries WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        self._conn.execute("DELETE FROM entries WHERE doc_id = ?", (doc_id,))
+        if row is not None:
+            path = os.path.join(self.cache_dir, row[0])
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        合計サイズが上限を超えている間、最終アクセスが古いものから削除する
+
+        Args:
+            keep (str): 削除しない文書番号（保存した直後のパスを返す場合など）
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        if self.max_bytes is None:
+            return 0
+        evicted = 0
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(stored_size), 0) FROM entries"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for doc_id, stored_size in self._conn.execute(
+                "SELECT doc_id, stored_size FROM entries ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                if doc_id == keep:
+                    continue
+                self._delete_locked(doc_id)
+                total -= stored_size
+                evicted += 1
+        if evicted:
+            logger.info(f"XBRLキャッシュから {evicted} 件を削除しました")
+        return evicted
+
+    def stats(self) -> XbrlCacheStats:
+        """
+        ヒット率・保存件数・圧縮による削減バイト数を返す
+        """
+        with self._lock:
+            entries, raw_bytes, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) "
+                "FROM entries"
+            ).fetchone()
+        return XbrlCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=entries,
+            raw_bytes=raw_bytes,
+            stored_bytes=stored_bytes,
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _HashingWriter:
+    """
+    書き込んだバイト列のハッシュを計算しながらファイルに書く
+    """
+
+    def __init__(self, file: IO[bytes], digest):
+        self.file = file
+        self.digest = digest
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def _sha256(f: IO[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open_entry(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _map_entry(path: str, size: int) -> Optional[Union[mmap.mmap, bytes]]:
+    """
+    保存したファイルをメモリマップする（展開後のサイズが size と異なればNone）
+    """
+    if size == 0:
+        # 長さ0はマップできないため空のバイト列を返す
+        with _open_entry(path) as f:
+            return None if f.read(1) else b""
+    if not path.endswith(".gz"):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return buffer if len(buffer) == size else None
+
+    buffer = mmap.mmap(-1, size)
+    view = memoryview(buffer)
+    filled = 0
+    with gzip.open(path, "rb") as f:
+        while filled < size:
+            n = f.readinto(view[filled : filled + CHUNK_SIZE])
+            if not n:
+                break
+            filled += n
+        complete = filled == size and not f.read(1)
+    view.release()
+    if not complete:
+        buffer.close()
+        return None
+    return buffer
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_xbrl_cache(cache_dir: str = "xbrl_data") -> XbrlCache:
+    """
+    保存先ディレクトリごとに共有するXBRLキャッシュを返す
+
+    サイズ上限は環境変数 XBRL_CACHE_MAX_BYTES で指定する（未設定なら無制限）。
+    XBRL_CACHE_COMPRESS=0 なら非圧縮で保存する（再処理でファイルをそのままメモリマップする）。
+    """
+    with _caches_lock:
+        if cache_dir not in _caches:
+            load_dotenv()
+            max_bytes = os.getenv("XBRL_CACHE_MAX_BYTES")
+            _caches[cache_dir] = XbrlCache(
+                cache_dir,
+                max_bytes=int(max_bytes) if max_bytes else None,
+                compress=os.getenv("XBRL_CACHE_COMPRESS", "1") != "0",
+            )
+        return _caches[cache_dir]
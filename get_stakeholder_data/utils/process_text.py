@@ -1,5 +1,8 @@
 import re
+import threading
 from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from lxml import etree
 
 
 def clean_text(text):
@@ -38,10 +41,116 @@ from bs4 import BeautifulSoup
 import html
 
 
+# BeautifulSoup（html.parser）が特別に扱うタグ。これらを含むHTMLは BeautifulSoup で処理する
+_SOUP_STRING_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_SOUP_VOID_ELEMENTS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+# XMLの定義済み実体だけのエスケープかどうか（それ以外の & があれば html.unescape を使う）
+_OTHER_REFERENCE = re.compile(r"&(?!(?:lt|gt|amp|quot|#39);)")
+# BeautifulSoup はタグ名を小文字にし、名前空間を解釈しないため、これらを含むHTMLは対象外
+_UPPERCASE_OR_PREFIXED_TAG = re.compile(r"</?[^\s/>!?]*[A-Z:]|\sxmlns[\s=:]")
+_local = threading.local()
+
+
+def _unescape(text: str) -> str:
+    """
+    html.unescape と同じ結果を返す（TextBlockに多い &lt; &gt; &amp; &quot; &#39; だけの場合は高速に処理する）
+    """
+    if _OTHER_REFERENCE.search(text):
+        return html.unescape(text)
+    return (
+        text.replace("&lt;", "<")
+        .replace("&gt;", ">")
+        .replace("&quot;", '"')
+        .replace("&#39;", "'")
+        .replace("&amp;", "&")
+    )
+
+
+def _xml_parser() -> etree.XMLParser:
+    # lxmlのパーサーはスレッドごとに持つ
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = etree.XMLParser(
+            resolve_entities=False, no_network=True, load_dtd=False, strip_cdata=False
+        )
+        _local.parser = parser
+    return parser
+
+
+def _joined_text(element) -> str:
+    # BeautifulSoup の get_text(strip=True) と同じく、文字列ごとに前後の空白を除いて連結する
+    if not len(element):
+        return (element.text or "").strip()
+    return "".join([text.strip() for text in element.itertext()])
+
+
+def _parse_xhtml(html_str: str):
+    """
+    XHTMLとして整形式で、BeautifulSoup（html.parser）と同じ木になるHTMLだけをlxmlで解析する
+
+    Returns:
+        ルート要素（BeautifulSoup と結果が変わりうるHTMLの場合は None）
+    """
+    # XMLでは改行の正規化・CDATAの連結により文字列の区切りが変わる
+    if "\r" in html_str or "<![CDATA[" in html_str:
+        return None
+    if _UPPERCASE_OR_PREFIXED_TAG.search(html_str):
+        return None
+    try:
+        root = etree.fromstring(f"<root>{html_str}</root>", _xml_parser())
+    except etree.XMLSyntaxError:
+        return None
+    # script・rt などの文字列は get_text に含まれない
+    for _ in root.iter(*_SOUP_STRING_CONTAINERS):
+        return None
+    # html.parser は空要素（br など）に子を持たせない
+    for element in root.iter(*_SOUP_VOID_ELEMENTS):
+        if element.text or len(element):
+            return None
+    # コメント・処理命令は get_text と同じく文字列に含めないため、そのままでよい
+    return root
+
+
 def html_table_to_array(html_str: str) -> list[list[str]]:
     """
     HTMLテーブルを配列形式に変換する
 
+    EDINETのTextBlockのような整形式のXHTMLはlxmlで解析し、それ以外は BeautifulSoup で解析する。
+    どちらの場合も html_table_to_array_soup と同じ結果を返す。
+
+    Args:
+        html_str (str): HTML文字列（&lt;などが含まれていてもOK）
+
+    Returns:
+        list of list: 行ごとのテキスト配列
+    """
+    if not html_str:
+        return []
+
+    root = _parse_xhtml(_unescape(html_str))
+    if root is None:
+        return html_table_to_array_soup(html_str)
+
+    table = []
+    for row in root.iter("tr"):
+        cells = []
+        for cell in row.iter("td", "th"):
+            # 各セル内のすべての <p> や <br> を含めて " / " で結合
+            text_parts = []
+            for p in cell.iter("p", "br"):
+                txt = _joined_text(p)
+                if txt:
+                    text_parts.append(txt)
+            cells.append(" / ".join(text_parts) if text_parts else _joined_text(cell))
+        if cells:
+            table.append(cells)
+    return table
+
+
+def html_table_to_array_soup(html_str: str) -> list[list[str]]:
+    """
+    HTMLテーブルを BeautifulSoup（html.parser）で配列形式に変換する（html_table_to_array の基準となる実装）
+
     Args:
         html_str (str): HTML文字列（&lt;などが含まれていてもOK）
 
@@ -82,3 +191,76 @@ def html_table_to_array(html_str: str) -> list[list[str]]:
             table.append(cells)
 
     return table
+
+
+def compact_block(html_str: str) -> str:
+    """
+    TextBlockのHTMLをLLMに渡すための最小限のテキストに変換する
+
+    表は html_table_to_array と同じ規則でセルを取り出してTSV（1行1レコード、タブ区切り）にし、
+    表以外の文（「2025年3月31日現在」や注記など）はタグを除いて1行ずつ残す。
+    style属性や span などのマークアップはすべて除かれる。
+
+    Args:
+        html_str (str): HTML文字列（&lt;などが含まれていてもOK）
+
+    Returns:
+        str: 圧縮したテキスト
+    """
+    if not html_str:
+        return ""
+
+    soup = BeautifulSoup(html.unescape(html_str), "html.parser")
+    for table in soup.find_all("table"):
+        if table.parent is None:
+            continue  # 外側の表と一緒に置き換え済み
+        rows = [
+            "\t".join(clean_text(cell) for cell in row)
+            for row in html_table_to_array(str(table))
+        ]
+        table.replace_with("\n" + "\n".join(rows) + "\n")
+
+    lines = []
+    for line in soup.get_text("\n").split("\n"):
+        line = re.sub(r" +", " ", line).strip(" ")
+        if line.strip():
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def split_table_rows(text: str, max_chars: int, overlap: int = 1) -> list[str]:
+    """
+    compact_block で圧縮したテキストを、表の行の境目で max_chars 文字程度ずつに分割する
+
+    各チャンクには最初の表の行（見出し）までを付け、隣り合うチャンクは overlap 行ずつ重ねる
+    （行をまたぐ記載を取りこぼさないため。重複は呼び出し側で除く）。
+    最後の表の行より後の文（注記など）は最後のチャンクに付ける。
+
+    Returns:
+        list: チャンクのリスト（分割不要な場合はテキストそのものだけ）
+    """
+    lines = text.split("\n")
+    rows = [i for i, line in enumerate(lines) if "\t" in line]
+    if len(text) <= max_chars or len(rows) < 3:
+        return [text]
+
+    head = lines[: rows[0] + 1]
+    body = lines[rows[0] + 1 : rows[-1] + 1]
+    tail = lines[rows[-1] + 1 :]
+    budget = max_chars - len("\n".join(head))
+
+    chunks = []
+    start = 0
+    while True:
+        end = start
+        size = 0
+        # 重ねた行に加えて最低1行は新しい行を含める
+        minimum = start + (overlap if chunks else 0) + 1
+        while end < len(body) and (end < minimum or size + len(body[end]) + 1 <= budget):
+            size += len(body[end]) + 1
+            end += 1
+        if end >= len(body):
+            chunks.append("\n".join(head + body[start:] + tail))
+            return chunks
+        chunks.append("\n".join(head + body[start:end]))
+        start = max(start + 1, end - overlap)
@@ -0,0 +1,485 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from get_stakeholder_data.services.ai_parser import GeminiExtractor, log_compaction_stats
+from get_stakeholder_data.services.llm_backend import ReplayBackend
+from get_stakeholder_data.services.llm_cache import LlmCache
+from get_stakeholder_data.services.llm_metrics import LlmMetrics
+from get_stakeholder_data.services.rate_limiter import RateLimiter
+
+
+COMBINED = {
+    "役員の状況": {
+        "date": "2025年6月20日現在",
+        "data": [
+            {
+                "役職名": "代表取締役社長",
+                "氏名": "山田 太郎",
+                "生年月日": "1960年1月1日生",
+                "略歴": "1983年4月 当社入社",
+                "所有株式数(千株)": "10",
+            }
+        ],
+    },
+    "大株主の状況": {
+        "date": "2025年3月31日現在",
+        "data": [
+            {
+                "氏名又は名称": "日本マスタートラスト信託銀行株式会社",
+                "住所": "東京都港区赤坂一丁目8番1号",
+                "所有株式数(千株)": "1,000",
+                "所有割合(％)": "10.00",
+            }
+        ],
+    },
+}
+
+OFFICER_HTML = (
+    '&lt;table style="width: 100%"&gt;&lt;tr&gt;'
+    '&lt;td style="text-align: left"&gt;&lt;p&gt;代表取締役社長&lt;/p&gt;&lt;/td&gt;'
+    '&lt;td style="text-align: left"&gt;&lt;p&gt;山田 太郎&lt;/p&gt;&lt;/td&gt;'
+    "&lt;/tr&gt;&lt;/table&gt;"
+)
+SHAREHOLDER_HTML = (
+    '&lt;p style="margin: 0"&gt;&lt;span&gt;2025年3月31日現在&lt;/span&gt;&lt;/p&gt;'
+    '&lt;table style="width: 100%"&gt;&lt;tr&gt;'
+    '&lt;td style="text-align: left"&gt;日本マスタートラスト信託銀行株式会社&lt;/td&gt;'
+    '&lt;td style="text-align: left"&gt;東京都港区&lt;/td&gt;'
+    "&lt;/tr&gt;&lt;/table&gt;"
+)
+
+
+@patch("get_stakeholder_data.services.llm_backend.genai.Client")
+class TestGeminiExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_client_and_templates_loaded_once(self, mock_client):
+        """
+        正常系: クライアントとテンプレートは初期化時に一度だけ作成・読み込みする
+        """
+        mock_client.return_value.models.generate_content.side_effect = (
+            lambda model, contents: MagicMock(text='{"大株主の状況": []}')
+        )
+        extractor = GeminiExtractor("key", use_cache=False, limiter=RateLimiter())
+        self.assertIn("officer_prompt.txt", extractor.templates)
+        self.assertIn("shareholder_prompt.txt", extractor.templates)
+
+        with patch(
+            "get_stakeholder_data.services.ai_parser.read_prompt_template"
+        ) as mock_read, ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda i: extractor.extract(
+                        f"<table>{i}</table>", "shareholder_prompt.txt"
+                    ),
+                    range(8),
+                )
+            )
+
+        self.assertEqual(results, [{"大株主の状況": []}] * 8)
+        mock_client.assert_called_once_with(api_key="key")
+        mock_read.assert_not_called()
+        self.assertEqual(mock_client.return_value.models.generate_content.call_count, 8)
+
+    def test_unknown_template(self, mock_client):
+        """
+        異常系: 存在しないテンプレートを指定した場合は ValueError
+        """
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=RateLimiter())
+
+        with self.assertRaises(ValueError):
+            extractor.extract("<table/>", "unknown_prompt.txt")
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": ""})
+    @patch("get_stakeholder_data.services.llm_backend.load_dotenv")
+    def test_missing_api_key(self, mock_load_dotenv, mock_client):
+        """
+        異常系: APIキーが設定されていない場合は ValueError
+        """
+        with self.assertRaises(ValueError):
+            GeminiExtractor(cache=self.cache, limiter=RateLimiter())
+
+    def test_extract_combined(self, mock_client):
+        """
+        正常系: 1回の呼び出しで抽出し、役員・大株主の形に分けて返す
+        """
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text=json.dumps(COMBINED, ensure_ascii=False)
+        )
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=RateLimiter())
+
+        officers, shareholders = extractor.extract_combined(
+            OFFICER_HTML, SHAREHOLDER_HTML
+        )
+
+        self.assertEqual(officers, {"役員の状況": COMBINED["役員の状況"]})
+        self.assertEqual(shareholders, {"大株主の状況": COMBINED["大株主の状況"]})
+        prompt = mock_client.return_value.models.generate_content.call_args.kwargs[
+            "contents"
+        ]
+        self.assertIn("山田 太郎", prompt)
+        self.assertIn("日本マスタートラスト信託銀行株式会社\t東京都港区", prompt)
+
+    def test_usage_metadata(self, mock_client):
+        """
+        正常系: APIが返した usage_metadata のトークン数を記録する（ストリーミングは最後の断片の値）
+        """
+        text = json.dumps(COMBINED, ensure_ascii=False)
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text=text,
+            usage_metadata=MagicMock(prompt_token_count=120, candidates_token_count=30),
+        )
+        mock_client.return_value.models.generate_content_stream.return_value = iter(
+            [
+                MagicMock(
+                    text=text[:50],
+                    usage_metadata=MagicMock(prompt_token_count=200, candidates_token_count=10),
+                ),
+                MagicMock(
+                    text=text[50:],
+                    usage_metadata=MagicMock(prompt_token_count=200, candidates_token_count=40),
+                ),
+            ]
+        )
+        metrics = LlmMetrics()
+        extractor = GeminiExtractor(
+            "key", use_cache=False, limiter=RateLimiter(), metrics=metrics
+        )
+        streaming = GeminiExtractor(
+            "key", use_cache=False, limiter=RateLimiter(), metrics=metrics, stream=True
+        )
+
+        extractor.extract_combined(OFFICER_HTML, SHAREHOLDER_HTML)
+        streaming.extract_combined(OFFICER_HTML, SHAREHOLDER_HTML)
+
+        calls = sorted(metrics.largest(), key=lambda call: call.input_tokens)
+        self.assertEqual([(c.input_tokens, c.output_tokens) for c in calls], [(120, 30), (200, 40)])
+
+    def test_extract_combined_oversized_officers(self, mock_client):
+        """
+        正常系: 圧縮後の役員のTextBlockが chunk_chars を超える場合は一括では呼び出さず個別に抽出する
+        """
+        generate = mock_client.return_value.models.generate_content
+        generate.side_effect = [
+            MagicMock(text=json.dumps({"役員の状況": COMBINED["役員の状況"]}, ensure_ascii=False)),
+            MagicMock(text=json.dumps({"大株主の状況": COMBINED["大株主の状況"]}, ensure_ascii=False)),
+        ]
+        extractor = GeminiExtractor(
+            "key", use_cache=False, limiter=RateLimiter(), chunk_chars=10
+        )
+
+        officers, shareholders = extractor.extract_combined(OFFICER_HTML, SHAREHOLDER_HTML)
+
+        self.assertEqual(officers, {"役員の状況": COMBINED["役員の状況"]})
+        self.assertEqual(shareholders, {"大株主の状況": COMBINED["大株主の状況"]})
+        prompts = [call.kwargs["contents"] for call in generate.call_args_list]
+        self.assertEqual(len(prompts), 2)
+        self.assertIn("山田 太郎", prompts[0])
+        self.assertNotIn("日本マスタートラスト", prompts[0])
+        self.assertIn("日本マスタートラスト", prompts[1])
+        self.assertNotIn("山田 太郎", prompts[1])
+
+    def test_extract_combined_missing_officer_shares(self, mock_client):
+        """
+        異常系: 役員の行に所有株式数がない応答はスキーマ不一致として None を返す
+        """
+        broken = json.loads(json.dumps(COMBINED))
+        del broken["役員の状況"]["data"][0]["所有株式数(千株)"]
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text=json.dumps(broken, ensure_ascii=False)
+        )
+        extractor = GeminiExtractor("key", use_cache=False, limiter=RateLimiter())
+
+        self.assertIsNone(extractor.extract_combined(OFFICER_HTML, SHAREHOLDER_HTML))
+
+    def test_extract_combined_invalid(self, mock_client):
+        """
+        異常系: スキーマに合わない応答は None を返し、キャッシュしない
+        """
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text='{"役員の状況": {"data": []}}'
+        )
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=RateLimiter())
+
+        self.assertIsNone(extractor.extract_combined(OFFICER_HTML, SHAREHOLDER_HTML))
+        self.assertEqual(self.cache.stats().entries, 0)
+
+    def test_compaction(self, mock_client):
+        """
+        正常系: マークアップを除いたTSVを送り、圧縮前後のトークン数を記録する
+        """
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text='{"大株主の状況": {"data": []}}'
+        )
+        extractor = GeminiExtractor("key", use_cache=False, limiter=RateLimiter())
+
+        extractor.extract(SHAREHOLDER_HTML, "shareholder_prompt.txt")
+
+        prompt = mock_client.return_value.models.generate_content.call_args.kwargs[
+            "contents"
+        ]
+        self.assertNotIn("style", prompt)
+        self.assertIn(
+            "2025年3月31日現在\n日本マスタートラスト信託銀行株式会社\t東京都港区", prompt
+        )
+        stats = extractor.compaction
+        self.assertEqual(stats.calls, 1)
+        self.assertLess(stats.raw_tokens, len(SHAREHOLDER_HTML))
+        self.assertLess(stats.compacted_tokens, stats.raw_tokens / 2)
+
+        with patch("get_stakeholder_data.services.ai_parser._extractor", extractor), patch(
+            "get_stakeholder_data.services.ai_parser.logger"
+        ) as mock_logger:
+            log_compaction_stats()
+        mock_logger.info.assert_called_once_with(stats.summary())
+
+    def test_extract_packed(self, mock_client):
+        """
+        正常系: 複数文書を1回の呼び出しで抽出し、文書番号ごとに返してキャッシュする
+        """
+        generate = mock_client.return_value.models.generate_content
+        generate.return_value = MagicMock(
+            text=json.dumps({"documents": [_packed("S1"), _packed("S2")]})
+        )
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=RateLimiter())
+
+        results = extractor.extract_packed({"S1": "<p>S1</p>", "S2": "<p>S2</p>"})
+
+        self.assertEqual(set(results), {"S1", "S2"})
+        self.assertEqual(results["S1"], {"大株主の状況": _packed("S1")["大株主の状況"]})
+        prompt = generate.call_args.kwargs["contents"]
+        self.assertIn("=== doc_id: S1 ===\nS1\n=== end: S1 ===", prompt)
+        self.assertEqual(generate.call_count, 1)
+
+        # 2回目はキャッシュから返す
+        extractor.extract_packed({"S1": "<p>S1</p>", "S2": "<p>S2</p>"})
+        self.assertEqual(generate.call_count, 1)
+
+    def test_extract_packed_caches_fallback(self, mock_client):
+        """
+        正常系: 単独の呼び出しで抽出した文書も、次回はキャッシュから返す
+        """
+        generate = mock_client.return_value.models.generate_content
+        generate.side_effect = [
+            MagicMock(text=json.dumps({"documents": [_packed("S1")]})),
+            MagicMock(text=json.dumps({"大株主の状況": _packed("S2")["大株主の状況"]})),
+        ]
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=RateLimiter())
+
+        extractor.extract_packed({"S1": "<p>S1</p>", "S2": "<p>S2</p>"})
+        results = extractor.extract_packed({"S1": "<p>S1</p>", "S2": "<p>S2</p>"})
+
+        self.assertEqual(results["S2"], {"大株主の状況": _packed("S2")["大株主の状況"]})
+        self.assertEqual(generate.call_count, 2)
+
+    def test_extract_packed_resplit(self, mock_client):
+        """
+        正常系: 応答に欠けた文書だけを再抽出し、パースできない応答は分割して再抽出する
+        """
+        generate = mock_client.return_value.models.generate_content
+        generate.side_effect = [
+            # 3件のうち S3 が欠けている
+            MagicMock(text=json.dumps({"documents": [_packed("S1"), _packed("S2")]})),
+            # S3 を単独で抽出
+            MagicMock(text=json.dumps({"大株主の状況": _packed("S3")["大株主の状況"]})),
+            # 2件のまとめがパースできない → 1件ずつ
+            MagicMock(text="not json"),
+            MagicMock(text=json.dumps({"大株主の状況": _packed("S4")["大株主の状況"]})),
+            MagicMock(text="not json"),
+        ]
+        extractor = GeminiExtractor("key", use_cache=False, limiter=RateLimiter())
+
+        results = extractor.extract_packed({"S1": "S1", "S2": "S2", "S3": "S3"})
+        self.assertEqual(set(results), {"S1", "S2", "S3"})
+        self.assertIsNotNone(results["S3"])
+
+        results = extractor.extract_packed({"S4": "S4", "S5": "S5"})
+        self.assertIsNotNone(results["S4"])
+        self.assertIsNone(results["S5"])
+        self.assertEqual(generate.call_count, 5)
+
+    def test_extract_packed_missing_fields(self, mock_client):
+        """
+        正常系: 所有株式数・所有割合が欠けた文書は、その文書だけを単独で再抽出する
+        """
+        broken = _packed("S2")
+        del broken["大株主の状況"]["data"][0]["所有割合(％)"]
+        generate = mock_client.return_value.models.generate_content
+        generate.side_effect = [
+            MagicMock(text=json.dumps({"documents": [_packed("S1"), broken]})),
+            MagicMock(text=json.dumps({"大株主の状況": _packed("S2")["大株主の状況"]})),
+        ]
+        extractor = GeminiExtractor("key", use_cache=False, limiter=RateLimiter())
+
+        results = extractor.extract_packed({"S1": "S1", "S2": "S2"})
+
+        self.assertEqual(results["S2"], {"大株主の状況": _packed("S2")["大株主の状況"]})
+        self.assertEqual(generate.call_count, 2)
+
+    def test_stream_aborts_malformed_response(self, mock_client):
+        """
+        正常系: ストリーミングで壊れた応答は途中で打ち切って再試行する
+        """
+        valid = json.dumps({"大株主の状況": _packed("S1")["大株主の状況"]})
+        broken = MagicMock()
+        broken.__iter__.return_value = iter(
+            [MagicMock(text="申し訳ありませんが"), MagicMock(text="never read")]
+        )
+        mock_client.return_value.models.generate_content_stream.side_effect = [
+            broken,
+            iter([MagicMock(text=valid[:50]), MagicMock(text=valid[50:])]),
+        ]
+        extractor = GeminiExtractor(
+            "key", use_cache=False, limiter=RateLimiter(), stream=True
+        )
+
+        result = extractor.extract("S1", "shareholder_prompt.txt")
+
+        self.assertEqual(result, json.loads(valid))
+        broken.close.assert_called_once()
+        mock_client.return_value.models.generate_content.assert_not_called()
+
+    def test_stream_aborts_invalid_row(self, mock_client):
+        """
+        正常系: ストリーミングで項目が欠けた行が閉じた時点で打ち切り、残りを待たずに再試行する
+        """
+        valid = json.dumps({"大株主の状況": _packed("S1")["大株主の状況"]})
+        section = _packed("S1")["大株主の状況"]
+        del section["data"][0]["所有割合(％)"]
+        invalid = json.dumps({"大株主の状況": section})
+        end = invalid.index("}") + 1
+        broken = MagicMock()
+        broken.__iter__.return_value = iter(
+            [MagicMock(text=invalid[:end]), MagicMock(text="never read")]
+        )
+        mock_client.return_value.models.generate_content_stream.side_effect = [
+            broken,
+            iter([MagicMock(text=valid)]),
+        ]
+        extractor = GeminiExtractor(
+            "key", use_cache=False, limiter=RateLimiter(), stream=True
+        )
+
+        result = extractor.extract("S1", "shareholder_prompt.txt")
+
+        self.assertEqual(result, json.loads(valid))
+        broken.close.assert_called_once()
+        self.assertEqual(
+            mock_client.return_value.models.generate_content_stream.call_count, 2
+        )
+
+    def test_stream_truncated_response(self, mock_client):
+        """
+        異常系: 途中で終わった応答は再送せず、ストリーミングしない場合と同じく None を返す
+        """
+        truncated = json.dumps({"大株主の状況": _packed("S1")["大株主の状況"]})[:-10]
+        for stream in (True, False):
+            with self.subTest(stream=stream):
+                backend = ReplayBackend(default=truncated, chunk_size=16)
+                extractor = GeminiExtractor(
+                    use_cache=False, limiter=RateLimiter(), stream=stream, backend=backend
+                )
+
+                self.assertIsNone(extractor.extract("S1", "shareholder_prompt.txt"))
+                self.assertEqual(backend.calls, 1)
+
+
+class TestChunkedOfficers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+        self.backend = ReplayBackend(default=_officers_response)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_split_and_merge(self):
+        """
+        正常系: 大きい役員の表は行の境目で分割して並行に抽出し、境目の重複を除いて順につなぐ
+        """
+        extractor = GeminiExtractor(
+            cache=self.cache, limiter=RateLimiter(), backend=self.backend, chunk_chars=400
+        )
+
+        result = extractor.extract_officers(_officer_table(12))
+
+        names = [row["氏名"] for row in result["役員の状況"]["data"]]
+        self.assertEqual(names, [f"役員 {i}" for i in range(12)])
+        self.assertEqual(result["役員の状況"]["date"], "2025年6月20日現在")
+        self.assertGreater(self.backend.calls, 2)
+
+    def test_small_block_not_split(self):
+        """
+        正常系: しきい値以下のTextBlockは1回で抽出する
+        """
+        extractor = GeminiExtractor(
+            cache=self.cache, limiter=RateLimiter(), backend=self.backend, chunk_chars=None
+        )
+
+        result = extractor.extract_officers(_officer_table(12))
+
+        self.assertEqual(len(result["役員の状況"]["data"]), 12)
+        self.assertEqual(self.backend.calls, 1)
+
+
+def _officer_table(count):
+    rows = "".join(
+        f"<tr><td>取締役</td><td>役員 {i}</td><td>1960年{i + 1}月1日生</td>"
+        f"<td>{'1983年4月 当社入社 ' * 3}</td><td>10</td></tr>"
+        for i in range(count)
+    )
+    return (
+        "<p>2025年6月20日現在</p><table>"
+        "<tr><td>役職名</td><td>氏名</td><td>生年月日</td><td>略歴</td><td>所有株式数</td></tr>"
+        f"{rows}</table>"
+    )
+
+
+def _officers_response(prompt):
+    # 入力の表の行をそのまま役員として返す
+    data = [
+        {
+            "役職名": cells[0],
+            "氏名": cells[1],
+            "生年月日": cells[2],
+            "略歴": cells[3],
+            "所有株式数(千株)": cells[4],
+        }
+        for cells in (line.split("\t") for line in prompt.split("\n"))
+        if len(cells) == 5 and cells[0] == "取締役"
+    ]
+    return json.dumps(
+        {"役員の状況": {"date": "2025年6月20日現在", "data": data}}, ensure_ascii=False
+    )
+
+
+def _packed(doc_id):
+    return {
+        "doc_id": doc_id,
+        "大株主の状況": {
+            "date": "2025年3月31日現在",
+            "data": [
+                {
+                    "氏名又は名称": f"{doc_id} 株式会社",
+                    "住所": "東京都",
+                    "所有株式数(千株)": "100",
+                    "所有割合(％)": "10.0",
+                }
+            ],
+        },
+    }
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,431 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.docs import Docs
+from get_stakeholder_data.interface.bulk_writer import WriteResult
+from get_stakeholder_data.parser.xbrl_parser import ParsingError
+from get_stakeholder_data.services.known_docs import KnownDocIds
+from get_stakeholder_data.services.async_pipeline import (
+    AsyncPipeline,
+    PipelineConfig,
+)
+import asyncio
+import os
+import tempfile
+import time
+
+
+def _doc(doc_id):
+    return Doc(
+        doc_id=doc_id,
+        sec_code="12345",
+        filer_name="Test Company",
+        period_start="2025-01-01",
+        period_end="2025-03-31",
+        submit_datetime="2025-04-12T10:00:00",
+        doc_description="有価証券報告書",
+    )
+
+
+class FakeWriter:
+    """
+    BulkWriterの代わりに書き込み内容を記録する
+    """
+
+    def __init__(self, batch_size=1, delay=0.0):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.calls = []
+        self._pending = []
+
+    def add(self, doc, directors, shareholders, tag=None):
+        time.sleep(self.delay)
+        self.calls.append((doc, directors, shareholders))
+        self._pending.append(WriteResult(doc, tag))
+        if len(self._pending) < self.batch_size:
+            return []
+        return self.flush()
+
+    def flush(self):
+        results, self._pending = self._pending, []
+        return results
+
+
+def _run_state():
+    run_state = MagicMock()
+    run_state.pending_dates.side_effect = lambda dates: dates
+    return run_state
+
+
+OFFICERS = {
+    "役員の状況": {
+        "date": "2025年4月1日現在",
+        "data": [
+            {
+                "役職名": "代表取締役",
+                "氏名": "山田　太郎",
+                "生年月日": "1960年1月1日生",
+                "略歴": "略歴",
+                "所有株式数(千株)": "10",
+            }
+        ],
+    }
+}
+
+# 役員は表の検証に失敗するためLLMで、大株主は表から抽出される
+XBRL = """<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+    xmlns:jpcrp_cor="http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2024-11-01/jpcrp_cor">
+  <jpcrp_cor:InformationAboutOfficersTextBlock contextRef="FilingDateInstant">&lt;table&gt;&lt;tr&gt;&lt;td&gt;山田 太郎&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;</jpcrp_cor:InformationAboutOfficersTextBlock>
+  <jpcrp_cor:MajorShareholdersTextBlock contextRef="CurrentYearInstant">&lt;table&gt;&lt;tr&gt;&lt;td&gt;株主A&lt;/td&gt;&lt;td&gt;東京都&lt;/td&gt;&lt;td&gt;1,000&lt;/td&gt;&lt;td&gt;10.00&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;</jpcrp_cor:MajorShareholdersTextBlock>
+</xbrli:xbrl>
+""".encode("utf-8")
+
+SHAREHOLDERS = {
+    "大株主の状況": {
+        "date": "2025年3月31日現在",
+        "data": [
+            {
+                "氏名又は名称": "テスト株式会社",
+                "住所": "東京都",
+                "所有株式数(千株)": "100",
+                "所有割合(％)": "10.0",
+            },
+            {
+                "氏名又は名称": "計",
+                "住所": "",
+                "所有株式数(千株)": "100",
+                "所有割合(％)": "10.0",
+            },
+        ],
+    }
+}
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.XbrlParser")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_success(
+        self,
+        mock_get_documents,
+        mock_get_document,
+        mock_parser,
+        mock_known,
+    ):
+        """
+        正常系: 既存の文書はスキップし、それ以外は文書ごとに保存される
+        """
+        mock_get_documents.return_value = Docs(
+            documents=[_doc("S1"), _doc("S2"), _doc("S3")]
+        )
+        mock_known.return_value = KnownDocIds(["S2"])
+        mock_get_document.return_value = b"<xbrl/>"
+        parser = MagicMock()
+        parser.get_stakeholders_by_llm.return_value = (OFFICERS, SHAREHOLDERS)
+        mock_parser.return_value = parser
+
+        run_state = _run_state()
+        writer = FakeWriter(batch_size=2)
+        pipeline = AsyncPipeline(
+            PipelineConfig(fetch_concurrency=2), run_state, writer
+        )
+        stats = asyncio.run(
+            pipeline.run(datetime(2025, 4, 1), datetime(2025, 4, 1))
+        )
+
+        self.assertEqual(stats.processed, 2)
+        self.assertEqual(stats.skipped, 1)
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(len(writer.calls), 2)
+        doc, directors, shareholders = writer.calls[-1]
+        self.assertEqual(directors[0].name, "山田 太郎")
+        self.assertEqual(len(shareholders), 1)  # 「計」の行は除外
+        self.assertEqual(
+            [name for name in stats.stages],
+            ["persist", "extract", "parse", "fetch", "list"],
+        )
+        self.assertEqual(stats.stages["list"].processed, 1)
+        self.assertEqual(stats.stages["fetch"].processed, 2)
+        self.assertEqual(stats.stages["persist"].processed, 2)
+        self.assertIsNotNone(stats.bottleneck)
+        run_state.finish_date.assert_called_once_with(
+            datetime(2025, 4, 1), ["S1", "S2", "S3"]
+        )
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser_officers")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document_path")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_parse_workers(
+        self,
+        mock_get_documents,
+        mock_get_document_path,
+        mock_officers,
+        mock_known,
+    ):
+        """
+        正常系: parse_workers を指定すると、キャッシュのパスを別プロセスでパースする
+        """
+        mock_get_documents.return_value = Docs(documents=[_doc("S1"), _doc("S2")])
+        mock_known.return_value = KnownDocIds()
+        mock_officers.return_value = OFFICERS
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S1.xbrl")
+            with open(path, "wb") as f:
+                f.write(XBRL)
+            mock_get_document_path.return_value = path
+
+            writer = FakeWriter()
+            config = PipelineConfig(parse_workers=2, extraction_mode="hybrid", combined_llm=True)
+            pipeline = AsyncPipeline(config, _run_state(), writer)
+            stats = asyncio.run(pipeline.run(datetime(2025, 4, 1), datetime(2025, 4, 1)))
+
+        self.assertEqual(stats.processed, 2)
+        self.assertEqual(stats.failed, 0)
+        doc, directors, shareholders = writer.calls[-1]
+        self.assertEqual(directors[0].name, "山田 太郎")
+        self.assertEqual([s.name for s in shareholders], ["株主A"])
+        self.assertEqual(
+            sum(s.documents for s in pipeline.parse_executor.stats()), 2
+        )
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser_officers")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document_path")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_parse_workers_refetch(
+        self,
+        mock_get_documents,
+        mock_get_document_path,
+        mock_officers,
+        mock_known,
+    ):
+        """
+        正常系: ワーカーが開く前にキャッシュから削除されたファイルは取得し直してパースする
+        """
+        mock_get_documents.return_value = Docs(documents=[_doc("S1"), _doc("S2")])
+        mock_known.return_value = KnownDocIds()
+        mock_officers.return_value = OFFICERS
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S1.xbrl")
+            with open(path, "wb") as f:
+                f.write(XBRL)
+            mock_get_document_path.side_effect = [os.path.join(tmp, "evicted.xbrl"), path, path]
+
+            writer = FakeWriter()
+            config = PipelineConfig(parse_workers=1, extraction_mode="hybrid", combined_llm=True)
+            pipeline = AsyncPipeline(config, _run_state(), writer)
+            stats = asyncio.run(pipeline.run(datetime(2025, 4, 1), datetime(2025, 4, 1)))
+
+        self.assertEqual(stats.processed, 2)
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(mock_get_document_path.call_count, 3)
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch(
+        "get_stakeholder_data.services.extraction.get_major_shareholders_by_llm_packed"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.XbrlParser")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_packed_shareholders(
+        self,
+        mock_get_documents,
+        mock_get_document,
+        mock_parser,
+        mock_packed,
+        mock_known,
+    ):
+        """
+        正常系: 大株主は pack_size 件ずつまとめて抽出し、端数は最後にまとめて抽出する
+        """
+        mock_get_documents.return_value = Docs(
+            documents=[_doc("S1"), _doc("S2"), _doc("S3")]
+        )
+        mock_known.return_value = KnownDocIds()
+        mock_get_document.return_value = b"<xbrl/>"
+        mock_parser.return_value.get_major_officers_by_llm.return_value = OFFICERS
+        mock_packed.side_effect = lambda parsers: {
+            doc_id: SHAREHOLDERS for doc_id in parsers
+        }
+
+        writer = FakeWriter()
+        config = PipelineConfig(extraction_mode="llm", combined_llm=False, pack_size=2)
+        stats = asyncio.run(
+            AsyncPipeline(config, _run_state(), writer).run(
+                datetime(2025, 4, 1), datetime(2025, 4, 1)
+            )
+        )
+
+        self.assertEqual(stats.processed, 3)
+        self.assertEqual(
+            sorted(len(c.args[0]) for c in mock_packed.call_args_list), [1, 2]
+        )
+        self.assertEqual(
+            sorted(doc.doc_id for doc, _, _ in writer.calls), ["S1", "S2", "S3"]
+        )
+        self.assertTrue(all(len(sh) == 1 for _, _, sh in writer.calls))
+        mock_parser.return_value.get_major_shareholders_by_llm.assert_not_called()
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch(
+        "get_stakeholder_data.services.extraction.get_major_shareholders_by_llm_packed"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.XbrlParser")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_packed_failure(
+        self,
+        mock_get_documents,
+        mock_get_document,
+        mock_parser,
+        mock_packed,
+        mock_known,
+    ):
+        """
+        異常系: まとめて抽出できなかった文書だけをスキップし、extract ステージの失敗として数える
+        """
+        mock_get_documents.return_value = Docs(documents=[_doc("S1"), _doc("S2")])
+        mock_known.return_value = KnownDocIds()
+        mock_get_document.return_value = b"<xbrl/>"
+        mock_parser.return_value.get_major_officers_by_llm.return_value = OFFICERS
+        mock_packed.side_effect = lambda parsers: {
+            doc_id: SHAREHOLDERS if doc_id == "S1" else ParsingError("失敗")
+            for doc_id in parsers
+        }
+
+        writer = FakeWriter()
+        config = PipelineConfig(extraction_mode="llm", combined_llm=False, pack_size=2)
+        stats = asyncio.run(
+            AsyncPipeline(config, _run_state(), writer).run(
+                datetime(2025, 4, 1), datetime(2025, 4, 1)
+            )
+        )
+
+        self.assertEqual(stats.processed, 1)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.stages["extract"].failed, 1)
+        self.assertEqual([doc.doc_id for doc, _, _ in writer.calls], ["S1"])
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.XbrlParser")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_run_failure_is_isolated(
+        self,
+        mock_get_documents,
+        mock_get_document,
+        mock_parser,
+        mock_known,
+    ):
+        """
+        異常系: 1文書の失敗が他の文書の処理に影響しない
+        """
+        mock_get_documents.return_value = Docs(documents=[_doc("S1"), _doc("S2")])
+        mock_known.return_value = KnownDocIds()
+
+        def fake_get_document(doc_id, **kwargs):
+            if doc_id == "S1":
+                raise RuntimeError("API Error")
+            return b"<xbrl/>"
+
+        mock_get_document.side_effect = fake_get_document
+        parser = MagicMock()
+        parser.get_stakeholders_by_llm.return_value = (OFFICERS, SHAREHOLDERS)
+        mock_parser.return_value = parser
+
+        run_state = _run_state()
+        writer = FakeWriter()
+        stats = asyncio.run(
+            AsyncPipeline(run_state=run_state, writer=writer).run(
+                datetime(2025, 4, 1), datetime(2025, 4, 1)
+            )
+        )
+
+        self.assertEqual(stats.processed, 1)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.stages["fetch"].failed, 1)
+        self.assertEqual(len(writer.calls), 1)
+        failed = [
+            c for c in run_state.finish_doc.call_args_list if c.args[2] is not None
+        ]
+        self.assertEqual([c.args[0] for c in failed], ["S1"])
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_completed_dates_are_skipped(self, mock_get_documents, mock_known):
+        """
+        正常系: 前回までに完了した日付は一覧を取得しない
+        """
+        mock_get_documents.return_value = Docs(documents=[])
+        mock_known.return_value = KnownDocIds()
+        run_state = _run_state()
+        run_state.pending_dates.side_effect = lambda dates: dates[1:]
+
+        asyncio.run(
+            AsyncPipeline(run_state=run_state, writer=FakeWriter()).run(
+                datetime(2025, 4, 1), datetime(2025, 4, 3)
+            )
+        )
+
+        listed = sorted(c.args[0] for c in mock_get_documents.call_args_list)
+        self.assertEqual(listed, [datetime(2025, 4, 2), datetime(2025, 4, 3)])
+
+    @patch(
+        "get_stakeholder_data.services.async_pipeline.AsyncPipeline._load_known_doc_ids"
+    )
+    @patch("get_stakeholder_data.services.async_pipeline.XbrlParser")
+    @patch("get_stakeholder_data.services.async_pipeline.get_document")
+    @patch("get_stakeholder_data.services.async_pipeline.get_documents")
+    def test_bounded_queue_applies_backpressure(
+        self,
+        mock_get_documents,
+        mock_get_document,
+        mock_parser,
+        mock_known,
+    ):
+        """
+        正常系: 下流が遅くてもキューの長さは上限を超えない
+        """
+        mock_get_documents.return_value = Docs(
+            documents=[_doc(f"S{i}") for i in range(10)]
+        )
+        mock_known.return_value = KnownDocIds()
+        mock_get_document.return_value = b"<xbrl/>"
+        parser = MagicMock()
+        parser.get_stakeholders_by_llm.return_value = (OFFICERS, SHAREHOLDERS)
+        mock_parser.return_value = parser
+
+        config = PipelineConfig(queue_size=2, persist_concurrency=1)
+        stats = asyncio.run(
+            AsyncPipeline(config, _run_state(), FakeWriter(delay=0.01)).run(
+                datetime(2025, 4, 1), datetime(2025, 4, 1)
+            )
+        )
+
+        self.assertEqual(stats.processed, 10)
+        for stage in stats.stages.values():
+            self.assertLessEqual(stage.max_depth, 2)
+        self.assertGreater(stats.stages["persist"].wait_seconds, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import func, select, text
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.interface.bulk_writer import BulkWriter
+from get_stakeholder_data.interface.database import create_db_engine
+from get_stakeholder_data.models.base import Base
+from get_stakeholder_data.models.directors_model import DirectorsModel
+from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.models.shareholders_model import ShareholdersModel
+
+
+def _doc(doc_id):
+    return Doc(doc_id, "12345", "Test Company", None, None, None, "有価証券報告書")
+
+
+DIRECTORS = [Director("山田 太郎", "代表取締役", "1960年1月1日生", "略歴", "10")]
+SHAREHOLDERS = [
+    Shareholder("A社", "東京都", "100", "10.0"),
+    Shareholder("B社", "大阪府", "50", "5.0"),
+]
+
+
+class TestBulkWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_db_engine(
+            f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}"
+        )
+        Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _count(self, model):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_pragmas_are_applied(self):
+        """
+        正常系: SQLiteの接続にWALとsynchronous=NORMALが設定される
+        """
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)
+
+    def test_batches_documents(self):
+        """
+        正常系: batch_size 件たまるまで書き込まず、まとめてコミットする
+        """
+        writer = BulkWriter(self.engine, batch_size=3)
+
+        self.assertEqual(writer.add(_doc("S1"), DIRECTORS, SHAREHOLDERS, tag=1), [])
+        self.assertEqual(writer.add(_doc("S2"), DIRECTORS, SHAREHOLDERS, tag=2), [])
+        self.assertEqual(self._count(DocsModel), 0)
+
+        results = writer.add(_doc("S3"), DIRECTORS, SHAREHOLDERS, tag=3)
+
+        self.assertEqual([r.tag for r in results], [1, 2, 3])
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertEqual(self._count(DocsModel), 3)
+        self.assertEqual(self._count(DirectorsModel), 3)
+        self.assertEqual(self._count(ShareholdersModel), 6)
+        self.assertEqual(writer.rows_written, 12)
+
+    def test_failure_is_isolated_per_document(self):
+        """
+        異常系: バッチ内の1文書が失敗しても他の文書は書き込まれる
+        """
+        writer = BulkWriter(self.engine, batch_size=10)
+        writer.add(_doc("S1"), DIRECTORS, SHAREHOLDERS)
+        writer.flush()
+
+        writer.add(_doc("S2"), DIRECTORS, SHAREHOLDERS)
+        writer.add(_doc("S1"), DIRECTORS, SHAREHOLDERS)  # 主キーの重複
+        writer.add(_doc("S3"), DIRECTORS, SHAREHOLDERS)
+        results = writer.flush()
+
+        errors = {r.doc.doc_id: r.error for r in results}
+        self.assertIsNone(errors["S2"])
+        self.assertIsNotNone(errors["S1"])
+        self.assertIsNone(errors["S3"])
+        self.assertEqual(self._count(DocsModel), 3)
+        self.assertEqual(self._count(DirectorsModel), 3)
+        self.assertEqual(writer.failed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
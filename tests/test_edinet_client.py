@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+from get_stakeholder_data.services.edinet_client import EdinetClient, EdinetConfig
+
+
+def _response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            f"{status_code} Error"
+        )
+    return response
+
+
+class TestEdinetClient(unittest.TestCase):
+    def setUp(self):
+        self.config = EdinetConfig(
+            api_key="dummy_api_key",
+            endpoint_list="https://dummy.endpoint/documents.json",
+            endpoint_doc="https://dummy.endpoint/documents",
+        )
+        self.client = EdinetClient(self.config, max_retries=3)
+        self.client.session = MagicMock()
+
+    @patch("get_stakeholder_data.services.edinet_client.time.sleep")
+    def test_get_document_retries_on_5xx(self, mock_sleep):
+        """
+        正常系: 503の後に200が返ればリトライして成功する
+        """
+        ok = _response(200)
+        self.client.session.get.side_effect = [_response(503), _response(502), ok]
+
+        result = self.client.get_document("S100VJ7H")
+
+        self.assertIs(result, ok)
+        self.assertEqual(self.client.session.get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.client.session.get.assert_called_with(
+            "https://dummy.endpoint/documents/S100VJ7H",
+            params={"type": 1, "Subscription-Key": "dummy_api_key"},
+            timeout=self.client.timeout,
+            stream=False,
+        )
+
+    @patch("get_stakeholder_data.services.edinet_client.time.sleep")
+    def test_get_uses_retry_after(self, mock_sleep):
+        """
+        正常系: 429のRetry-Afterヘッダーを待機時間に使う
+        """
+        self.client.session.get.side_effect = [
+            _response(429, {"Retry-After": "7"}),
+            _response(200),
+        ]
+
+        self.client.get_document_list("2025-04-12")
+
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("get_stakeholder_data.services.edinet_client.time.sleep")
+    def test_get_raises_after_max_retries(self, mock_sleep):
+        """
+        異常系: リトライ回数を超えたらHTTPErrorを送出する
+        """
+        self.client.session.get.side_effect = [_response(503) for _ in range(4)]
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.get_document("S100VJ7H")
+
+        self.assertEqual(self.client.session.get.call_count, 4)
+        self.assertEqual(mock_sleep.call_count, 3)
+
+    @patch("get_stakeholder_data.services.edinet_client.time.sleep")
+    def test_get_does_not_retry_on_4xx(self, mock_sleep):
+        """
+        異常系: 404などリトライ対象外のエラーは即座に送出する
+        """
+        self.client.session.get.side_effect = [_response(404)]
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.get_document("S100VJ7H")
+
+        mock_sleep.assert_not_called()
+
+    def test_missing_config(self):
+        """
+        異常系: 環境変数が設定されていない場合
+        """
+        client = EdinetClient(EdinetConfig(None, None, None))
+        with self.assertRaises(ValueError):
+            client.get_document_list("2025-04-12")
+
+    def test_backoff_is_bounded(self):
+        """
+        バックオフはジッター付きで上限を超えない
+        """
+        client = EdinetClient(self.config, backoff_base=1.0, backoff_max=10.0)
+        for attempt in range(10):
+            delay = client._backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(10.0, 2**attempt))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from get_stakeholder_data.domain.director import Director
+from get_stakeholder_data.domain.shareholder import Shareholder
+from get_stakeholder_data.parser.xbrl_parser import ParsingError
+from get_stakeholder_data.services.extraction import (
+    MODE_LLM,
+    StakeholderExtractor,
+    validate_directors,
+    validate_shareholders,
+)
+
+
+SHAREHOLDERS = [
+    Shareholder("日本マスタートラスト信託銀行株式会社", "東京都港区", "12,345", "15.20"),
+    Shareholder("株式会社日本カストディ銀行", "東京都中央区", "6,789", "8.35"),
+    Shareholder("計", "―", "19,134", "23.55"),
+]
+DIRECTORS = [
+    Director("山田 太郎", "代表取締役社長", "1960年1月1日生", "1983年4月 当社入社", "120"),
+    Director("佐藤 花子", "社外取締役", "1970年5月5日生", "2010年4月 弁護士登録", "－"),
+]
+OFFICERS_JSON = {
+    "役員の状況": {
+        "data": [
+            {
+                "役職名": "取締役",
+                "氏名": "鈴木 一郎",
+                "生年月日": "1965年3月3日生",
+                "略歴": "1988年4月 当社入社",
+                "所有株式数(千株)": "5",
+            }
+        ]
+    }
+}
+SHAREHOLDERS_JSON = {
+    "大株主の状況": {
+        "data": [
+            {
+                "氏名又は名称": "株式会社日本カストディ銀行",
+                "住所": "東京都中央区",
+                "所有株式数(千株)": "6,789",
+                "所有割合(％)": "8.35",
+            }
+        ]
+    }
+}
+
+
+def _parser(directors=DIRECTORS, shareholders=SHAREHOLDERS):
+    parser = MagicMock()
+    if isinstance(directors, Exception):
+        parser.get_directors_and_auditors.side_effect = directors
+    else:
+        parser.get_directors_and_auditors.return_value = directors
+    parser.get_major_shareholders.return_value = shareholders
+    parser.get_stakeholders_by_llm.return_value = (OFFICERS_JSON, SHAREHOLDERS_JSON)
+    parser.get_major_officers_by_llm.return_value = OFFICERS_JSON
+    parser.get_major_shareholders_by_llm.return_value = SHAREHOLDERS_JSON
+    return parser
+
+
+class TestValidation(unittest.TestCase):
+    def test_valid_shareholders(self):
+        """
+        正常系: 数値・合計が妥当な大株主の表は検証を通る
+        """
+        self.assertIsNone(validate_shareholders(SHAREHOLDERS))
+
+    def test_invalid_shareholders(self):
+        """
+        異常系: 数値でない列・「計」と一致しない合計・行なしは検証に失敗する
+        """
+        header = Shareholder("氏名又は名称", "住所", "所有株式数", "所有割合")
+        wrong_total = SHAREHOLDERS[:2] + [Shareholder("計", "―", "19,134", "30.00")]
+
+        self.assertIsNotNone(validate_shareholders([header] + SHAREHOLDERS))
+        self.assertIsNotNone(validate_shareholders(wrong_total))
+        self.assertIsNotNone(validate_shareholders([]))
+
+    def test_directors(self):
+        """
+        正常系/異常系: 生年月日・所有株式数の形式を検証する
+        """
+        self.assertIsNone(validate_directors(DIRECTORS))
+        iso = [Director("山田 太郎", "取締役", "1960-01-01", "", "120")]
+        self.assertIsNone(validate_directors(iso))
+        broken = [Director("山田 太郎", "取締役", "生年月日", "", "120")]
+        self.assertIsNotNone(validate_directors(broken))
+
+
+class TestStakeholderExtractor(unittest.TestCase):
+    def test_deterministic(self):
+        """
+        正常系: 表の解析が検証を通ればLLMを呼ばない（「計」の行は除く）
+        """
+        extractor = StakeholderExtractor()
+        parser = _parser()
+
+        directors, shareholders = extractor.extract(parser)
+
+        self.assertEqual(directors, DIRECTORS)
+        self.assertEqual(shareholders, SHAREHOLDERS[:2])
+        parser.get_stakeholders_by_llm.assert_not_called()
+        parser.get_major_officers_by_llm.assert_not_called()
+        parser.get_major_shareholders_by_llm.assert_not_called()
+        self.assertEqual(extractor.stats.fallback_rate, 0.0)
+
+    def test_partial_fallback(self):
+        """
+        正常系: 検証に失敗した側だけをLLMで抽出する
+        """
+        extractor = StakeholderExtractor()
+        parser = _parser(directors=ParsingError("役員の人数が一致しません"))
+
+        directors, shareholders = extractor.extract(parser)
+
+        self.assertEqual([d.name for d in directors], ["鈴木 一郎"])
+        self.assertEqual(shareholders, SHAREHOLDERS[:2])
+        parser.get_major_shareholders_by_llm.assert_not_called()
+        self.assertEqual(extractor.stats.officer_fallbacks, 1)
+        self.assertEqual(extractor.stats.shareholder_fallbacks, 0)
+
+    def test_full_fallback_and_rate(self):
+        """
+        正常系: 両方とも失敗した場合はまとめてLLMで抽出し、フォールバック率を記録する
+        """
+        extractor = StakeholderExtractor()
+        extractor.extract(_parser())
+        parser = _parser(directors=[], shareholders=[])
+
+        directors, shareholders = extractor.extract(parser)
+
+        parser.get_stakeholders_by_llm.assert_called_once_with(combined=True)
+        self.assertEqual([s.name for s in shareholders], ["株式会社日本カストディ銀行"])
+        self.assertEqual(extractor.stats.documents, 2)
+        self.assertEqual(extractor.stats.fallback_rate, 0.5)
+
+    @patch("get_stakeholder_data.services.extraction.get_major_shareholders_by_llm_packed")
+    def test_extract_packed_conversion_error(self, mock_packed):
+        """
+        異常系: 変換できない文書だけを ParsingError とし、他の文書は変換して返す
+        """
+        mock_packed.return_value = {
+            "S1": SHAREHOLDERS_JSON,
+            "S2": {"大株主の状況": {"data": [{"氏名又は名称": "株主B", "住所": "東京都"}]}},
+        }
+
+        results = StakeholderExtractor().extract_packed({"S1": _parser(), "S2": _parser()})
+
+        self.assertEqual([s.name for s in results["S1"]], ["株式会社日本カストディ銀行"])
+        self.assertIsInstance(results["S2"], ParsingError)
+
+    def test_llm_mode(self):
+        """
+        正常系: llm モードでは表を解析しない
+        """
+        parser = _parser()
+
+        StakeholderExtractor(MODE_LLM).extract(parser)
+
+        parser.get_directors_and_auditors.assert_not_called()
+        parser.get_stakeholders_by_llm.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,39 +1,41 @@
 import unittest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock
 import os
 import io
+import tempfile
+import zipfile
 
-import requests
-from get_stakeholder_data.services.get_document import get_document
+from get_stakeholder_data.services import xbrl_cache
+from get_stakeholder_data.services.get_document import (
+    get_document,
+    get_document_path,
+    open_document,
+)
+from get_stakeholder_data.services.xbrl_cache import XbrlCache
 
 
 class TestGetDocument(unittest.TestCase):
-    @patch("get_stakeholder_data.services.get_document.requests.get")
-    @patch("get_stakeholder_data.services.get_document.os.getenv")
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_dir = self.tmp.name
+        self.cache = XbrlCache(self.save_dir)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    @patch("get_stakeholder_data.services.get_document.get_edinet_client")
     @patch("get_stakeholder_data.services.get_document.zipfile.ZipFile")
-    @patch("get_stakeholder_data.services.get_document.open", new_callable=mock_open)
-    @patch("get_stakeholder_data.services.get_document.os.makedirs")
-    def test_get_document_success(
-        self,
-        mock_makedirs,
-        mock_open_file,
-        mock_zipfile,
-        mock_getenv,
-        mock_requests_get,
-    ):
+    def test_get_document_success(self, mock_zipfile, mock_get_client):
         """
         正常系: XBRLファイルが正常に取得できる場合のテスト
         """
         # モックの設定
-        mock_getenv.side_effect = lambda key: {
-            "EDINET_API_KEY": "dummy_api_key",
-            "EDINET_API_ENDPOINT_DOC": "https://dummy.endpoint/documents",
-        }.get(key)
-
+        mock_client = mock_get_client.return_value
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.content = b"dummy_zip_content"
-        mock_requests_get.return_value = mock_response
+        mock_response.iter_content.return_value = [b"dummy_", b"zip_content"]
+        mock_client.get_document.return_value = mock_response
 
         mock_zip = MagicMock()
         mock_zip.namelist.return_value = ["dummy.xbrl"]
@@ -43,50 +45,143 @@ class TestGetDocument(unittest.TestCase):
         # テスト対象の関数を呼び出し
         doc_id = "S100VJ7H"
         company_code = "12345"
-        save_dir = "test_xbrl_data"
-        result = get_document(doc_id, company_code, save_dir)
+        result = get_document(doc_id, company_code, self.save_dir, cache=self.cache)
 
         # 検証
         self.assertEqual(result, b"dummy_xbrl_content")
-        mock_requests_get.assert_called_once_with(
-            "https://dummy.endpoint/documents/S100VJ7H",
-            params={"type": 1, "Subscription-Key": "dummy_api_key"},
-        )
-        mock_makedirs.assert_called_once_with(
-            os.path.join(save_dir, company_code), exist_ok=True
-        )
-        mock_open_file.assert_called_once_with(
-            os.path.join(save_dir, company_code, f"{doc_id}.xbrl"), "wb"
+        mock_client.get_document.assert_called_once_with("S100VJ7H", stream=True)
+        mock_response.close.assert_called_once()
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.save_dir, company_code, f"{doc_id}.xbrl.gz")
+            )
         )
+        self.assertEqual(self.cache.get(doc_id), b"dummy_xbrl_content")
 
-    @patch("get_stakeholder_data.services.get_document.os.makedirs")
-    @patch("get_stakeholder_data.services.get_document.os.path.exists")
-    @patch("get_stakeholder_data.services.get_document.open", new_callable=mock_open)
-    def test_get_document_existing_file(
-        self, mock_open_file, mock_path_exists, mock_makedirs
-    ):
+    @patch("get_stakeholder_data.services.get_document.get_edinet_client")
+    @patch("get_stakeholder_data.services.get_document.zipfile.ZipFile")
+    def test_get_document_path(self, mock_zipfile, mock_get_client):
         """
-        正常系: 既存のXBRLファイルが存在する場合のテスト
+        正常系: キャッシュに保存したXBRLファイルのパスを返し、内容は展開しない
         """
-        # モックの設定
-        mock_path_exists.return_value = True  # ファイルが存在する
-        mock_open_file.return_value.read.return_value = b"existing_xbrl_content"
+        mock_response = MagicMock()
+        mock_response.iter_content.return_value = [b"dummy_zip_content"]
+        mock_get_client.return_value.get_document.return_value = mock_response
+        mock_zip = MagicMock()
+        mock_zip.namelist.return_value = ["dummy.xbrl"]
+        mock_zip.open.return_value = io.BytesIO(b"dummy_xbrl_content")
+        mock_zipfile.return_value.__enter__.return_value = mock_zip
 
-        # テスト対象の関数を呼び出し
+        with patch.object(xbrl_cache, "_map_entry") as mock_map_entry, patch.object(
+            xbrl_cache, "_open_entry"
+        ) as mock_open_entry:
+            path = get_document_path("S100VJ7H", "12345", self.save_dir, cache=self.cache)
+            cached = get_document_path("S100VJ7H", "12345", self.save_dir, cache=self.cache)
+
+        self.assertEqual(path, self.cache.path_for("S100VJ7H", "12345"))
+        self.assertEqual(cached, path)
+        mock_map_entry.assert_not_called()
+        mock_open_entry.assert_not_called()
+        mock_get_client.return_value.get_document.assert_called_once()
+        self.assertEqual(self.cache.get("S100VJ7H"), b"dummy_xbrl_content")
+
+    @patch("get_stakeholder_data.services.get_document.get_edinet_client")
+    def test_get_document_cached(self, mock_get_client):
+        """
+        正常系: キャッシュにXBRLファイルが存在する場合はAPIを呼ばない
+        """
+        self.cache.put("S100VJ7H", b"existing_xbrl_content", company_code="12345")
+
+        result = get_document("S100VJ7H", "12345", self.save_dir, cache=self.cache)
+
+        self.assertEqual(result, b"existing_xbrl_content")
+        mock_get_client.assert_not_called()
+
+    @patch("get_stakeholder_data.services.get_document.get_edinet_client")
+    def test_get_document_existing_file(self, mock_get_client):
+        """
+        正常系: 旧形式の既存XBRLファイルが存在する場合はキャッシュへ移行する
+        """
         doc_id = "S100VJ7H"
         company_code = "12345"
-        save_dir = "test_xbrl_data"
-        result = get_document(doc_id, company_code, save_dir)
+        legacy_path = os.path.join(self.save_dir, company_code, f"{doc_id}.xbrl")
+        os.makedirs(os.path.dirname(legacy_path))
+        with open(legacy_path, "wb") as f:
+            f.write(b"existing_xbrl_content")
+
+        result = get_document(doc_id, company_code, self.save_dir, cache=self.cache)
 
         # 検証
         self.assertEqual(result, b"existing_xbrl_content")
-        mock_path_exists.assert_any_call(
-            os.path.join(save_dir, company_code, f"{doc_id}.xbrl")
+        mock_get_client.assert_not_called()
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertEqual(self.cache.get(doc_id), b"existing_xbrl_content")
+
+    @patch("get_stakeholder_data.services.get_document.get_edinet_client")
+    def test_get_document_existing_file_uncompressed(self, mock_get_client):
+        """
+        正常系: 非圧縮のキャッシュでは旧形式の既存ファイルを書き直さずに登録し、メモリマップで返す
+        """
+        doc_id = "S100VJ7H"
+        company_code = "12345"
+        cache = XbrlCache(os.path.join(self.save_dir, "raw"), compress=False)
+        legacy_path = os.path.join(self.save_dir, "raw", company_code, f"{doc_id}.xbrl")
+        os.makedirs(os.path.dirname(legacy_path))
+        with open(legacy_path, "wb") as f:
+            f.write(b"existing_xbrl_content")
+        inode = os.stat(legacy_path).st_ino
+
+        result = get_document(
+            doc_id, company_code, os.path.join(self.save_dir, "raw"), cache=cache
         )
-        mock_open_file.assert_called_once_with(
-            os.path.join(save_dir, company_code, f"{doc_id}.xbrl"), "rb"
+
+        self.assertEqual(result, b"existing_xbrl_content")
+        self.assertEqual(os.stat(legacy_path).st_ino, inode)
+        self.assertEqual(cache.view(doc_id), b"existing_xbrl_content")
+        mock_get_client.assert_not_called()
+        cache.close()
+
+    def _zip_response(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        payload = buffer.getvalue()
+        mock_response = MagicMock()
+        mock_response.iter_content.return_value = [
+            payload[i : i + 7] for i in range(0, len(payload), 7)
+        ]
+        return mock_response
+
+    def test_open_document_streams_xbrl_member(self):
+        """
+        正常系: ZIPをチャンクで受け取り、XBRLファイルをストリームとして開ける
+        """
+        mock_client = MagicMock()
+        mock_client.get_document.return_value = self._zip_response(
+            {
+                "XBRL/PublicDoc/manifest.xml": b"<manifest/>",
+                "XBRL/PublicDoc/jpcrp.xbrl": b"<xbrli:xbrl>content</xbrli:xbrl>",
+            }
         )
 
+        with open_document("S100VJ7H", client=mock_client) as member:
+            self.assertEqual(member.read(), b"<xbrli:xbrl>content</xbrli:xbrl>")
+
+    def test_open_document_no_xbrl_member(self):
+        """
+        異常系: ZIPにXBRLファイルが含まれていない場合
+        """
+        mock_client = MagicMock()
+        mock_client.get_document.return_value = self._zip_response(
+            {"XBRL/PublicDoc/manifest.xml": b"<manifest/>"}
+        )
+
+        with self.assertRaises(Exception) as context:
+            with open_document("S100VJ7H", client=mock_client):
+                pass
+        self.assertIn("XBRLファイルが見つかりませんでした", str(context.exception))
+
     # @patch("get_stakeholder_data.services.get_document.requests.get")
     # @patch("get_stakeholder_data.services.get_document.os.getenv")
     # def test_get_document_api_error(self, mock_getenv, mock_requests_get):
@@ -0,0 +1,75 @@
+import json
+import unittest
+
+from get_stakeholder_data.services.json_stream import (
+    JsonStreamParser,
+    MalformedStreamError,
+    TruncatedStreamError,
+)
+
+
+RESPONSE = json.dumps(
+    {
+        "大株主の状況": {
+            "date": "2025年3月31日現在",
+            "data": [
+                {"氏名又は名称": "A {株式会社}", "所有割合(％)": "10.0"},
+                {"氏名又は名称": 'B "銀行"', "所有割合(％)": "5.0"},
+            ],
+        }
+    },
+    ensure_ascii=False,
+)
+
+
+def _chunks(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonStreamParser(unittest.TestCase):
+    def test_rows_are_yielded_incrementally(self):
+        """
+        正常系: 断片の境界に関係なく、行が閉じた時点で返す
+        """
+        parser = JsonStreamParser()
+        rows = []
+        first_row_at = None
+        for i, chunk in enumerate(_chunks("```json\n" + RESPONSE + "\n```", 7)):
+            rows.extend(parser.feed(chunk))
+            if rows and first_row_at is None:
+                first_row_at = i
+
+        self.assertEqual([r["氏名又は名称"] for r in rows], ["A {株式会社}", 'B "銀行"'])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.result(), json.loads(RESPONSE))
+        self.assertLess(first_row_at, len(_chunks(RESPONSE, 7)) - 1)
+
+    def test_malformed_start(self):
+        """
+        異常系: JSONで始まらない応答はすぐに打ち切る
+        """
+        parser = JsonStreamParser()
+        with self.assertRaises(MalformedStreamError):
+            parser.feed("以下が抽出結果です")
+
+    def test_malformed_structure(self):
+        """
+        異常系: 括弧の不一致・JSON以外の文字は見つけた時点で打ち切る
+        """
+        with self.assertRaises(MalformedStreamError):
+            JsonStreamParser().feed('{"data": [{"a": "1"}}')
+        with self.assertRaises(MalformedStreamError):
+            JsonStreamParser().feed('{"data": [{"a": 株式会社}]}')
+
+    def test_incomplete(self):
+        """
+        異常系: 途中で終わった応答は result() で TruncatedStreamError
+        """
+        parser = JsonStreamParser()
+        parser.feed(RESPONSE[:40])
+        with self.assertRaises(TruncatedStreamError):
+            parser.result()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.models.base import Base
+from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.services.known_docs import (
+    KnownDocIds,
+    find_existing_doc_ids,
+)
+
+
+def _doc(doc_id):
+    return Doc(doc_id, "12345", "Test Company", None, None, None, "有価証券報告書")
+
+
+class TestKnownDocs(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            future=True,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine, future=True)
+        session = self.Session()
+        for i in range(5):
+            session.add(DocsModel.from_dataclass(_doc(f"S{i}")))
+        session.commit()
+        session.close()
+
+    @patch("get_stakeholder_data.services.known_docs.CHUNK_SIZE", 2)
+    def test_find_existing_doc_ids(self):
+        """
+        正常系: 取り込み済みの文書番号だけを返す（分割クエリでも同じ結果）
+        """
+        session = self.Session()
+        result = find_existing_doc_ids(session, ["S0", "S3", "S4", "X1", "X2"])
+        session.close()
+
+        self.assertEqual(result, {"S0", "S3", "S4"})
+
+    def test_known_doc_ids(self):
+        """
+        正常系: 起動時に読み込んだ集合で振り分け、取り込み後に追加できる
+        """
+        known = KnownDocIds.load(self.Session)
+        self.assertEqual(len(known), 5)
+
+        new_docs, known_docs = known.partition([_doc("S1"), _doc("X1")])
+        self.assertEqual([d.doc_id for d in new_docs], ["X1"])
+        self.assertEqual([d.doc_id for d in known_docs], ["S1"])
+
+        known.add("X1")
+        self.assertIn("X1", known)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+
+from get_stakeholder_data.services.get_documents import get_documents_range
+from get_stakeholder_data.services.list_cache import DocumentListCache
+
+
+def _list_response(doc_id):
+    return {
+        "metadata": {"status": "200"},
+        "results": [
+            {
+                "docID": doc_id,
+                "secCode": "12345",
+                "filerName": "Test Company",
+                "periodStart": "2025-01-01",
+                "periodEnd": "2025-03-31",
+                "submitDateTime": "2025-04-12T10:00:00",
+                "docDescription": "有価証券報告書",
+            }
+        ],
+    }
+
+
+class TestDocumentListCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DocumentListCache(self.tmp.name, refresh_days=3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_past_date_is_served_from_cache(self):
+        """
+        正常系: 確定済みの日付は保存したレスポンスを返す
+        """
+        past = datetime(2025, 4, 12)
+        self.cache.save(past, _list_response("S100VJ7H"))
+        self.assertEqual(self.cache.load(past), _list_response("S100VJ7H"))
+
+    def test_recent_date_is_not_served_from_cache(self):
+        """
+        正常系: 当日・直近の日付はキャッシュがあっても返さない
+        """
+        today = datetime.now()
+        self.cache.save(today, _list_response("S100VJ7H"))
+        self.assertIsNone(self.cache.load(today))
+        self.assertIsNone(self.cache.load(today - timedelta(days=2)))
+
+    def test_get_documents_range_uses_cache(self):
+        """
+        正常系: 2回目の取得では過去日のAPI呼び出しが発生しない
+        """
+        client = MagicMock()
+        client.get_document_list.side_effect = lambda date_str: MagicMock(
+            json=MagicMock(return_value=_list_response(f"S-{date_str}"))
+        )
+        start = datetime(2025, 4, 1)
+        end = datetime(2025, 4, 3)
+
+        first = get_documents_range(start, end, client=client, cache=self.cache)
+        self.assertEqual(client.get_document_list.call_count, 3)
+        self.assertEqual(
+            [d for d, _ in first],
+            [datetime(2025, 4, 1), datetime(2025, 4, 2), datetime(2025, 4, 3)],
+        )
+        self.assertEqual(first[1][1].documents[0].doc_id, "S-2025-04-02")
+
+        second = get_documents_range(start, end, client=client, cache=self.cache)
+        self.assertEqual(client.get_document_list.call_count, 3)
+        self.assertEqual(
+            [docs.documents[0].doc_id for _, docs in second],
+            [docs.documents[0].doc_id for _, docs in first],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
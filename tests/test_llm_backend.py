@@ -0,0 +1,216 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from google.genai.errors import APIError
+
+from get_stakeholder_data.services.ai_parser import GeminiExtractor, retry_delay
+from get_stakeholder_data.services.llm_backend import (
+    LlmBackend,
+    RecordingBackend,
+    ReplayBackend,
+    create_backend,
+    prompt_key,
+)
+from get_stakeholder_data.services.llm_cache import LlmCache
+from get_stakeholder_data.services.rate_limiter import RateLimiter
+
+
+RESPONSE = json.dumps(
+    {
+        "大株主の状況": {
+            "date": "2025年3月31日現在",
+            "data": [
+                {
+                    "氏名又は名称": "株主A",
+                    "住所": "東京都",
+                    "所有株式数(千株)": "100",
+                    "所有割合(％)": "10.00",
+                }
+            ],
+        }
+    },
+    ensure_ascii=False,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestReplayBackend(unittest.TestCase):
+    def test_replay_recorded_response(self):
+        """
+        正常系: 記録済みのプロンプトには記録した応答を、遅延を入れて返す
+        """
+        clock = FakeClock()
+        backend = ReplayBackend(
+            {prompt_key("prompt"): RESPONSE},
+            latency=0.5,
+            chunk_size=7,
+            sleep=clock.sleep,
+            clock=clock,
+        )
+
+        self.assertEqual(backend.generate("prompt"), RESPONSE)
+        self.assertEqual("".join(backend.stream("prompt")), RESPONSE)
+        self.assertEqual(clock.now, 1.0)
+
+    def test_unknown_prompt(self):
+        """
+        異常系: 記録がなく default もないプロンプトは KeyError
+        """
+        with self.assertRaises(KeyError):
+            ReplayBackend().generate("prompt")
+        self.assertEqual(ReplayBackend(default=lambda p: p.upper()).generate("ab"), "AB")
+
+    def test_error_rate(self):
+        """
+        正常系: error_rates の確率で指定したステータスの APIError を返す
+        """
+        backend = ReplayBackend(default=RESPONSE, error_rates={503: 1.0})
+
+        with self.assertRaises(APIError) as ctx:
+            backend.generate("prompt")
+        self.assertEqual(ctx.exception.code, 503)
+        self.assertEqual(backend.errors[503], 1)
+
+    def test_server_rpm(self):
+        """
+        正常系: RPM を超えた呼び出しは retryDelay 付きの 429 を返し、1分後に回復する
+        """
+        clock = FakeClock()
+        backend = ReplayBackend(default=RESPONSE, rpm=2, sleep=clock.sleep, clock=clock)
+        backend.generate("a")
+        clock.now = 20.0
+        backend.generate("b")
+
+        with self.assertRaises(APIError) as ctx:
+            backend.generate("c")
+        self.assertEqual(ctx.exception.code, 429)
+        self.assertAlmostEqual(retry_delay(ctx.exception, 1), 40.0)
+
+        clock.now = 60.0
+        self.assertEqual(backend.generate("c"), RESPONSE)
+
+    def test_record_and_load(self):
+        """
+        正常系: RecordingBackend で記録した応答を ReplayBackend.load で再生できる
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recordings.jsonl")
+            recorder = RecordingBackend(ReplayBackend(default=RESPONSE), path)
+            recorder.generate("prompt 1")
+            list(recorder.stream("prompt 2"))
+
+            backend = ReplayBackend.load(path)
+
+        self.assertEqual(backend.generate("prompt 1"), RESPONSE)
+        self.assertEqual(backend.generate("prompt 2"), RESPONSE)
+
+    def test_record_incomplete_stream(self):
+        """
+        異常系: JSONとして完結しないまま打ち切られた stream の応答は記録しない
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recordings.jsonl")
+            recorder = RecordingBackend(ReplayBackend(default=RESPONSE, chunk_size=16), path)
+            stream = recorder.stream("prompt")
+            next(stream)
+            stream.close()
+
+            self.assertFalse(os.path.exists(path))
+
+    def test_abstract_backend(self):
+        """
+        異常系: generate を実装しないバックエンドはインスタンス化できない
+        """
+        with self.assertRaises(TypeError):
+            LlmBackend()
+
+    def test_create_replay_backend_from_env(self):
+        """
+        正常系: 環境変数から replay の遅延・エラーの発生確率・上限・シードを設定する
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recordings.jsonl")
+            open(path, "w").close()
+            env = {
+                "LLM_BACKEND": "replay",
+                "LLM_REPLAY_PATH": path,
+                "LLM_REPLAY_LATENCY": "1.5",
+                "LLM_REPLAY_JITTER": "0.5",
+                "LLM_REPLAY_ERROR_RATES": "429:0.01,503:0.05",
+                "LLM_REPLAY_RPM": "30",
+                "LLM_REPLAY_SEED": "0",
+                "LLM_RECORD_PATH": "",
+            }
+            with mock.patch.dict(os.environ, env):
+                backend = create_backend()
+
+        self.assertEqual(backend.latency, 1.5)
+        self.assertEqual(backend.jitter, 0.5)
+        self.assertEqual(backend.error_rates, {429: 0.01, 503: 0.05})
+        self.assertEqual(backend.rpm, 30)
+
+
+class TestExtractorWithReplayBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_retry_on_backend_rate_limit(self):
+        """
+        正常系: バックエンドの 429 は retryDelay だけ待ってリトライし、結果はモデル名 replay でキャッシュする
+        """
+        clock = FakeClock()
+        backend = ReplayBackend(default=RESPONSE, rpm=1, sleep=clock.sleep, clock=clock)
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        extractor = GeminiExtractor(
+            cache=self.cache, limiter=limiter, backend=backend, stream=True
+        )
+
+        first = extractor.extract("<p>株主A</p>", "shareholder_prompt.txt")
+        second = extractor.extract("<p>株主B</p>", "shareholder_prompt.txt")
+
+        self.assertEqual(first, json.loads(RESPONSE))
+        self.assertEqual(second, json.loads(RESPONSE))
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(backend.errors[429], 1)
+        self.assertAlmostEqual(limiter.waited_seconds, 60.0)
+        self.assertEqual(extractor.model, "replay")
+        self.assertEqual(self.cache.stats().entries, 2)
+
+    def test_record_stream(self):
+        """
+        正常系: stream で JSON が閉じた時点で打ち切られても、RecordingBackend は応答を記録する
+        """
+        path = os.path.join(self.tmp.name, "recordings.jsonl")
+        backend = RecordingBackend(ReplayBackend(default=RESPONSE, chunk_size=16), path)
+        extractor = GeminiExtractor(
+            cache=self.cache, limiter=RateLimiter(), backend=backend, stream=True
+        )
+
+        result = extractor.extract("<p>株主A</p>", "shareholder_prompt.txt")
+
+        self.assertEqual(result, json.loads(RESPONSE))
+        replay = ReplayBackend.load(path)
+        self.assertEqual(len(replay.recordings), 1)
+        self.assertEqual(list(replay.recordings.values()), [RESPONSE])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from get_stakeholder_data.services.ai_parser import (
+    MODEL_NAME,
+    GeminiExtractor,
+    ai_parser,
+)
+from get_stakeholder_data.services.llm_cache import LlmCache
+
+
+BLOCK = "<table><tr><td>日本マスタートラスト信託銀行</td></tr></table>"
+TEMPLATE = "次のXMLから大株主を抽出してください。\n{xml_data}"
+RESULT = {"大株主の状況": [{"氏名又は名称": "日本マスタートラスト信託銀行"}]}
+
+
+class TestLlmCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        """
+        正常系: 同じブロック・テンプレート・モデルなら保存した結果を返す
+        """
+        self.assertIsNone(self.cache.get(BLOCK, "p.txt", TEMPLATE, MODEL_NAME))
+        self.cache.put(BLOCK, "p.txt", TEMPLATE, MODEL_NAME, RESULT)
+
+        self.assertEqual(self.cache.get(BLOCK, "p.txt", TEMPLATE, MODEL_NAME), RESULT)
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.entries), (1, 1, 1))
+        self.assertEqual(stats.hit_rate, 0.5)
+
+    def test_key_includes_template_and_model(self):
+        """
+        正常系: テンプレートやモデルが異なればヒットしない
+        """
+        self.cache.put(BLOCK, "p.txt", TEMPLATE, MODEL_NAME, RESULT)
+
+        self.assertIsNone(self.cache.get(BLOCK, "p.txt", TEMPLATE + "。", MODEL_NAME))
+        self.assertIsNone(self.cache.get(BLOCK, "p.txt", TEMPLATE, "other-model"))
+        self.assertIsNone(self.cache.get(BLOCK + " ", "p.txt", TEMPLATE, MODEL_NAME))
+
+    def test_invalidate_stale(self):
+        """
+        正常系: プロンプトファイルが変更された・削除されたエントリを削除する
+        """
+        prompt_dir = Path(self.tmp.name)
+        (prompt_dir / "p.txt").write_text(TEMPLATE, encoding="utf-8")
+        self.cache.put(BLOCK, "p.txt", TEMPLATE, MODEL_NAME, RESULT)
+        self.cache.put(BLOCK, "removed.txt", "削除済み {xml_data}", MODEL_NAME, RESULT)
+
+        self.assertEqual(self.cache.invalidate_stale(prompt_dir), 1)
+        self.assertEqual(self.cache.stats().entries, 1)
+
+        (prompt_dir / "p.txt").write_text(TEMPLATE + "\n追記", encoding="utf-8")
+        self.assertEqual(self.cache.invalidate_stale(prompt_dir), 1)
+        self.assertEqual(self.cache.stats().entries, 0)
+
+
+class TestAiParserCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    @patch("get_stakeholder_data.services.llm_backend.genai.Client")
+    def test_second_call_uses_cache(self, mock_client):
+        """
+        正常系: 2回目の同じ呼び出しではAPIを呼ばずキャッシュから返す
+        """
+        response = MagicMock(text='```json\n{"大株主の状況": []}\n```')
+        mock_client.return_value.models.generate_content.return_value = response
+
+        extractor = GeminiExtractor(api_key="key", cache=self.cache)
+
+        first = ai_parser(BLOCK, "shareholder_prompt.txt", extractor=extractor)
+        second = ai_parser(BLOCK, "shareholder_prompt.txt", extractor=extractor)
+
+        self.assertEqual(first, {"大株主の状況": []})
+        self.assertEqual(second, first)
+        self.assertEqual(mock_client.return_value.models.generate_content.call_count, 1)
+        self.assertEqual(self.cache.stats().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
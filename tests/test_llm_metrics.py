@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import unittest
+
+from get_stakeholder_data.services.ai_parser import GeminiExtractor
+from get_stakeholder_data.services.llm_backend import ReplayBackend
+from get_stakeholder_data.services.llm_cache import LlmCache
+from get_stakeholder_data.services.llm_metrics import (
+    Histogram,
+    LlmCallRecord,
+    LlmMetrics,
+    doc_context,
+)
+from get_stakeholder_data.services.rate_limiter import RateLimiter
+
+
+RESPONSE = json.dumps(
+    {"大株主の状況": {"date": "", "data": [{"氏名又は名称": "株主A", "住所": "東京都"}]}},
+    ensure_ascii=False,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestLlmMetrics(unittest.TestCase):
+    def test_histogram_cumulative(self):
+        """
+        正常系: バケットは上限以下の件数の累積
+        """
+        histogram = Histogram((1, 5))
+        for value in (0.5, 3, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 3])
+        self.assertEqual(
+            histogram.lines("x", 'prompt="p"'),
+            [
+                'x_bucket{prompt="p",le="1"} 1',
+                'x_bucket{prompt="p",le="5"} 3',
+                'x_bucket{prompt="p",le="+Inf"} 4',
+                'x_sum{prompt="p"} 16.5',
+                'x_count{prompt="p"} 4',
+            ],
+        )
+
+    def test_prometheus_and_slowest(self):
+        """
+        正常系: 結果ごとの件数・リトライ・トークン数を出力し、遅い呼び出しを文書番号付きで保持する
+        """
+        metrics = LlmMetrics(keep=2)
+        metrics.record(LlmCallRecord("p.txt", "S1", input_tokens=100, latency=1.0, attempts=1))
+        metrics.record(
+            LlmCallRecord(
+                "p.txt",
+                "S2",
+                input_tokens=300,
+                latency=9.0,
+                attempts=3,
+                retried=["APIError429", "APIError429"],
+                error="APIError503",
+            )
+        )
+        metrics.record(LlmCallRecord("p.txt", "S3", input_tokens=200, latency=4.0, attempts=1))
+        metrics.record(LlmCallRecord("p.txt", "S4", cached=True))
+
+        text = metrics.to_prometheus()
+
+        self.assertIn('llm_calls_total{prompt="p.txt",outcome="ok"} 2', text)
+        self.assertIn('llm_calls_total{prompt="p.txt",outcome="APIError503"} 1', text)
+        self.assertIn('llm_calls_total{prompt="p.txt",outcome="cached"} 1', text)
+        self.assertIn('llm_retries_total{prompt="p.txt",error="APIError429"} 2', text)
+        self.assertIn('llm_attempts_total{prompt="p.txt"} 5', text)
+        self.assertIn('llm_input_tokens_total{prompt="p.txt"} 600', text)
+        self.assertIn('llm_latency_seconds_count{prompt="p.txt"} 3', text)
+        self.assertEqual([call.doc_id for call in metrics.slowest()], ["S2", "S3"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics", "llm.prom")
+            metrics.write_prometheus(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), text)
+
+
+class TestExtractorMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_record_call(self):
+        """
+        正常系: 文書番号・試行回数・リトライしたエラー・入出力のサイズを記録し、キャッシュヒットも数える
+        """
+        clock = FakeClock()
+        backend = ReplayBackend(default=RESPONSE, rpm=1, sleep=clock.sleep, clock=clock)
+        metrics = LlmMetrics()
+        extractor = GeminiExtractor(
+            cache=self.cache,
+            limiter=RateLimiter(clock=clock, sleep=clock.sleep),
+            backend=backend,
+            metrics=metrics,
+        )
+        backend.generate("先に1回呼んでおく")
+
+        with doc_context("S100TEST"):
+            extractor.extract("<p>株主A</p>", "shareholder_prompt.txt")
+            extractor.extract("<p>株主A</p>", "shareholder_prompt.txt")
+
+        call = metrics.slowest()[0]
+        self.assertEqual(call.doc_id, "S100TEST")
+        self.assertEqual(call.attempts, 2)
+        self.assertEqual(call.retried, ["APIError429"])
+        self.assertIsNone(call.error)
+        self.assertEqual(call.output_chars, len(RESPONSE))
+        self.assertGreater(call.input_tokens, 0)
+        self.assertEqual(metrics.calls[("shareholder_prompt.txt", "ok")], 1)
+        self.assertEqual(metrics.calls[("shareholder_prompt.txt", "cached")], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from get_stakeholder_data.main import parse_args
+from get_stakeholder_data.services.extraction import MODE_HYBRID, MODE_LLM
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_defaults(self):
+        """
+        正常系: 引数を省略した場合は従来どおり役員・株主情報を別々にLLMで抽出する
+        """
+        args = parse_args([])
+
+        self.assertEqual(args.extraction, MODE_LLM)
+        self.assertFalse(args.combined_llm)
+
+    def test_opt_in_flags(self):
+        """
+        正常系: hybrid と1回のLLM呼び出しは指定した場合だけ有効になる
+        """
+        args = parse_args(["--extraction", "hybrid", "--combined-llm"])
+
+        self.assertEqual(args.extraction, MODE_HYBRID)
+        self.assertTrue(args.combined_llm)
+
+    def test_invalid_extraction(self):
+        """
+        異常系: 未知の抽出方式は拒否される
+        """
+        with self.assertRaises(SystemExit):
+            parse_args(["--extraction", "xbrl"])
+
+
+if __name__ == "__main__":
+    unittest.main()
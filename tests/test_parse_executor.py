@@ -0,0 +1,103 @@
+import gzip
+import os
+import pickle
+import tempfile
+import unittest
+
+from get_stakeholder_data.parser.xbrl_parser import ParsingError, XbrlParser
+from get_stakeholder_data.services.parse_executor import ParseExecutor
+
+
+SHAREHOLDER_TABLE = (
+    "&lt;table&gt;&lt;tr&gt;&lt;td&gt;株主A&lt;/td&gt;&lt;td&gt;東京都&lt;/td&gt;"
+    "&lt;td&gt;1,000&lt;/td&gt;&lt;td&gt;10.00&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;"
+)
+OFFICER_TABLE = (
+    "&lt;table&gt;&lt;tr&gt;&lt;td&gt;取締役&lt;/td&gt;&lt;td&gt;山田 太郎&lt;/td&gt;"
+    "&lt;td&gt;1960年1月1日生&lt;/td&gt;&lt;td&gt;略歴&lt;/td&gt;&lt;td&gt;(注)3&lt;/td&gt;"
+    "&lt;td&gt;120&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;"
+)
+XBRL = f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+    xmlns:jpcrp_cor="http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2024-11-01/jpcrp_cor">
+  <jpcrp_cor:InformationAboutOfficersTextBlock contextRef="FilingDateInstant">{OFFICER_TABLE}</jpcrp_cor:InformationAboutOfficersTextBlock>
+  <jpcrp_cor:MajorShareholdersTextBlock contextRef="CurrentYearInstant">{SHAREHOLDER_TABLE}</jpcrp_cor:MajorShareholdersTextBlock>
+</xbrli:xbrl>
+""".encode("utf-8")
+
+
+class TestParsedXbrl(unittest.TestCase):
+    def test_same_as_parser(self):
+        """
+        正常系: プロセス間で受け渡した後も XbrlParser と同じ結果・例外を返す
+        """
+        parser = XbrlParser(XBRL)
+        parsed = pickle.loads(pickle.dumps(parser.to_parsed()))
+
+        self.assertEqual(parsed.jp_prefix, "jpcrp_cor")
+        self.assertEqual(parsed.get_major_shareholders(), parser.get_major_shareholders())
+        self.assertEqual(
+            parsed.get_major_shareholders_text(), parser.get_major_shareholders_text()
+        )
+        self.assertEqual(
+            parsed.extract_officer_block()[0].text, parser.extract_officer_block()[0].text
+        )
+        with self.assertRaises(ParsingError) as expected:
+            parser.get_directors_and_auditors()
+        with self.assertRaises(ParsingError) as actual:
+            parsed.get_directors_and_auditors()
+        self.assertEqual(str(actual.exception), str(expected.exception))
+
+
+class TestParseExecutor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_parse_paths(self):
+        """
+        正常系: パスを渡して別プロセスでパースし、投入順に結果を返してワーカーごとに集計する
+        """
+        paths = [self._write(f"S{i}.xbrl" + (".gz" if i % 2 else ""), XBRL) for i in range(4)]
+        expected = XbrlParser(XBRL).get_major_shareholders()
+
+        with ParseExecutor(workers=2) as executor:
+            results = list(executor.map(paths))
+
+        self.assertEqual([r.get_major_shareholders() for r in results], [expected] * 4)
+        stats = executor.stats()
+        self.assertLessEqual(len(stats), 2)
+        self.assertEqual(sum(s.documents for s in stats), 4)
+        self.assertEqual(sum(s.bytes for s in stats), sum(os.path.getsize(p) for p in paths))
+
+    def test_parse_error(self):
+        """
+        異常系: パースできない文書は例外を返し、失敗として数える
+        """
+        path = self._write("broken.xbrl", b"<xbrli:xbrl>")
+
+        with ParseExecutor(workers=1) as executor:
+            with self.assertRaises(Exception):
+                executor.parse(path)
+
+        self.assertEqual(executor.stats()[0].failed, 1)
+
+    def test_invalid_workers(self):
+        """
+        異常系: ワーカー数が0以下なら ValueError
+        """
+        with self.assertRaises(ValueError):
+            ParseExecutor(workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import html
+import random
+import unittest
+from unittest.mock import patch
+
+from get_stakeholder_data.utils.process_text import (
+    html_table_to_array,
+    html_table_to_array_soup,
+)
+
+# BeautifulSoup と lxml で木の作り方が異なりうるHTMLを含む
+EDGE_CASES = [
+    "<table><tr><td>a</td><td><p>x</p><p>y</p></td></tr></table>",
+    "&lt;table&gt;&lt;tr&gt;&lt;td&gt;A&amp;amp;B&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;",
+    "<table><tr><td>山田 <span>太郎</span></td><td>x<br/>y</td></tr></table>",
+    "<table><tr><td><p>a<br/>b</p></td></tr></table>",
+    "<table><tr><td><!-- c -->t<?pi x?>u</td></tr></table>",
+    "<table><tr><td><table><tr><td>in</td></tr></table></td><td>out</td></tr></table>",
+    "<p>pre<table><tr><td>x</td></tr></table></p>",
+    "<table><tr><td><p>a<p>b</p></p></td></tr></table>",
+    "<table><tr><td>a<td>b</tr><tr><td>c</table>",
+    "<table><colgroup/><tr><td/><td>z</td></tr></table>",
+    "<table><tr><th>h</th></tr><tr><td>&nbsp;</td><td>　x　</td></tr></table>",
+    "<td>orphan</td><tr><td>t</td></tr>",
+    "<table><tr></tr><tr><td>&foo; &amp;lt;</td></tr></table>",
+    "<table><tr><td><script>s</script>v<style>q</style></td></tr></table>",
+    "<table><tr><td>a<![CDATA[ b ]]></td></tr></table>",
+    "<table><tr><td>ruby<ruby>漢<rt>かん</rt></ruby></td></tr></table>",
+    "<table><tr><td><br>x</br></td></tr></table>",
+    "<table xmlns='http://www.w3.org/1999/xhtml'><tr><td>ns</td></tr></table>",
+    "<table><tr><td>a\r\nb</td></tr></table>",
+    "<table><tr><td>&amp;copy; &amp;#169; x&amp;amp;y &#x80;</td></tr></table>",
+    "<TABLE><TR><TD>up</TD></TR></TABLE>",
+    "<table><tr><td title='a<b'>q</td></tr></table>",
+    "<table><tr><td><o:p>office</o:p></td></tr></table>",
+    "text only",
+    "",
+]
+
+TEXTS = ["山田 太郎", "　", "1,000", " ", "A&amp;B", "&lt;x&gt;", "\n改行\n", "&#12354;", ""]
+TAGS = ["p", "span", "div", "b", "table", "tr", "td", "th", "tbody"]
+
+
+def _random_html(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(0, 3)):
+        k = rng.random()
+        if depth < 4 and k < 0.35:
+            tag = rng.choice(TAGS)
+            parts.append(f"<{tag}>{_random_html(rng, depth + 1)}</{tag}>")
+        elif k < 0.45:
+            parts.append(rng.choice(["<br/>", "<br />", "<p/>"]))
+        else:
+            parts.append(rng.choice(TEXTS))
+    return "".join(parts)
+
+
+def _random_table(rng):
+    rows = "".join(
+        "<tr>"
+        + "".join(f"<td>{_random_html(rng, 1)}</td>" for _ in range(rng.randint(1, 4)))
+        + "</tr>"
+        for _ in range(rng.randint(1, 5))
+    )
+    text = f"{_random_html(rng, 2)}<table>{rows}</table>{_random_html(rng, 2)}"
+    if rng.random() < 0.5:
+        # TextBlockと同じくエスケープしたもの
+        text = html.escape(text, quote=False)
+    return text
+
+
+class TestHtmlTableToArray(unittest.TestCase):
+    def test_edge_cases_match_soup(self):
+        """
+        正常系: 不正なHTML・特別なタグを含む場合も BeautifulSoup の結果と一致する
+        """
+        for case in EDGE_CASES:
+            with self.subTest(case=case):
+                self.assertEqual(html_table_to_array(case), html_table_to_array_soup(case))
+
+    def test_random_tables_match_soup(self):
+        """
+        正常系: 入れ子・空のセル・<br/>・エスケープを含む表で BeautifulSoup の結果と一致する
+        """
+        rng = random.Random(0)
+        for _ in range(500):
+            case = _random_table(rng)
+            with self.subTest(case=case):
+                self.assertEqual(html_table_to_array(case), html_table_to_array_soup(case))
+
+    @patch("get_stakeholder_data.utils.process_text.html_table_to_array_soup")
+    def test_xhtml_uses_fast_path(self, mock_soup):
+        """
+        正常系: EDINETのTextBlockのような整形式のXHTMLは BeautifulSoup を使わずに変換する
+        """
+        text = html.escape(
+            '<p style="margin: 0">2025年3月31日現在</p><table><colgroup><col/></colgroup>'
+            '<tr><td style="text-align: left"><p>代表取締役<br/>社長</p></td>'
+            "<td><p>山田　太郎</p></td><td><p>1983年4月</p><p>当社入社</p></td></tr></table>",
+            quote=False,
+        )
+
+        self.assertEqual(
+            html_table_to_array(text),
+            [["代表取締役社長", "山田　太郎", "1983年4月 / 当社入社"]],
+        )
+        mock_soup.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
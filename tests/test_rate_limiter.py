@@ -0,0 +1,178 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from google.genai.errors import APIError
+
+from get_stakeholder_data.services.ai_parser import GeminiExtractor, retry_delay
+from get_stakeholder_data.services.llm_cache import LlmCache
+from get_stakeholder_data.services.rate_limiter import RateLimiter, estimate_tokens
+
+
+class FakeClock:
+    """
+    sleep() で進む時計
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_per_minute(self):
+        """
+        正常系: RPMの予算を使い切ったら補充されるまで待つ
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(rpm=2, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        waited = limiter.acquire()
+
+        self.assertAlmostEqual(waited, 30.0)
+        self.assertAlmostEqual(limiter.waited_seconds, 30.0)
+
+    def test_tokens_per_minute(self):
+        """
+        正常系: TPMの予算が足りない場合はトークンが貯まるまで待つ
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(tpm=600, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire(500)
+        waited = limiter.acquire(200)
+
+        self.assertAlmostEqual(waited, 10.0)
+
+    def test_settle(self):
+        """
+        正常系: 概算で確保した予算を実際のトークン数に精算し、多く使った分だけ次の呼び出しを待たせる
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(tpm=600, clock=clock, sleep=clock.sleep)
+
+        limiter.acquire(300)
+        limiter.settle(300, 100)
+        self.assertEqual(limiter.acquire(400), 0.0)
+        limiter.settle(400, 500)
+        waited = limiter.acquire(100)
+
+        self.assertAlmostEqual(waited, 10.0)
+
+    def test_estimate_tokens(self):
+        """
+        正常系: 英数字・タグは約4文字、日本語は約1文字を1トークンとして概算する
+        """
+        self.assertEqual(estimate_tokens(""), 1)
+        self.assertEqual(estimate_tokens("&lt;td&gt;"), 3)
+        self.assertEqual(estimate_tokens("株主"), 2)
+        self.assertEqual(estimate_tokens("&lt;td&gt;株主"), 5)
+
+    def test_pause(self):
+        """
+        正常系: サーバーの指示による一時停止中は予算があっても待つ
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.pause(15)
+
+        self.assertAlmostEqual(limiter.acquire(), 15.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+
+
+def api_error(code, details=None):
+    return APIError(code, {"error": {"code": code, "details": details or []}})
+
+
+@patch("get_stakeholder_data.services.llm_backend.genai.Client")
+class TestAiParserRetry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = LlmCache(os.path.join(self.tmp.name, "llm_cache.sqlite3"))
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(clock=self.clock, sleep=self.clock.sleep)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_retry_on_quota_error(self, mock_client):
+        """
+        正常系: 429 はサーバーの retryDelay だけ待ってリトライする（終了しない）
+        """
+        retry_info = {
+            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+            "retryDelay": "37s",
+        }
+        mock_client.return_value.models.generate_content.side_effect = [
+            api_error(429, [retry_info]),
+            MagicMock(text='{"大株主の状況": []}'),
+        ]
+
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=self.limiter)
+        result = extractor.extract("<table/>", "shareholder_prompt.txt")
+
+        self.assertEqual(result, {"大株主の状況": []})
+        self.assertEqual(self.clock.sleeps, [37.0])
+        mock_client.assert_called_once()
+
+    def test_failed_call_returns_reserved_tokens(self, mock_client):
+        """
+        正常系: パースできない応答でも、確保したトークンの予算を精算して返す
+        """
+        mock_client.return_value.models.generate_content.return_value = MagicMock(
+            text="not json"
+        )
+        limiter = RateLimiter(tpm=1000, clock=self.clock, sleep=self.clock.sleep)
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=limiter)
+
+        self.assertIsNone(extractor.extract("<p>株主A</p>", "shareholder_prompt.txt"))
+
+        self.assertAlmostEqual(limiter.tokens.tokens, 1000)
+
+    def test_non_retryable_error(self, mock_client):
+        """
+        異常系: リトライ対象外のエラーは SystemExit ではなく APIError を送出する
+        """
+        mock_client.return_value.models.generate_content.side_effect = api_error(400)
+
+        extractor = GeminiExtractor("key", cache=self.cache, limiter=self.limiter)
+        with self.assertRaises(APIError):
+            extractor.extract("<table/>", "shareholder_prompt.txt")
+
+    def test_retry_exhausted(self, mock_client):
+        """
+        異常系: リトライ回数を超えたら APIError を送出する
+        """
+        mock_client.return_value.models.generate_content.side_effect = api_error(503)
+
+        extractor = GeminiExtractor(
+            "key", cache=self.cache, limiter=self.limiter, max_retries=3
+        )
+        with self.assertRaises(APIError):
+            extractor.extract("<table/>", "shareholder_prompt.txt")
+        self.assertEqual(len(self.clock.sleeps), 2)
+
+
+class TestRetryDelay(unittest.TestCase):
+    def test_backoff_without_hint(self):
+        """
+        正常系: サーバーの指示がなければ試行回数に応じて待機時間を伸ばす
+        """
+        self.assertLessEqual(retry_delay(api_error(503), 1), 2.0)
+        self.assertGreaterEqual(retry_delay(api_error(503), 4), 8.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from get_stakeholder_data.domain.doc import Doc
+from get_stakeholder_data.models.base import Base
+from get_stakeholder_data.models.docs_model import DocsModel
+from get_stakeholder_data.models.run_docs_model import RunDocsModel
+from get_stakeholder_data.services.run_state import RunState
+
+
+def _doc(doc_id):
+    return Doc(doc_id, "12345", "Test Company", None, None, None, "有価証券報告書")
+
+
+class TestRunState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        engine = create_engine(
+            f"sqlite:///{os.path.join(self.tmp.name, 'test.db')}", future=True
+        )
+        Base.metadata.create_all(bind=engine)
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, future=True)
+        self.run_state = RunState(self.Session, max_attempts=2)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _ingest(self, doc_id):
+        session = self.Session()
+        session.add(DocsModel.from_dataclass(_doc(doc_id)))
+        session.commit()
+        session.close()
+
+    def test_completed_date_is_skipped(self):
+        """
+        正常系: すべての文書が取り込まれた日付は次回スキップされる
+        """
+        day1, day2 = datetime(2025, 4, 1), datetime(2025, 4, 2)
+        self.run_state.start_doc("S1", day1)
+        self._ingest("S1")
+        self.run_state.finish_doc("S1", day1)
+
+        self.assertTrue(self.run_state.finish_date(day1, ["S1"]))
+        self.assertEqual(self.run_state.pending_dates([day1, day2]), [day2])
+
+    def test_failed_doc_keeps_date_pending(self):
+        """
+        正常系: 失敗した文書が残る日付は再試行の対象になる
+        """
+        day = datetime(2025, 4, 1)
+        self._ingest("S1")
+        self.run_state.start_doc("S2", day)
+        self.run_state.finish_doc("S2", day, error=RuntimeError("API Error"))
+
+        self.assertFalse(self.run_state.finish_date(day, ["S1", "S2"]))
+        self.assertEqual(self.run_state.pending_dates([day]), [day])
+
+        session = self.Session()
+        row = session.get(RunDocsModel, "S2")
+        self.assertEqual(row.status, "failed")
+        self.assertEqual(row.error, "API Error")
+        self.assertEqual(row.attempts, 1)
+        session.close()
+
+    def test_in_flight_doc_keeps_date_pending(self):
+        """
+        正常系: 処理中のまま中断された文書が残る日付は完了にしない
+        """
+        day = datetime(2025, 4, 1)
+        self.run_state.start_doc("S1", day)
+
+        self.assertFalse(self.run_state.finish_date(day, ["S1"]))
+
+    def test_gives_up_after_max_attempts(self):
+        """
+        正常系: 規定回数失敗した文書は日付の完了判定から除外する
+        """
+        day = datetime(2025, 4, 1)
+        for _ in range(2):
+            self.run_state.start_doc("S1", day)
+            self.run_state.finish_doc("S1", day, error=ValueError("parse"))
+
+        self.assertTrue(self.run_state.finish_date(day, ["S1"]))
+
+    def test_recent_dates_are_never_completed(self):
+        """
+        正常系: 当日と一覧を再取得する直近の日付は書類が追加されうるため完了にしない
+        """
+        today = datetime.now()
+        refresh_days = self.run_state.refresh_days
+        self.assertFalse(self.run_state.finish_date(today, []))
+        self.assertFalse(
+            self.run_state.finish_date(today - timedelta(days=refresh_days), [])
+        )
+        self.assertTrue(
+            self.run_state.finish_date(today - timedelta(days=refresh_days + 1), [])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+import io
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from get_stakeholder_data.services import xbrl_cache
+from get_stakeholder_data.services.xbrl_cache import XbrlCache
+
+
+XBRL = b"<xbrli:xbrl>" + b"<jpcrp_cor:Tag>value</jpcrp_cor:Tag>" * 200 + b"</xbrli:xbrl>"
+
+
+class TestXbrlCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        """
+        正常系: 圧縮して保存し、透過的に展開して読み出せる
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL, company_code="12345")
+
+        self.assertIn("S1", cache)
+        self.assertEqual(cache.get("S1"), XBRL)
+        with cache.open("S1") as f:
+            self.assertEqual(f.read(), XBRL)
+        stored = os.path.getsize(os.path.join(self.tmp.name, "12345", "S1.xbrl.gz"))
+        self.assertLess(stored, len(XBRL))
+        cache.close()
+
+    def test_view(self):
+        """
+        正常系: 圧縮・非圧縮のどちらでも読み取り専用のメモリマップとして読み出せる
+        """
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                cache_dir = os.path.join(self.tmp.name, str(compress))
+                cache = XbrlCache(cache_dir, compress=compress)
+                cache.put("S1", XBRL, company_code="12345")
+
+                view = cache.view("S1")
+                self.assertEqual(view, XBRL)
+                self.assertTrue(view.readonly)
+                self.assertIsInstance(view.obj, mmap.mmap)
+                self.assertTrue(os.path.exists(cache.path_for("S1", "12345")))
+                self.assertIsNone(cache.view("S2"))
+                cache.close()
+
+    def test_put_stream(self):
+        """
+        正常系: ストリームから保存し、保存した内容のビューを返す
+        """
+        cache = XbrlCache(self.tmp.name, compress=False)
+
+        view = cache.put_stream("S1", io.BytesIO(XBRL), company_code="12345")
+
+        self.assertEqual(view, XBRL)
+        self.assertEqual(cache.get("S1"), XBRL)
+        self.assertEqual(cache.stats().raw_bytes, len(XBRL))
+        cache.close()
+
+    def test_put_stream_compressed(self):
+        """
+        正常系: 圧縮する場合も保存したファイルを展開し直さずにビューを返す
+        """
+        cache = XbrlCache(self.tmp.name)
+
+        with patch.object(xbrl_cache, "_map_entry") as mock_map_entry:
+            view = cache.put_stream("S1", io.BytesIO(XBRL), company_code="12345")
+
+        self.assertEqual(view, XBRL)
+        self.assertIsInstance(view.obj, mmap.mmap)
+        mock_map_entry.assert_not_called()
+        self.assertEqual(cache.get("S1"), XBRL)
+        cache.close()
+
+    def test_index_existing(self):
+        """
+        正常系: 非圧縮のキャッシュの保存先にあるファイルを書き直さずに登録する
+        """
+        cache = XbrlCache(self.tmp.name, compress=False)
+        path = cache.path_for("S1", "12345")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(XBRL)
+        inode = os.stat(path).st_ino
+
+        view = cache.index_existing("S1", "12345")
+
+        self.assertEqual(view, XBRL)
+        self.assertEqual(os.stat(path).st_ino, inode)
+        self.assertEqual(cache.get("S1"), XBRL)
+        self.assertEqual(cache.stats().stored_bytes, len(XBRL))
+        cache.close()
+
+    def test_index_existing_compressed(self):
+        """
+        異常系: 圧縮するキャッシュでは ValueError
+        """
+        cache = XbrlCache(self.tmp.name)
+        with self.assertRaises(ValueError):
+            cache.index_existing("S1", "12345")
+        cache.close()
+
+    def test_view_checksum_mismatch(self):
+        """
+        異常系: 内容が書き換えられていればエントリを削除してNoneを返す
+        """
+        cache = XbrlCache(self.tmp.name, compress=False)
+        cache.put("S1", XBRL, company_code="12345")
+        with open(cache.path_for("S1", "12345"), "r+b") as f:
+            f.write(b"<broken>")
+
+        self.assertIsNone(cache.view("S1"))
+        self.assertNotIn("S1", cache)
+        cache.close()
+
+    def test_locate(self):
+        """
+        正常系: 保存したファイルのパスを展開せずに検証して返す
+        """
+        cache = XbrlCache(self.tmp.name)
+        path = cache.store_stream("S1", io.BytesIO(XBRL), company_code="12345")
+
+        with patch.object(xbrl_cache, "_open_entry") as mock_open_entry:
+            self.assertEqual(cache.locate("S1"), path)
+        mock_open_entry.assert_not_called()
+        self.assertEqual(path, cache.path_for("S1", "12345"))
+        self.assertEqual(cache.get("S1"), XBRL)
+        self.assertIsNone(cache.locate("S2"))
+        cache.close()
+
+    def test_locate_checksum_mismatch(self):
+        """
+        異常系: 保存したファイルが書き換えられていればエントリを削除してNoneを返す
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        with open(cache.path_for("S1"), "r+b") as f:
+            f.seek(20)
+            f.write(b"broken")
+
+        self.assertIsNone(cache.locate("S1"))
+        self.assertNotIn("S1", cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        cache.close()
+
+    def test_locate_legacy_index(self):
+        """
+        正常系: 保存したファイルのチェックサムがない旧形式のエントリは展開して検証し、チェックサムを補う
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        cache._conn.execute("UPDATE entries SET stored_checksum = NULL")
+
+        self.assertEqual(cache.locate("S1"), cache.path_for("S1"))
+        with patch.object(xbrl_cache, "_open_entry") as mock_open_entry:
+            self.assertEqual(cache.locate("S1"), cache.path_for("S1"))
+        mock_open_entry.assert_not_called()
+        cache.close()
+
+    def test_store_stream_is_not_evicted(self):
+        """
+        正常系: 上限を超えても、パスを返す直前に保存した文書は削除しない
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        cache.max_bytes = cache.stats().stored_bytes
+
+        path = cache.store_stream("S2", io.BytesIO(XBRL + b" "))
+
+        self.assertTrue(os.path.exists(path))
+        self.assertIn("S2", cache)
+        self.assertNotIn("S1", cache)
+        cache.close()
+
+    def test_stats(self):
+        """
+        正常系: ヒット率と圧縮による削減バイト数を返す
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        cache.get("S1")
+        cache.get("S2")
+
+        stats = cache.stats()
+        self.assertEqual(stats.hits, 1)
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.hit_rate, 0.5)
+        self.assertEqual(stats.entries, 1)
+        self.assertEqual(stats.raw_bytes, len(XBRL))
+        self.assertGreater(stats.bytes_saved, 0)
+        cache.close()
+
+    def test_lru_eviction(self):
+        """
+        正常系: 上限を超えたら最終アクセスが古いものから削除する
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        entry_size = cache.stats().stored_bytes
+        cache.max_bytes = entry_size * 2 + 64
+
+        cache.put("S2", XBRL + b" ")
+        cache.get("S1")  # S1 を最近使ったことにする
+        cache.put("S3", XBRL + b"  ")
+
+        self.assertIn("S1", cache)
+        self.assertNotIn("S2", cache)
+        self.assertIn("S3", cache)
+        self.assertLessEqual(cache.stats().stored_bytes, cache.max_bytes)
+        cache.close()
+
+    def test_corrupted_entry_is_dropped(self):
+        """
+        異常系: チェックサムが一致しない場合はミスとして扱い削除する
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        cache.put("S2", b"other")
+        os.replace(
+            os.path.join(self.tmp.name, "unknown", "S2.xbrl.gz"),
+            os.path.join(self.tmp.name, "unknown", "S1.xbrl.gz"),
+        )
+
+        self.assertIsNone(cache.get("S1"))
+        self.assertNotIn("S1", cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        cache.close()
+
+    def test_truncated_gzip_is_dropped(self):
+        """
+        異常系: 途中で切れたgzipは例外を送出せず、ミスとして扱い削除する
+        """
+        cache = XbrlCache(self.tmp.name)
+        for doc_id in ("S1", "S2"):
+            cache.put(doc_id, XBRL)
+            path = cache.path_for(doc_id)
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) // 2)
+
+        self.assertIsNone(cache.get("S1"))
+        self.assertIsNone(cache.view("S2"))
+        self.assertNotIn("S1", cache)
+        self.assertNotIn("S2", cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        cache.close()
+
+    def test_index_persists(self):
+        """
+        正常系: インデックスは再オープン後も引き継がれる
+        """
+        cache = XbrlCache(self.tmp.name)
+        cache.put("S1", XBRL)
+        cache.close()
+
+        reopened = XbrlCache(self.tmp.name)
+        self.assertEqual(reopened.get("S1"), XBRL)
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
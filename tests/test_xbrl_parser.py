@@ -0,0 +1,244 @@
+import gzip
+import io
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from get_stakeholder_data.parser.xbrl_parser import ParsingError, XbrlParser
+from get_stakeholder_data.services.extraction import validate_directors
+
+
+OFFICER_TABLE = (
+    "&lt;table&gt;&lt;tr&gt;&lt;td&gt;代表取締役社長&lt;/td&gt;&lt;td&gt;山田 太郎&lt;/td&gt;"
+    "&lt;td&gt;1960年1月1日生&lt;/td&gt;&lt;td&gt;1983年4月 当社入社&lt;/td&gt;"
+    "&lt;td&gt;(注)3&lt;/td&gt;&lt;td&gt;120&lt;/td&gt;&lt;/tr&gt;&lt;/table&gt;"
+)
+SHAREHOLDER_TABLE = (
+    "&lt;table&gt;"
+    "&lt;tr&gt;&lt;td&gt;氏名又は名称&lt;/td&gt;&lt;td&gt;住所&lt;/td&gt;"
+    "&lt;td&gt;所有株式数(千株)&lt;/td&gt;&lt;td&gt;所有割合(％)&lt;/td&gt;&lt;/tr&gt;"
+    "&lt;tr&gt;&lt;td&gt;日本マスタートラスト信託銀行株式会社&lt;/td&gt;"
+    "&lt;td&gt;東京都港区&lt;/td&gt;&lt;td&gt;1,000&lt;/td&gt;&lt;td&gt;10.00&lt;/td&gt;&lt;/tr&gt;"
+    "&lt;tr&gt;&lt;td&gt;計&lt;/td&gt;&lt;td&gt;―&lt;/td&gt;"
+    "&lt;td&gt;1,000&lt;/td&gt;&lt;td&gt;10.00&lt;/td&gt;&lt;/tr&gt;"
+    "&lt;/table&gt;"
+)
+XBRL = f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+    xmlns:jpcrp_cor="http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2024-11-01/jpcrp_cor">
+  <jpcrp_cor:InformationAboutOfficersTextBlock contextRef="FilingDateInstant">{OFFICER_TABLE}</jpcrp_cor:InformationAboutOfficersTextBlock>
+  <jpcrp_cor:MajorShareholdersTextBlock contextRef="CurrentYearInstant">{SHAREHOLDER_TABLE}</jpcrp_cor:MajorShareholdersTextBlock>
+</xbrli:xbrl>
+""".encode("utf-8")
+
+# 有報と同じく、役員ごとのメンバーのコンテキストに氏名・役職名・生年月日（日付型）の要素を持つ
+OFFICER_ROWS = [
+    ("代表取締役社長", "山田 太郎", "1960-01-01", "1960年1月1日生", "120", "YamadaTaro"),
+    ("取締役", "鈴木 花子", "1965-05-10", "1965年5月10日生", "－", "SuzukiHanako"),
+]
+OFFICER_FACTS = "".join(
+    f'<jpcrp_cor:NameInformationAboutDirectorsAndCorporateAuditors '
+    f'contextRef="FilingDateInstant_jpcrp030000-asr_E00001-000{member}Member">{name}'
+    "</jpcrp_cor:NameInformationAboutDirectorsAndCorporateAuditors>"
+    f'<jpcrp_cor:OfficialTitleOrPositionInformationAboutDirectorsAndCorporateAuditors '
+    f'contextRef="FilingDateInstant_jpcrp030000-asr_E00001-000{member}Member">{title}'
+    "</jpcrp_cor:OfficialTitleOrPositionInformationAboutDirectorsAndCorporateAuditors>"
+    f'<jpcrp_cor:DateOfBirthInformationAboutDirectorsAndCorporateAuditors '
+    f'contextRef="FilingDateInstant_jpcrp030000-asr_E00001-000{member}Member">{birth}'
+    "</jpcrp_cor:DateOfBirthInformationAboutDirectorsAndCorporateAuditors>"
+    for title, name, birth, _, _, member in OFFICER_ROWS
+)
+OFFICER_TABLE_WITH_HEADER = (
+    "&lt;table&gt;&lt;tr&gt;&lt;td&gt;役職名&lt;/td&gt;&lt;td&gt;氏名&lt;/td&gt;"
+    "&lt;td&gt;生年月日&lt;/td&gt;&lt;td&gt;略歴&lt;/td&gt;&lt;td&gt;任期&lt;/td&gt;"
+    "&lt;td&gt;所有株式数(百株)&lt;/td&gt;&lt;/tr&gt;"
+    + "".join(
+        f"&lt;tr&gt;&lt;td&gt;{title}&lt;/td&gt;&lt;td&gt;{name}&lt;/td&gt;"
+        f"&lt;td&gt;{born}&lt;/td&gt;&lt;td&gt;1983年4月 当社入社&lt;/td&gt;"
+        f"&lt;td&gt;(注)3&lt;/td&gt;&lt;td&gt;{shares}&lt;/td&gt;&lt;/tr&gt;"
+        for title, name, _, born, shares, _ in OFFICER_ROWS
+    )
+    + "&lt;/table&gt;"
+)
+XBRL_WITH_OFFICERS = XBRL.replace(
+    b"</xbrli:xbrl>",
+    (
+        f"{OFFICER_FACTS}"
+        '<jpcrp_cor:InformationAboutDirectorsAndCorporateAuditorsTextBlock '
+        f'contextRef="FilingDateInstant">{OFFICER_TABLE_WITH_HEADER}'
+        "</jpcrp_cor:InformationAboutDirectorsAndCorporateAuditorsTextBlock></xbrli:xbrl>"
+    ).encode("utf-8"),
+).replace(b"InformationAboutOfficersTextBlock", b"OtherTextBlock")
+
+OFFICERS = {"役員の状況": {"data": []}}
+SHAREHOLDERS = {"大株主の状況": {"data": []}}
+
+
+class ReadOnlyStream(io.RawIOBase):
+    """read だけができる（巻き戻せない）ストリーム"""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._data.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+class TestXbrlParser(unittest.TestCase):
+    def test_detect_prefix_and_blocks(self):
+        """
+        正常系: TextBlockのプレフィックスを特定し、役員・大株主のブロックを取り出せる
+        """
+        parser = XbrlParser(XBRL)
+
+        self.assertEqual(parser.jp_prefix, "jpcrp_cor")
+        self.assertIn("山田 太郎", parser.extract_officer_block()[0].text)
+
+    def test_non_seekable_stream(self):
+        """
+        正常系: 巻き戻せないストリームも1回の走査で読み込み、抽出に使う要素だけを保持する
+        """
+        stream = ReadOnlyStream(XBRL)
+
+        parser = XbrlParser(stream)
+
+        self.assertEqual(
+            set(parser.elements),
+            {"InformationAboutOfficersTextBlock", "MajorShareholdersTextBlock"},
+        )
+        self.assertIn("日本マスタートラスト", parser.get_major_shareholders_text())
+
+    def test_officer_block_context(self):
+        """
+        正常系: 役員のTextBlockは FilingDateInstant のコンテキストのものだけを対象にする
+        """
+        xbrl = XBRL.replace(b'contextRef="FilingDateInstant"', b'contextRef="Prior1YearInstant"')
+
+        self.assertEqual(XbrlParser(xbrl).extract_officer_block(), [])
+
+    def test_lxml_backend(self):
+        """
+        正常系: lxml のバックエンドでも ElementTree と同じ要素を取り出せる
+        """
+        etree_parser = XbrlParser(XBRL, backend="etree")
+        lxml_parser = XbrlParser(XBRL, backend="lxml")
+
+        self.assertEqual(lxml_parser.jp_prefix, "jpcrp_cor")
+        self.assertEqual(_snapshot(lxml_parser), _snapshot(etree_parser))
+        self.assertEqual(
+            [s.name for s in lxml_parser.get_major_shareholders()],
+            [s.name for s in etree_parser.get_major_shareholders()],
+        )
+
+    def test_buffer_and_path_sources(self):
+        """
+        正常系: memoryview・mmap・ファイルのパス（.gz を含む）からも同じ要素を取り出せる
+        """
+        data = XBRL
+        expected = _snapshot(XbrlParser(data))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S1.xbrl")
+            with open(path, "wb") as f:
+                f.write(data)
+            with gzip.open(path + ".gz", "wb") as f:
+                f.write(data)
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            for backend in ("etree", "lxml"):
+                for source in (memoryview(data), mapped, path, path + ".gz"):
+                    with self.subTest(backend=backend, source=type(source).__name__):
+                        parser = XbrlParser(source, backend=backend)
+                        self.assertEqual(_snapshot(parser), expected)
+            mapped.close()
+
+    def test_unknown_backend(self):
+        """
+        異常系: 不明なバックエンドは ValueError
+        """
+        with self.assertRaises(ValueError):
+            XbrlParser(XBRL, backend="sax")
+
+    def test_get_major_shareholders(self):
+        """
+        正常系: 表から見出しの行を除いて大株主を抽出する（「計」の行は含める）
+        """
+        shareholders = XbrlParser(XBRL).get_major_shareholders()
+
+        self.assertEqual(
+            [s.name for s in shareholders], ["日本マスタートラスト信託銀行株式会社", "計"]
+        )
+        self.assertEqual(shareholders[0].ownership_ratio, "10.00")
+
+    def test_get_directors_and_auditors(self):
+        """
+        正常系: 氏名・役職名・生年月日は要素から、略歴・所有株式数は表から取り出し、検証を通る
+        """
+        directors = XbrlParser(XBRL_WITH_OFFICERS).get_directors_and_auditors()
+
+        self.assertEqual(
+            [(d.title, d.name, d.birth_date, d.shares_owned) for d in directors],
+            [(title, name, birth, shares) for title, name, birth, _, shares, _ in OFFICER_ROWS],
+        )
+        self.assertEqual(directors[0].biography, "1983年4月 当社入社")
+        self.assertIsNone(validate_directors(directors))
+
+    def test_get_directors_and_auditors_count_mismatch(self):
+        """
+        異常系: 役員の要素（ここでは0件）と表の行数が一致しない場合は ParsingError
+        """
+        with self.assertRaises(ParsingError):
+            XbrlParser(XBRL).get_directors_and_auditors()
+
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser")
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser_combined")
+    def test_get_stakeholders_by_llm_combined(self, mock_combined, mock_ai_parser):
+        """
+        正常系: 役員・大株主を1回の呼び出しで抽出する
+        """
+        mock_combined.return_value = (OFFICERS, SHAREHOLDERS)
+
+        result = XbrlParser(XBRL).get_stakeholders_by_llm()
+
+        self.assertEqual(result, (OFFICERS, SHAREHOLDERS))
+        officer_text, shareholder_text = mock_combined.call_args.args
+        self.assertIn("山田 太郎", officer_text)
+        self.assertIn("日本マスタートラスト", shareholder_text)
+        mock_ai_parser.assert_not_called()
+
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser")
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser_officers")
+    @patch("get_stakeholder_data.parser.xbrl_parser.ai_parser_combined")
+    def test_get_stakeholders_by_llm_fallback(
+        self, mock_combined, mock_officers, mock_ai_parser
+    ):
+        """
+        正常系: 一括抽出の応答が不正な場合はTextBlockごとの呼び出しにフォールバックする
+        """
+        mock_combined.return_value = None
+        mock_officers.return_value = OFFICERS
+        mock_ai_parser.return_value = SHAREHOLDERS
+
+        result = XbrlParser(XBRL).get_stakeholders_by_llm()
+
+        self.assertEqual(result, (OFFICERS, SHAREHOLDERS))
+        self.assertIn("山田 太郎", mock_officers.call_args.args[0])
+        self.assertEqual(mock_ai_parser.call_args.args[1], "shareholder_prompt.txt")
+
+
+def _snapshot(parser):
+    return {
+        tag: [(e.tag, e.attrib, e.text) for e in elements]
+        for tag, elements in parser.elements.items()
+    }
+
+
+if __name__ == "__main__":
+    unittest.main()